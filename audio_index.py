@@ -0,0 +1,282 @@
+import os
+import threading
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from audio_scanner import AUDIO_EXTENSIONS
+from duration_cache import DurationCache
+from filename_matching import normalize_filename, TrigramIndex, SUGGESTION_COUNT
+
+# Persistent audio library index (filename -> path, size, mtime, duration) for one audio root.
+# It lives in the same SQLite sidecar as the duration cache. A refresh stats every known directory
+# but only lists the ones whose mtime changed, so an unchanged delivery folder costs one stat per
+# folder instead of a full listing of every file.
+#
+# Usage shared by the GUI and the headless script:
+#     index = get_audio_index(audio_root, get_audio_info)
+#     index.refresh()
+#     filename_to_path = index.lookup(filenames)      (or index.match() for tolerant matching)
+#     lengths = index.duration_cache.get_lengths(paths)
+#
+# match_rows() is the script side of it, shared by every build path: path, match kind and
+# suggestions of every script row.
+
+# Per-row results of match_rows(), parallel lists in script order
+RowMatches = namedtuple("RowMatches", ["paths", "kinds", "suggestions", "missing"])
+
+# How match() found a file
+EXACT_MATCH = "exact"
+NORMALIZED_MATCH = "normalized"
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH_SIZE = 500
+
+# Missing filenames printed with their suggestions, the side file lists all of them
+MISSES_SHOWN = 10
+
+
+def _list_directory(directory_path, extensions, known_mtime_ns):
+    """Returns (mtime_ns, files, subdirectories) for a directory, or None if it no longer exists.
+
+    files and subdirectories are None when the directory mtime equals known_mtime_ns.
+    """
+    try:
+        mtime_ns = os.stat(directory_path).st_mtime_ns
+    except OSError:
+        return None
+    if mtime_ns == known_mtime_ns:
+        return mtime_ns, None, None
+
+    files = []
+    subdirectories = []
+    try:
+        with os.scandir(directory_path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    elif entry.name.lower().endswith(extensions):
+                        stat = entry.stat()
+                        files.append((entry.name, entry.path, stat.st_size, stat.st_mtime_ns))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return mtime_ns, files, subdirectories
+
+
+class AudioIndex:
+    """Incrementally refreshed index of the audio files under one audio root"""
+
+    def __init__(self, audio_root, probe, extensions=AUDIO_EXTENSIONS):
+        self.audio_root = os.path.abspath(audio_root)
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.duration_cache = DurationCache(self.audio_root, probe)
+        self.connection = self.duration_cache.connection
+        self.lock = self.duration_cache.lock
+        with self.lock:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS directories (
+                    path TEXT PRIMARY KEY,
+                    parent TEXT,
+                    mtime_ns INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    directory TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    norm_name TEXT);
+                CREATE INDEX IF NOT EXISTS files_name ON files (name);
+                CREATE INDEX IF NOT EXISTS files_directory ON files (directory);
+            """)
+            self._add_normalized_names()
+            self.connection.execute("CREATE INDEX IF NOT EXISTS files_norm_name ON files (norm_name)")
+            self.connection.commit()
+        # Built on the first suggest() and dropped when a refresh changes the files
+        self._trigram_index = None
+
+    def _add_normalized_names(self):
+        """Adds the norm_name column to indexes created before tolerant matching. The caller holds the lock"""
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(files)")]
+        if "norm_name" in columns:
+            return
+        self.connection.execute("ALTER TABLE files ADD COLUMN norm_name TEXT")
+        rows = self.connection.execute("SELECT path, name FROM files").fetchall()
+        self.connection.executemany("UPDATE files SET norm_name = ? WHERE path = ?",
+                                    [(normalize_filename(name, self.extensions), path) for path, name in rows])
+
+    def close(self):
+        self.duration_cache.close()
+
+    def refresh(self, max_workers=None, control=None, on_listed=None):
+        """Brings the index up to date with the disk. Returns (directories listed, directories unchanged).
+
+        control is an optional run_control.RunControl; a cancelled refresh leaves the index unchanged.
+        on_listed(directory, files) is called with every directory listing as soon as it arrives, files
+        being (name, path, size, mtime_ns) tuples, e.g. to start probing before the scan is done.
+        """
+        with self.lock:
+            known_mtimes = dict(self.connection.execute("SELECT path, mtime_ns FROM directories"))
+            children = defaultdict(list)
+            for path, parent in self.connection.execute("SELECT path, parent FROM directories"):
+                children[parent].append(path)
+
+        seen_directories = set()
+        changed_directories = []
+        unchanged_count = 0
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            def submit(directory_path, parent):
+                future = executor.submit(_list_directory, directory_path, self.extensions,
+                                         known_mtimes.get(directory_path))
+                pending[future] = (directory_path, parent)
+
+            pending = {}
+            submit(self.audio_root, None)
+            while pending:
+                completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                if control is not None:
+                    control.progress("Scanning audio folders", len(seen_directories), 0)
+                for future in completed:
+                    directory_path, parent = pending.pop(future)
+                    result = future.result()
+                    if result is None:
+                        continue
+                    mtime_ns, files, subdirectories = result
+                    seen_directories.add(directory_path)
+                    if files is None:
+                        unchanged_count += 1
+                        subdirectories = children[directory_path]
+                    else:
+                        changed_directories.append((directory_path, parent, mtime_ns, files))
+                        if on_listed is not None:
+                            on_listed(directory_path, files)
+                    for subdirectory in subdirectories:
+                        submit(subdirectory, directory_path)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        removed_directories = [path for path in known_mtimes if path not in seen_directories]
+        with self.lock:
+            self._apply_changes(changed_directories, removed_directories)
+            if changed_directories or removed_directories:
+                self._trigram_index = None
+        return len(changed_directories), unchanged_count
+
+    def _apply_changes(self, changed_directories, removed_directories):
+        """Writes the refresh result to the database. The caller holds the lock"""
+        execute = self.connection.execute
+        removed_files = []
+
+        for directory_path in removed_directories:
+            removed_files += [row[0] for row in execute("SELECT path FROM files WHERE directory = ?",
+                                                        (directory_path,))]
+            execute("DELETE FROM files WHERE directory = ?", (directory_path,))
+            execute("DELETE FROM directories WHERE path = ?", (directory_path,))
+
+        for directory_path, parent, mtime_ns, files in changed_directories:
+            listed = {path for _, path, _, _ in files}
+            removed_files += [row[0] for row in execute("SELECT path FROM files WHERE directory = ?",
+                                                        (directory_path,)) if row[0] not in listed]
+            execute("DELETE FROM files WHERE directory = ?", (directory_path,))
+            self.connection.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                                        [(path, directory_path, name, size, file_mtime_ns,
+                                          normalize_filename(name, self.extensions))
+                                         for name, path, size, file_mtime_ns in files])
+            execute("INSERT OR REPLACE INTO directories VALUES (?, ?, ?)", (directory_path, parent, mtime_ns))
+
+        # Deleted files no longer need their cached durations
+        self.connection.executemany("DELETE FROM audio_info WHERE path = ?", [(path,) for path in removed_files])
+        self.connection.commit()
+
+    def _query_by_name(self, query, filenames):
+        names = list({name for name in filenames if isinstance(name, str)})
+        return self._query_in(query, names)
+
+    def _query_in(self, query, names):
+        rows = []
+        with self.lock:
+            for start in range(0, len(names), LOOKUP_BATCH_SIZE):
+                batch = names[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows += self.connection.execute(query.format(placeholders=placeholders), batch).fetchall()
+        return rows
+
+    def lookup(self, filenames):
+        """Maps each indexed filename to its path. When a filename exists in several folders the path that sorts first is kept"""
+        rows = self._query_by_name("SELECT name, MIN(path) FROM files WHERE name IN ({placeholders}) GROUP BY name",
+                                   filenames)
+        return dict(rows)
+
+    def match(self, filenames):
+        """Tolerant lookup(). Maps each filename to (path, EXACT_MATCH or NORMALIZED_MATCH).
+
+        Names without an exact match are looked up by normalize_filename(), which ignores case,
+        Unicode composition, surrounding spaces and a missing or differently cased extension.
+        """
+        filenames = [name for name in filenames if isinstance(name, str)]
+        matches = {name: (path, EXACT_MATCH) for name, path in self.lookup(filenames).items()}
+
+        keys_to_names = defaultdict(list)
+        for name in filenames:
+            if name not in matches:
+                keys_to_names[normalize_filename(name, self.extensions)].append(name)
+        if keys_to_names:
+            rows = self._query_in("SELECT norm_name, MIN(path) FROM files WHERE norm_name IN ({placeholders}) "
+                                  "GROUP BY norm_name", list(keys_to_names))
+            for key, path in rows:
+                for name in keys_to_names[key]:
+                    matches[name] = (path, NORMALIZED_MATCH)
+        return matches
+
+    def suggest(self, filenames, count=SUGGESTION_COUNT):
+        """Maps each filename to the closest indexed filenames, best first"""
+        with self.lock:
+            if self._trigram_index is None:
+                rows = self.connection.execute("SELECT norm_name, MIN(name) FROM files GROUP BY norm_name").fetchall()
+                self._trigram_index = TrigramIndex([row[0] for row in rows], [row[1] for row in rows])
+            trigram_index = self._trigram_index
+        return {name: trigram_index.suggest(normalize_filename(name, self.extensions), count)
+                for name in set(filenames) if isinstance(name, str)}
+
+    def directory_mtimes(self):
+        """Returns folder path -> mtime_ns of every indexed folder, as of the last refresh"""
+        with self.lock:
+            return dict(self.connection.execute("SELECT path, mtime_ns FROM directories"))
+
+
+_open_indexes = {}
+_open_indexes_lock = threading.Lock()
+
+
+def get_audio_index(audio_root, probe):
+    """Returns the AudioIndex for an audio root, shared by every caller in this process"""
+    key = os.path.normcase(os.path.abspath(audio_root))
+    with _open_indexes_lock:
+        if key not in _open_indexes:
+            _open_indexes[key] = AudioIndex(audio_root, probe)
+        return _open_indexes[key]
+
+
+def match_rows(audio_index, names, shown=MISSES_SHOWN):
+    """Matches the filename cells of the script rows. Returns RowMatches: the path (None when not
+    found), match kind and suggestions text of every row, and the missing names. The first misses
+    are printed with their suggestions"""
+    names = list(names)
+    matches = audio_index.match(names)
+    paths = [matches.get(name, (None, ""))[0] for name in names]
+    kinds = [matches.get(name, (None, ""))[1] for name in names]
+    missing = [name for name, path in zip(names, paths) if path is None]
+    suggestions = audio_index.suggest(missing) if missing else {}
+    print_misses(missing, suggestions, shown)
+    return RowMatches(paths, kinds, ["; ".join(suggestions.get(name, [])) for name in names], missing)
+
+
+def print_misses(missing, suggestions, shown=MISSES_SHOWN):
+    """Prints the first missing filenames with their suggestions"""
+    for name in missing[:shown]:
+        print(f"Not found: {name}" + (f" (did you mean {', '.join(suggestions[name])}?)" if suggestions.get(name) else ""))
+    if len(missing) > shown:
+        print(f"... {len(missing) - shown} more not found, see the Suggestions column of the side file")
@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Concurrent os.scandir based audio directory scanner. Each directory is listed in its own
+# thread-pool task, which keeps many requests in flight on network shares where every
+# listing is a round trip.
+
+AUDIO_EXTENSIONS = ('.wav',)
+
+
+def _scan_one_directory(directory_path, extensions):
+    """Returns the matching (filename, path) pairs and the subdirectories of a single directory"""
+    files = []
+    subdirectories = []
+    try:
+        with os.scandir(directory_path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    elif entry.name.lower().endswith(extensions):
+                        files.append((entry.name, entry.path))
+                except OSError:
+                    continue
+    except OSError:
+        # Unreadable directories are skipped, like os.walk does
+        pass
+    return files, subdirectories
+
+
+def scan_audio_directory(directory_path, extensions=AUDIO_EXTENSIONS, max_workers=None):
+    """Returns the full paths of the audio files in a directory and its subdirectories.
+
+    Extensions are matched case-insensitively.
+    """
+    extensions = tuple(extension.lower() for extension in extensions)
+    all_paths = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(_scan_one_directory, directory_path, extensions)}
+        while pending:
+            completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                files, subdirectories = future.result()
+                all_paths.extend(path for _, path in files)
+                for subdirectory in subdirectories:
+                    pending.add(executor.submit(_scan_one_directory, subdirectory, extensions))
+
+    return all_paths
@@ -1,12 +1,33 @@
-﻿from pydub import AudioSegment
-import pandas as pd
-import os
+﻿import os
 from pathlib import Path
-import concurrent
-from uuid import uuid4
-from concurrent.futures import ThreadPoolExecutor
-from random import randint
+from duration_cache import get_audio_info
+from audio_scanner import scan_audio_directory
+from audio_index import get_audio_index, match_rows, NORMALIZED_MATCH
+from rpp_writer import write_project_to_directory
+from item_renderer import iter_rendered_items
+from layout import (compute_positions, DEFAULT_START, DEFAULT_GAP, LayoutOptions, check_layout_options,
+                    position_settings, is_running_total)
+from script_session import ScriptSession
+from run_control import RunControl, GenerationCancelled, report_progress
+from run_report import StageRecord, report_stage, add_stage, timed_iter, finish_report
+from side_file import (DEFAULT_SIDE_FILE_FORMAT, check_side_file_format, export_side_file,
+                       write_xlsx)
+from sharding import (check_shard_options, sharding_enabled, plan_shards, shard_positions, render_shards,
+                      remove_stale_shards, write_shard_index, SHARD_INDEX_SUFFIX)
+from rpp_update import update_project
+from peaks import generate_peaks
+from silence_trim import check_trim_options, analyze_silence
+from guid_provider import item_guids
+from pipeline import ProbePipeline, StreamingProjectWriter
+from output_cache import (build_fingerprint, load_reusable_build, write_build_manifest, restat_directories,
+                          BUILD_MANIFEST_SUFFIX)
+from rpp_templates import (generate_random_uuid, create_empty_project_template, create_empty_track_template,
+                           create_item_template_with_notes, SOURCE_REFERENCE_TRACK)
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+# pandas and pydub are imported where they are used: a DataFrame only exists once a script is read,
+# and pydub only decodes files that are not plain WAV (see duration_cache.get_audio_info)
 
 # GUI LINKED FUNCTIONS
 
@@ -32,16 +53,13 @@ def validate_sample_rate(sample_rate):
     valid_options = ["44100", "48000", "96000",]
     return sample_rate in valid_options
 
-def validate_excel_column(column_name, script_file):
-    """Validate Excel column name."""
-    # Strip quotes from the file path
-    script_file = script_file.strip('"')
+def validate_excel_column(column_name, script_file, session=None):
+    """Validate Excel column name. Pass a ScriptSession to reuse the already opened script"""
     try:
-        df = pd.read_excel(script_file)
-        # print("check 2 validate_excel_column")
-        columns = df.columns.tolist()
-        # print("check 3 validate_excel_column")
-        if column_name not in columns:
+        if session is None:
+            session = ScriptSession(script_file)
+        # Only the header row is read
+        if not session.has_column(column_name):
             # print(f"Header '{column_name}' not in script")
             return False
         return True
@@ -49,36 +67,216 @@ def validate_excel_column(column_name, script_file):
         print(f"Error reading Excel file: {e}")
         return False
 
-def process_data(script_path, audio_path, sample_rate, excel_column_1, excel_column_2):
-    """Process all inputs."""
+def process_data(script_path, audio_path, sample_rate, excel_column_1, excel_column_2, session=None, control=None,
+                 side_file_format=DEFAULT_SIDE_FILE_FORMAT, shard_options=None, update_existing=False, build_peaks=False,
+                 trim_options=None, guid_seed=None, use_output_cache=True, layout_options=None):
+    """Process all inputs. control is an optional RunControl for progress, stage timings and cancellation"""
     start_time = time.time()
-    project_info = create_dataframe_for_rec(script_path, audio_path, excel_column_1, excel_column_2)
-    empty_project = create_empty_project_template(sample_rate)
-    # print(empty_project)
-    new_track = create_empty_track_template("Source_Reference")
-    # print(new_track)
-    project_with_track = add_track_to_project(empty_project, new_track)
-    # print(project_with_track)
-    new_items_template = generate_item_templates_from_dataframe(project_info[0])
-    # print(new_items_template)
-    reaper_project_as_text = add_items_to_track(project_with_track, new_items_template)
-    # print(reaper_project_as_text)
-    export_to_directory(reaper_project_as_text, f"{project_info[2]}.rpp", project_info[1])
+    if control is None:
+        control = RunControl()
+    summary = build_project(script_path, audio_path, sample_rate, excel_column_1, excel_column_2, session,
+                            control=control, side_file_format=side_file_format, shard_options=shard_options,
+                            update_existing=update_existing, build_peaks=build_peaks, trim_options=trim_options,
+                            guid_seed=guid_seed, use_output_cache=use_output_cache,
+                            layout_options=layout_options)
+    print(control.report.summary_text())
+    print(f"Stage report: {summary['report_path']}")
     end_time = time.time()
     print(f"Elapsed time {end_time - start_time}")
     # Add your processing logic here
+    if summary["cached"]:
+        return "Project up to date (inputs unchanged)"
     return f"Project generated"
 
 
+def build_project(script_path, audio_path, sample_rate, excel_column_1, excel_column_2, session=None,
+                  refresh_index=True, control=None, side_file_format=DEFAULT_SIDE_FILE_FORMAT, shard_options=None,
+                  update_existing=False, build_peaks=False, trim_options=None, guid_seed=None, use_output_cache=True,
+                  layout_options=None):
+    """Generates the .rpp and the Dataframe side file for one script. Returns a summary dict.
+
+    side_file_format is one of side_file.SIDE_FILE_FORMATS ('none' skips the side file).
+    shard_options is an optional sharding.ShardOptions to split the output into several projects,
+    the summary's rpp_path is then the shard index and shard_paths lists the projects.
+    update_existing updates the items of an existing <script>.rpp in place (keeping their GUIDs and
+    REAPER edits) instead of writing a new project; the summary's changes has the counts.
+    build_peaks writes REAPER peak files for the matched audio while the project is written.
+    trim_options is an optional silence_trim.TrimOptions to start and end every item at its audible part.
+    guid_seed makes every GUID derive from the seed, the project name and the item's filename, so the
+    same inputs give a byte-identical project. Without it the GUIDs are random.
+    use_output_cache returns the previous build's summary (with cached True) without regenerating when
+    the script, the settings and the referenced audio files are unchanged (see output_cache).
+    layout_options is an optional layout.LayoutOptions (start, gaps, grid or sample snapping at sample_rate).
+    """
+    check_side_file_format(side_file_format)
+    check_trim_options(trim_options)
+    check_shard_options(shard_options)
+    check_layout_options(layout_options)
+    sharded = sharding_enabled(shard_options)
+    if update_existing and sharded:
+        raise ValueError("Updating an existing project cannot be combined with sharding")
+    if update_existing and not is_running_total(layout_options):
+        raise ValueError("Updating an existing project only supports the layout start and gap")
+    group_column = shard_options.group_column if sharded else None
+    gap_column = layout_options.gap_column if layout_options is not None else None
+    settings = position_settings(layout_options, sample_rate)
+
+    rec_script_directory, project_name = project_location(script_path)
+    manifest_path = os.path.join(rec_script_directory, f"{project_name}{BUILD_MANIFEST_SUFFIX}")
+    if use_output_cache:
+        with report_stage(control, "Output cache check") as record:
+            fingerprint = build_fingerprint(script_path, {
+                "audio_root": os.path.abspath(audio_path), "sample_rate": str(sample_rate),
+                "columns": [str(excel_column_1), str(excel_column_2)], "side_file_format": side_file_format,
+                "shard_options": list(shard_options) if sharded else None, "update_existing": update_existing,
+                "build_peaks": build_peaks, "trim_options": list(trim_options) if trim_options else None,
+                "guid_seed": guid_seed, "layout": list(layout_options or LayoutOptions())})
+            previous_summary = load_reusable_build(manifest_path, fingerprint)
+            record.details["reused"] = previous_summary is not None
+        if previous_summary is not None:
+            print(f"Inputs unchanged since the last build, reusing {previous_summary['rpp_path']}")
+            previous_summary["cached"] = True
+            return finish_report(control, previous_summary, rec_script_directory, project_name)
+
+    project_seed = None if guid_seed is None else f"{guid_seed}/{project_name}"
+    empty_project = create_empty_project_template(sample_rate, project_seed)
+    # print(empty_project)
+    new_track = create_empty_track_template(SOURCE_REFERENCE_TRACK, project_seed)
+    # print(new_track)
+
+    # A single new project is laid out, rendered and written while the durations are still probed.
+    # Trimming, sharding and updates need every length first and write the project afterwards
+    writer = None
+    if not sharded and not update_existing and trim_options is None:
+        writer = StreamingProjectWriter(empty_project, new_track, f"{project_name}.rpp", rec_script_directory,
+                                        guid_seed=project_seed, control=control, **settings)
+    try:
+        project_info = create_dataframe_for_rec(script_path, audio_path, excel_column_1, excel_column_2, session,
+                                                refresh_index, control,
+                                                extra_columns=[column for column in (group_column, gap_column)
+                                                               if column],
+                                                trim_options=trim_options, row_sink=writer,
+                                                layout_options=layout_options, sample_rate=sample_rate)
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    df, rec_script_directory, project_name = project_info
+
+    if sharded:
+        with report_stage(control, "Sharding") as record:
+            import pandas as pd
+            lengths = pd.to_numeric(df['Length'], errors='coerce').to_numpy(dtype=float)
+            groups = df[str(group_column)].tolist() if group_column else None
+            gaps = row_gaps(df, str(gap_column)) if gap_column else None
+            shards = plan_shards(project_name, lengths, shard_options, groups, settings["start"], settings["gap"])
+            # Every shard starts at the start offset again, the side file shows the shard layout
+            df['Position'] = shard_positions(lengths, shards, gaps=gaps, **settings)
+            shard_files = [None] * len(df)
+            for shard in shards:
+                for row in shard.rows:
+                    shard_files[row] = shard.filename
+            df['Shard'] = shard_files
+            record.items = len(shards)
+
+    changes = None
+    existing_rpp_path = os.path.join(rec_script_directory, f"{project_name}.rpp")
+    update_in_place = update_existing and os.path.isfile(existing_rpp_path)
+    if update_in_place:
+        report_progress(control, "Updating project")
+        with report_stage(control, "Project update") as record:
+            names, paths, notes, lengths, _, offsets, guids = get_item_columns(df, project_seed)
+            positions, changes = update_project(existing_rpp_path, names, paths, notes, lengths,
+                                                SOURCE_REFERENCE_TRACK, start=settings["start"], gap=settings["gap"],
+                                                offsets=offsets, guids=guids)
+            df['Position'] = positions
+            record.items = changes["added"] + changes["removed"] + changes["changed"] + changes["moved"]
+            record.bytes_written = os.path.getsize(existing_rpp_path)
+            record.details.update(changes)
+
+    # The side file is exported in a worker thread meanwhile, both only read the frame
+    try:
+        report_progress(control, "Writing project")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            side_file_future = executor.submit(export_side_file_stage, df, script_path, side_file_format,
+                                               rec_script_directory, control)
+            peaks_future = None
+            if build_peaks:
+                peaks_future = executor.submit(build_peaks_stage, df['Audio Path'].tolist(), control)
+
+            if update_in_place:
+                rpp_path = existing_rpp_path
+                shard_paths = [rpp_path]
+            elif sharded:
+                with report_stage(control, "Shard rendering") as record:
+                    shard_paths, record.bytes_written = render_shards(sample_rate, get_item_columns(df, project_seed),
+                                                                      shards, rec_script_directory, control,
+                                                                      project_seed)
+                    record.items = len(df)
+                    record.details["shards"] = len(shards)
+                index_path = os.path.join(rec_script_directory, f"{project_name}{SHARD_INDEX_SUFFIX}")
+                # Shards of the previous build that this one did not write again
+                stale_shards = remove_stale_shards(index_path, shards)
+                if stale_shards:
+                    print(f"Removed {len(stale_shards)} stale shard projects: "
+                          f"{', '.join(os.path.basename(path) for path in stale_shards)}")
+                rpp_path = write_shard_index(index_path, shards, df.iloc[:, 0].tolist(), df['Position'].tolist())
+            elif writer is not None:
+                # The rows went to the writer thread while they were probed, only the last ones are left
+                rpp_path = writer.finish()
+                for record in writer.stage_records():
+                    add_stage(control, record)
+                shard_paths = [rpp_path]
+            else:
+                # Items are streamed straight to the file instead of being spliced into the project string.
+                # Rendering and writing interleave, so the time spent producing items is measured separately
+                render_record = StageRecord("Item rendering")
+                write_start = time.perf_counter()
+                new_items = timed_iter(iter_item_templates_from_dataframe(df, control, project_seed), render_record)
+                rpp_path = write_project_to_directory(empty_project, new_track, new_items, f"{project_name}.rpp",
+                                                      rec_script_directory)
+                write_record = StageRecord(".rpp write")
+                write_record.seconds = time.perf_counter() - write_start - render_record.seconds
+                write_record.items = render_record.items
+                write_record.bytes_written = os.path.getsize(rpp_path)
+                add_stage(control, render_record)
+                add_stage(control, write_record)
+                shard_paths = [rpp_path]
+            side_file = side_file_future.result()
+            peak_counts = peaks_future.result() if peaks_future is not None else None
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+
+    summary = {"rows": len(df),
+               "not_found": int((df['Audio Path'] == 'Not Found').sum()),
+               "rpp_path": rpp_path,
+               "shard_paths": shard_paths,
+               "changes": changes,
+               "peaks": peak_counts,
+               "side_file_path": side_file,
+               "report_path": None,
+               "cached": False}
+
+    if use_output_cache:
+        # Scripts with missing files are rebuilt as soon as any audio folder changes
+        directory_mtimes = None
+        found_paths = df.loc[df['Audio Path'] != 'Not Found', 'Audio Path'].tolist()
+        if summary["not_found"]:
+            directory_mtimes = get_audio_index(audio_path, get_audio_info).directory_mtimes()
+            if build_peaks:
+                # The peak files written next to the audio changed those folders since the index refresh
+                directory_mtimes = restat_directories(directory_mtimes, {os.path.dirname(path) for path in found_paths})
+        write_build_manifest(manifest_path, fingerprint, summary, found_paths, shard_paths + [rpp_path, side_file],
+                             directory_mtimes)
+    return finish_report(control, summary, rec_script_directory, project_name)
+
+
 # Functions for Dataframe
 def get_wav_file_paths_list(directory_path):
     """Returns a list with full wav file paths contained in a directory and its subdirectories"""
-    wav_file_paths = []
-    for root, _, files in os.walk(directory_path):
-        for file in files:
-            if file.endswith('.wav'):
-                wav_file_paths.append(os.path.join(root, file))
-    return wav_file_paths
+    return scan_audio_directory(directory_path)
 
 
 def export_dataframe_to_excel_file(df, filename, directory):
@@ -88,41 +286,129 @@ def export_dataframe_to_excel_file(df, filename, directory):
         filename += '.xlsx'
 
     file_path = os.path.join(directory, filename)
-    df.to_excel(file_path, index=False, engine='openpyxl')
-
-
-def new_frame_with_audio_paths(excel_file, list_of_columns, directory_path):
-    # Detect file extension
-    ext = os.path.splitext(excel_file)[1].lower()
-
-    # Read the file based on extension
-    if ext == '.xlsx':
-        df = pd.read_excel(excel_file, engine='openpyxl')
-    elif ext == '.xls':
-        df = pd.read_excel(excel_file, engine='xlrd')
-    elif ext == '.csv':
-        df = pd.read_csv(excel_file)
-    else:
-        raise ValueError(f"Unsupported file extension: {ext}")
-
-    # Filter DataFrame with only specified columns
-    df = df[list_of_columns]
-
-    # Get list of wav file paths
-    wav_file_paths = get_wav_file_paths_list(directory_path)
+    write_xlsx(df, file_path)
+    return file_path
+
+
+def build_peaks_stage(audio_paths, control=None):
+    """generate_peaks() for the found files, timed as the 'Peak building' stage. Returns the status counts"""
+    with report_stage(control, "Peak building") as record:
+        found_paths = [path for path in audio_paths if path != 'Not Found']
+        counts = generate_peaks(found_paths, control=control)
+        record.items = len(set(found_paths))
+        record.details.update(counts)
+    print("Peak files: " + ", ".join(f"{count} {status}" for status, count in counts.items()))
+    return counts
+
+
+def export_side_file_stage(df, script_path, side_file_format, directory, control=None):
+    """export_side_file() timed as the 'Side file export' stage. Returns the side file path or None"""
+    with report_stage(control, "Side file export") as record:
+        file_path = export_side_file(df, script_path, side_file_format, directory, control)
+        record.items = len(df) if file_path else 0
+        record.bytes_written = os.path.getsize(file_path) if file_path else 0
+        record.details["format"] = side_file_format
+    return file_path
+
+
+def new_frame_with_audio_paths(excel_file, list_of_columns, directory_path, session=None, refresh_index=True,
+                               control=None, trim_options=None, row_sink=None, layout_options=None, sample_rate=None):
+    """Builds the frame with the audio path, length and position of every script row.
+
+    row_sink is an optional pipeline.StreamingProjectWriter that gets every length in script order
+    as soon as it is probed (only without trim_options, trimming changes the lengths afterwards).
+    layout_options (layout.LayoutOptions) and the project sample_rate set the positions.
+    """
+    # Reuse the script already opened for validation when there is one
+    if session is None:
+        session = ScriptSession(excel_file)
+
+    report_progress(control, "Reading script")
+
+    # Parse only the specified columns (cached between runs while the script is unchanged)
+    with report_stage(control, "Script read") as record:
+        df = session.read_columns(list_of_columns)
+        record.items = len(df)
+        record.bytes_read = session.bytes_read
+        record.details["parse_cache_hit"] = session.parse_cache_hit
+
+    # Durations are probed while the folders are still being scanned (see pipeline.ProbePipeline)
+    audio_index = get_audio_index(directory_path, get_audio_info)
+    probes = ProbePipeline(audio_index.duration_cache, df.iloc[:, 0], audio_index.extensions)
+    try:
+        return _frame_from_probes(df, audio_index, probes, refresh_index, control, trim_options, row_sink,
+                                  layout_options, sample_rate)
+    finally:
+        probes.close()
+
+
+def _frame_from_probes(df, audio_index, probes, refresh_index, control, trim_options, row_sink, layout_options=None,
+                       sample_rate=None):
+    """new_frame_with_audio_paths() from the scan on, with the probes running alongside"""
+    duration_cache = audio_index.duration_cache
+    duration_cache.reset_stats()
+
+    # Bring the persistent audio library index up to date (only changed folders are listed).
+    # Batch runs refresh it once up front and skip this
+    with report_stage(control, "Audio scan") as record:
+        if refresh_index:
+            # Files matched before the refresh are most likely still there, newly listed ones are
+            # probed as their folder comes in
+            probes.prime(path for path, _ in audio_index.match(df.iloc[:, 0]).values())
+            listed, unchanged = audio_index.refresh(control=control, on_listed=probes.on_listed)
+            record.items = listed + unchanged
+            record.details["folders_listed"] = listed
+            record.details["probes_started"] = len(probes.futures)
 
     # Map filenames to paths
-    filename_to_path = {os.path.basename(path): path for path in wav_file_paths if path is not None}
-
-    # Add audio path column, defaulting to None if not found
-    df['Audio Path'] = df.iloc[:, 0].apply(lambda x: filename_to_path.get(x, None))
-
-    # Add length column, defaulting to None if path is None
-    with ThreadPoolExecutor() as executor:
-        df['Length'] = list(executor.map(lambda path: get_length(path) if path else None, df['Audio Path']))
+    report_progress(control, "Matching filenames")
+    with report_stage(control, "Filename match") as record:
+        # Exact names first, then keys that ignore case, Unicode composition, spaces and the extension
+        # Rows without audio get the closest library filenames as suggestions
+        rows = match_rows(audio_index, df.iloc[:, 0])
+        df['Audio Path'] = rows.paths
+        df['Match'] = rows.kinds
+        df['Suggestions'] = rows.suggestions
+        record.items = len(df)
+        record.details["found"] = int(df['Audio Path'].notna().sum())
+        record.details["normalized"] = int((df['Match'] == NORMALIZED_MATCH).sum())
+
+    # Add length column, defaulting to None if path is None. Unchanged files come from the cache.
+    # Each length goes on to the streaming writer as soon as it and all before it are known
+    with report_stage(control, "Duration probing") as record:
+        if row_sink is not None:
+            name_column, notes_column = get_name_and_notes_columns(df)
+            gap_column = layout_options.gap_column if layout_options is not None else None
+            row_sink.begin(df[name_column].tolist(), df['Audio Path'].tolist(), df[notes_column].tolist(),
+                           row_gaps(df, gap_column) if gap_column else None)
+        lengths = []
+        for length in probes.iter_lengths(df['Audio Path'].tolist(), control):
+            lengths.append(length)
+            if row_sink is not None:
+                row_sink.add(length)
+        df['Length'] = lengths
+        print(duration_cache.stats_text())
+        record.items = duration_cache.hits + duration_cache.misses
+        record.bytes_read = duration_cache.bytes_read
+        record.details["cache_hits"] = duration_cache.hits
+        record.details["cache_misses"] = duration_cache.misses
+
+    # Trimmed lengths replace the file lengths before the layout, the offsets become the items' SOFFS
+    if trim_options is not None:
+        report_progress(control, "Analysing silence")
+        with report_stage(control, "Silence analysis") as record:
+            add_trims(df, trim_options, control)
+            record.items = int(df['Audio Path'].notna().sum())
+            record.details["trimmed"] = int((df['Offset'] > 0).sum())
 
     # Add position column, defaulting to None if length is None
-    df = assign_positions(df, length_column='Length', separation=4)
+    report_progress(control, "Layout")
+    with report_stage(control, "Layout") as record:
+        settings = position_settings(layout_options, sample_rate)
+        df = assign_positions(df, length_column='Length', separation=settings.pop("gap"),
+                              gap_column=layout_options.gap_column if layout_options is not None else None,
+                              **settings)
+        record.items = len(df)
 
     # Handle missing values gracefully
     df['Audio Path'] = df['Audio Path'].fillna('Not Found')
@@ -132,234 +418,76 @@ def new_frame_with_audio_paths(excel_file, list_of_columns, directory_path):
     return df
 
 
+def add_trims(df, trim_options, control=None):
+    """Adds the 'Offset' column and shortens 'Length' to the audible part of every found file"""
+    trims = analyze_silence(df['Audio Path'].tolist(), trim_options, control=control)
+    file_lengths = df['Length'].tolist()
+    offsets, lengths = [], []
+    for path, file_length in zip(df['Audio Path'].tolist(), file_lengths):
+        # Files that cannot be analysed keep their full length
+        offset, length = trims.get(path, (0, file_length))
+        offsets.append(offset)
+        lengths.append(length)
+    df['Offset'] = offsets
+    df['Length'] = lengths
+    return df
+
+
 def get_length(file_path):
-    audio = AudioSegment.from_file(file_path)
-    length = audio.duration_seconds
-    return length
+    """Returns the audio duration in seconds"""
+    return get_audio_info(file_path).duration
+
 
+def assign_positions(df, length_column='Length', separation=DEFAULT_GAP, start=DEFAULT_START, gap_column=None,
+                     missing_length=0, grid=None, sample_rate=None):
+    """Adds the 'Position' column. See layout.compute_positions for the options"""
+    import pandas as pd
 
-def assign_positions(df, length_column='Length', separation=4):
-    # Initialize position tracker
-    current_position = 5
+    # Missing lengths (None, NaN or placeholder text) take missing_length on the timeline
+    lengths = pd.to_numeric(df[length_column], errors='coerce').to_numpy(dtype=float)
+    gaps = row_gaps(df, gap_column) if gap_column else None
 
-    # Create a list to store positions
-    positions = []
+    df['Position'] = compute_positions(lengths, start=start, gap=separation, gaps=gaps,
+                                       missing_length=missing_length, grid=grid, sample_rate=sample_rate)
+    return df
 
-    for index, row in df.iterrows():
-        length = row[length_column]
 
-        # If length is None, use a default value (e.g., 0)
-        if length is None:
-            length = 0
+def row_gaps(df, gap_column):
+    """Returns the separation of every row from the gap column, NaN where the cell is empty or not a number"""
+    import pandas as pd
 
-        # Calculate position
-        positions.append(current_position)
-        current_position += length + separation
+    return pd.to_numeric(df[gap_column], errors='coerce').to_numpy(dtype=float)
 
-    # Add positions to DataFrame
-    df['Position'] = positions
-    return df
 
+def project_location(rec_script_path):
+    """Returns (directory, project name) of the outputs for a script: its own folder and name up to the first dot"""
+    return os.path.dirname(rec_script_path), os.path.basename(rec_script_path).split(".")[0]
 
-def create_dataframe_for_rec(rec_script_path, audio_path, filename_column, item_notes_column):
+
+def create_dataframe_for_rec(rec_script_path, audio_path, filename_column, item_notes_column, session=None,
+                             refresh_index=True, control=None, extra_columns=(), trim_options=None, row_sink=None,
+                             layout_options=None, sample_rate=None):
     # get the rec script path and directory
-    project_name = os.path.basename(rec_script_path).split(".")[0]
-    rec_script_directory = os.path.dirname(rec_script_path)
+    rec_script_directory, project_name = project_location(rec_script_path)
 
     # User needed columns
     user_columns = [str(filename_column), str(item_notes_column)]
+    # e.g. the sharding group column, kept after the item columns
+    for column in extra_columns:
+        if str(column) not in user_columns:
+            user_columns.append(str(column))
 
-    new_data = new_frame_with_audio_paths(rec_script_path, user_columns, audio_path)
+    new_data = new_frame_with_audio_paths(rec_script_path, user_columns, audio_path, session, refresh_index, control,
+                                          trim_options, row_sink, layout_options, sample_rate)
 
     project_dataframe = new_data
 
-    export_dataframe_to_excel_file(new_data, f"Dataframe_{os.path.basename(rec_script_path)}", rec_script_directory)
+    # The side file is exported by build_project() while the .rpp is rendered
 
     return [project_dataframe, rec_script_directory, project_name]
 
 
 # Functions for Reaper project creation
-def generate_random_uuid():
-    """Creates a unique random ID"""
-
-    id1 = str(uuid4()).upper()
-    return id1
-
-
-def create_empty_project_template(sample_rate):
-    """Create the structure of a Reaper project as text. Returns a string"""
-
-    empty_template = f"""<REAPER_PROJECT 0.1 "7.39/win64" {randint(1747000000, 9999999999)}
-  RIPPLE 0 0
-  GROUPOVERRIDE 0 0 0
-  AUTOXFADE 129
-  ENVATTACH 0
-  POOLEDENVATTACH 0
-  MIXERUIFLAGS 11 48
-  PEAKGAIN 1
-  FEEDBACK 0
-  PANLAW 1
-  PROJOFFS 0 0 0
-  MAXPROJLEN 0 600
-  GRID 3198 8 1 8 1 0 0 0
-  TIMEMODE 1 5 -1 30 0 0 -1
-  VIDEO_CONFIG 0 0 256
-  PANMODE 3
-  CURSOR 0
-  ZOOM 1
-  VZOOMEX 5 0
-  USE_REC_CFG 0
-  RECMODE 1
-  SMPTESYNC 0 30 100 40 1000 300 0 0 1 0 0
-  MIDIEDITOR -10197916 0 0
-  LOOP 0
-  LOOPGRAN 0 4
-  RECORD_PATH "" ""
-  <RECORD_CFG
-    ZXZhdxgBAA==
-  >
-  <APPLYFX_CFG
-  >
-  RENDER_FILE ""
-  RENDER_PATTERN ""
-  RENDER_FMT 0 1 48000
-  RENDER_1X 0
-  RENDER_RANGE 1 0 0 2 0
-  RENDER_RESAMPLE 3 0 1
-  RENDER_ADDTOPROJ 0
-  RENDER_STEMS 6
-  RENDER_DITHER 0
-  RENDER_TRIM 0 0 0 0
-  TIMELOCKMODE 1
-  TEMPOENVLOCKMODE 1
-  ITEMMIX 0
-  DEFPITCHMODE 1 0
-  TAKELANE 1
-  SAMPLERATE {sample_rate} 1 0
-  <RENDER_CFG
-    ZXZhdxgDAA==
-  >
-  LOCK 1
-  <METRONOME 6 2
-    VOL 0.25 0.125
-    BEATLEN 4
-    FREQ 800 1600 1
-    SAMPLES "" "" "" ""
-    SPLIGNORE 0 0
-    SPLDEF 2 660 "" 0 ""
-    SPLDEF 3 440 "" 0 ""
-    PATTERN 0 169
-    PATTERNSTR ABBB
-    MULT 1
-  >
-  GLOBAL_AUTO -1
-  TEMPO 120 4 4 0
-  PLAYRATE 1 0 0.25 4
-  SELECTION 0 0
-  SELECTION2 0 0
-  MASTERAUTOMODE 0
-  MASTERTRACKHEIGHT 0 0
-  MASTERPEAKCOL 16576
-  MASTERMUTESOLO 0
-  MASTERTRACKVIEW 0 0.6667 0.5 0.5 0 0 0 0 0 0 0 0 0 0
-  MASTERHWOUT 0 0 1 0 0 0 0 -1
-  MASTER_NCH 2 2
-  MASTER_VOLUME 1 0 -1 -1 1
-  MASTER_PANMODE 3
-  MASTER_FX 1
-  MASTER_SEL 0
-  <MASTERPLAYSPEEDENV
-    EGUID {{{generate_random_uuid()}}}
-    ACT 0 -1
-    VIS 0 1 1
-    LANEHEIGHT 0 0
-    ARM 0
-    DEFSHAPE 0 -1 -1
-  >
-  <TEMPOENVEX
-    EGUID {{{generate_random_uuid()}}}
-    ACT 1 -1
-    VIS 1 0 1
-    LANEHEIGHT 0 0
-    ARM 0
-    DEFSHAPE 1 -1 -1
-  >
-  <PROJBAY
-  >
-  <EXTENSIONS
-  >
->"""
-    return empty_template
-
-
-def create_empty_track_template(track_name):
-    """Create the structure of an empty track as text"""
-
-    track_id = generate_random_uuid()
-
-    empty_track_template = f"""<TRACK {{{track_id}}}
-    NAME {track_name}
-    PEAKCOL 16576
-    BEAT -1
-    AUTOMODE 0
-    PANLAWFLAGS 3
-    VOLPAN 1 0 -1 -1 1
-    MUTESOLO 0 0 0
-    IPHASE 0
-    PLAYOFFS 0 1
-    ISBUS 0 0
-    BUSCOMP 0 0 0 0 0
-    SHOWINMIX 1 0.6667 0.5 1 0.5 0 0 0
-    FIXEDLANES 9 0 0 0 0
-    SEL 0
-    REC 0 0 0 0 0 0 0 0
-    VU 2
-    TRACKHEIGHT 0 0 0 0 0 0 0
-    INQ 0 0 0 0.5 100 0 0 100
-    NCHAN 2
-    FX 1
-    TRACKID {{{track_id}}}
-    PERF 0
-    MIDIOUT -1
-    MAINSEND 1 0
->"""
-    return empty_track_template
-
-
-def create_item_template_with_notes(filename, file_path, text_notes, length, position):
-    item_iguid = generate_random_uuid()
-    item_guid = generate_random_uuid()
-
-    item_template = f"""    <ITEM
-      POSITION {position}
-      SNAPOFFS 0
-      LENGTH {length}
-      LOOP 1
-      ALLTAKES 0
-      FADEIN 1 0 0 1 0 0 0
-      FADEOUT 1 0 0 1 0 0 0
-      MUTE 0 0
-      SEL 0
-      IGUID {{{item_iguid}}}
-      IID 1
-      <NOTES
-        |{text_notes}
-      >
-      IMGRESOURCEFLAGS 0
-      NOTESWND 544 398 1043 795
-      NAME {filename}
-      VOLPAN 1 0 1 -1
-      SOFFS 0
-      PLAYRATE 1 1 0 -1 0 0.0025
-      CHANMODE 0
-      GUID {{{item_guid}}}
-      <SOURCE WAVE
-        FILE "{file_path}"
-      >
-    >"""
-    return item_template
-
-
 def add_track_to_project(project, empty_track):
     insert_point = project.find("<EXTENSIONS\n  >")
     if insert_point != -1:
@@ -380,29 +508,30 @@ def add_items_to_track(project_w_track, item_as_text):
     return None
 
 
-def generate_item_templates_from_dataframe(df):
+def get_name_and_notes_columns(df):
+    """Returns the names of the item name and notes columns"""
     # Heuristic: first two string columns
-    text_columns = df.select_dtypes(include='object').columns[:2]
-    name_col, notes_col = text_columns
+    return df.select_dtypes(include='object').columns[:2]
 
-    templates = []
 
-    def process_row(row):
-        item_name = row[name_col]
-        item_notes = row[notes_col]
-        item_path = row['Audio Path']
-        item_length = row['Length']
-        item_position = row['Position']
+def get_item_columns(df, guid_seed=None):
+    """Returns the item fields of every row as plain lists: names, paths, notes, lengths, positions, offsets, guids"""
+    name_col, notes_col = get_name_and_notes_columns(df)
+    # Offsets only exist when silence trimming ran
+    offsets = df['Offset'].tolist() if 'Offset' in df else [0] * len(df)
+    names = df[name_col].tolist()
+    return [names, df['Audio Path'].tolist(), df[notes_col].tolist(),
+            df['Length'].tolist(), df['Position'].tolist(), offsets, item_guids(names, guid_seed)]
 
-        return create_item_template_with_notes(item_name, item_path, item_notes,
-                                               item_length, item_position)
 
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        futures = [executor.submit(process_row, row) for _, row in df.iterrows()]
-        for future in concurrent.futures.as_completed(futures):
-            templates.append(future.result())
+def generate_item_templates_from_dataframe(df):
+    """Returns all item blocks joined as one string, in script order"""
+    return "\n".join(iter_item_templates_from_dataframe(df))
+
 
-    return "\n".join(templates)
+def iter_item_templates_from_dataframe(df, control=None, guid_seed=None):
+    """Yields the item blocks one by one in script order, for the streaming writer"""
+    return iter_rendered_items(*get_item_columns(df, guid_seed), control=control)
 
 
 # Functions to export .rpp file
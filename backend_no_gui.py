@@ -1,11 +1,16 @@
-﻿from pydub import AudioSegment
-import pandas as pd
-import os
+﻿import os
+import sys
 from pathlib import Path
-import concurrent
-from uuid import uuid4
-from random import randint
-from concurrent.futures import ThreadPoolExecutor
+from duration_cache import get_audio_info
+from audio_scanner import scan_audio_directory
+from audio_index import get_audio_index, match_rows
+from rpp_writer import write_project_to_directory
+from item_renderer import iter_rendered_items
+from layout import compute_positions, DEFAULT_START, DEFAULT_GAP
+from script_session import ScriptSession
+from side_file import write_xlsx
+from rpp_templates import (generate_random_uuid, create_empty_project_template, create_empty_track_template,
+                           create_item_template_with_notes)
 
 
 # Functions for Dataframe
@@ -44,12 +49,7 @@ def get_directory_path(path_to_where):
 
 def get_wav_file_paths_list(directory_path):
     """Returns a list with full wav file paths contained in a directory and its subdirectories"""
-    wav_file_paths = []
-    for root, _, files in os.walk(directory_path):
-        for file in files:
-            if file.endswith('.wav'):
-                wav_file_paths.append(os.path.join(root, file))
-    return wav_file_paths
+    return scan_audio_directory(directory_path)
 
 
 def export_dataframe_to_excel_file(df, filename, directory):
@@ -59,40 +59,37 @@ def export_dataframe_to_excel_file(df, filename, directory):
         filename += '.xlsx'
 
     file_path = os.path.join(directory, filename)
-    df.to_excel(file_path, index=False, engine='openpyxl')
+    write_xlsx(df, file_path)
+    return file_path
 
 
-def new_frame_with_audio_paths(excel_file, list_of_columns, directory_path):
-    # Detect file extension
-    ext = os.path.splitext(excel_file)[1].lower()
+def new_frame_with_audio_paths(excel_file, list_of_columns, directory_path, session=None):
+    # Reuse the script already opened for validation when there is one
+    if session is None:
+        session = ScriptSession(excel_file)
 
-    # Read the file based on extension
-    if ext == '.xlsx':
-        df = pd.read_excel(excel_file, engine='openpyxl')
-    elif ext == '.xls':
-        df = pd.read_excel(excel_file, engine='xlrd')
-    elif ext == '.csv':
-        df = pd.read_csv(excel_file)
-    else:
-        raise ValueError(f"Unsupported file extension: {ext}")
-
-    # Filter DataFrame with only specified columns
-    df = df[list_of_columns]
+    # Parse only the specified columns (cached between runs while the script is unchanged)
+    df = session.read_columns(list_of_columns)
 
     # print("Checkpoint 1")
 
-    # Get list of wav file paths
-    wav_file_paths = get_wav_file_paths_list(directory_path)
+    # Bring the persistent audio library index up to date (only changed folders are listed)
+    audio_index = get_audio_index(directory_path, get_audio_info)
+    audio_index.refresh()
 
     # print("Checkpoint 2")
 
     # Map filenames to paths
-    filename_to_path = {os.path.basename(path): path for path in wav_file_paths if path is not None}
+    # Exact names first, then keys that ignore case, Unicode composition, spaces and the extension
+    # Rows without audio get the closest library filenames as suggestions
+    rows = match_rows(audio_index, df.iloc[:, 0])
 
     # print("Checkpoint 3")
 
-    # Add audio path column, defaulting to None if not found
-    df['Audio Path'] = df.iloc[:, 0].apply(lambda x: filename_to_path.get(x, None))
+    # Add audio path column, None if not found
+    df['Audio Path'] = rows.paths
+    df['Match'] = rows.kinds
+    df['Suggestions'] = rows.suggestions
 
     # print("Checkpoint 4")
 
@@ -101,10 +98,12 @@ def new_frame_with_audio_paths(excel_file, list_of_columns, directory_path):
 
     # print("Checkpoint 5")
 
-    # Add length column, defaulting to None if path is None
+    # Add length column, defaulting to None if path is None. Unchanged files come from the cache
 
-    with ThreadPoolExecutor() as executor:
-        df['Length'] = list(executor.map(lambda path: get_length(path) if path else None, df['Audio Path']))
+    duration_cache = audio_index.duration_cache
+    duration_cache.reset_stats()
+    df['Length'] = duration_cache.get_lengths(df['Audio Path'].tolist())
+    print(duration_cache.stats_text())
 
     # print("Checkpoint 6")
 
@@ -120,31 +119,21 @@ def new_frame_with_audio_paths(excel_file, list_of_columns, directory_path):
 
 
 def get_length(file_path):
-    audio = AudioSegment.from_file(file_path)
-    length = audio.duration_seconds
-    return length
-
-
-def assign_positions(df, length_column='Length', separation=4):
-    # Initialize position tracker
-    current_position = 5
-
-    # Create a list to store positions
-    positions = []
+    """Returns the audio duration in seconds"""
+    return get_audio_info(file_path).duration
 
-    for index, row in df.iterrows():
-        length = row[length_column]
 
-        # If length is None, use a default value (e.g., 0)
-        if length is None:
-            length = 0
+def assign_positions(df, length_column='Length', separation=DEFAULT_GAP, start=DEFAULT_START, gap_column=None,
+                     missing_length=0, grid=None, sample_rate=None):
+    """Adds the 'Position' column. See layout.compute_positions for the options"""
+    import pandas as pd
 
-        # Calculate position
-        positions.append(current_position)
-        current_position += length + separation
+    # Missing lengths (None, NaN or placeholder text) take missing_length on the timeline
+    lengths = pd.to_numeric(df[length_column], errors='coerce').to_numpy(dtype=float)
+    gaps = pd.to_numeric(df[gap_column], errors='coerce').to_numpy(dtype=float) if gap_column else None
 
-    # Add positions to DataFrame
-    df['Position'] = positions
+    df['Position'] = compute_positions(lengths, start=start, gap=separation, gaps=gaps,
+                                       missing_length=missing_length, grid=grid, sample_rate=sample_rate)
     return df
 
 
@@ -157,9 +146,9 @@ def create_dataframe_for_rec():
     # audio location
     audios_location = ""
 
-    # dataframe with filename and localized text
-    df = pd.read_excel(rec_script_path)
-    columns = df.columns.tolist()
+    # recording script, opened once for the header check and the processing
+    session = ScriptSession(rec_script_path)
+    columns = session.headers
 
     # User needed columns
     user_columns = []
@@ -203,7 +192,7 @@ def create_dataframe_for_rec():
 
     # print("HASTA ACA")
 
-    new_data = new_frame_with_audio_paths(rec_script_path, user_columns, audios_location)
+    new_data = new_frame_with_audio_paths(rec_script_path, user_columns, audios_location, session)
 
     # print("HASTA ACA")
 
@@ -233,187 +222,6 @@ def set_project_samplerate():
             print("Invalid input. Please enter one of the specified rates.")
 
 
-def generate_random_uuid():
-    """Creates a unique random ID"""
-
-    id1 = str(uuid4()).upper()
-    return id1
-
-
-def create_empty_project_template(sample_rate):
-    """Create the structure of a Reaper project as text. Returns a string"""
-
-    empty_template = f"""<REAPER_PROJECT 0.1 "7.39/win64" {randint(1747000000, 9999999999)}
-  RIPPLE 0 0
-  GROUPOVERRIDE 0 0 0
-  AUTOXFADE 129
-  ENVATTACH 0
-  POOLEDENVATTACH 0
-  MIXERUIFLAGS 11 48
-  PEAKGAIN 1
-  FEEDBACK 0
-  PANLAW 1
-  PROJOFFS 0 0 0
-  MAXPROJLEN 0 600
-  GRID 3198 8 1 8 1 0 0 0
-  TIMEMODE 1 5 -1 30 0 0 -1
-  VIDEO_CONFIG 0 0 256
-  PANMODE 3
-  CURSOR 0
-  ZOOM 1
-  VZOOMEX 5 0
-  USE_REC_CFG 0
-  RECMODE 1
-  SMPTESYNC 0 30 100 40 1000 300 0 0 1 0 0
-  MIDIEDITOR -10197916 0 0
-  LOOP 0
-  LOOPGRAN 0 4
-  RECORD_PATH "" ""
-  <RECORD_CFG
-    ZXZhdxgBAA==
-  >
-  <APPLYFX_CFG
-  >
-  RENDER_FILE ""
-  RENDER_PATTERN ""
-  RENDER_FMT 0 1 48000
-  RENDER_1X 0
-  RENDER_RANGE 1 0 0 2 0
-  RENDER_RESAMPLE 3 0 1
-  RENDER_ADDTOPROJ 0
-  RENDER_STEMS 6
-  RENDER_DITHER 0
-  RENDER_TRIM 0 0 0 0
-  TIMELOCKMODE 1
-  TEMPOENVLOCKMODE 1
-  ITEMMIX 0
-  DEFPITCHMODE 1 0
-  TAKELANE 1
-  SAMPLERATE {sample_rate} 1 0
-  <RENDER_CFG
-    ZXZhdxgDAA==
-  >
-  LOCK 1
-  <METRONOME 6 2
-    VOL 0.25 0.125
-    BEATLEN 4
-    FREQ 800 1600 1
-    SAMPLES "" "" "" ""
-    SPLIGNORE 0 0
-    SPLDEF 2 660 "" 0 ""
-    SPLDEF 3 440 "" 0 ""
-    PATTERN 0 169
-    PATTERNSTR ABBB
-    MULT 1
-  >
-  GLOBAL_AUTO -1
-  TEMPO 120 4 4 0
-  PLAYRATE 1 0 0.25 4
-  SELECTION 0 0
-  SELECTION2 0 0
-  MASTERAUTOMODE 0
-  MASTERTRACKHEIGHT 0 0
-  MASTERPEAKCOL 16576
-  MASTERMUTESOLO 0
-  MASTERTRACKVIEW 0 0.6667 0.5 0.5 0 0 0 0 0 0 0 0 0 0
-  MASTERHWOUT 0 0 1 0 0 0 0 -1
-  MASTER_NCH 2 2
-  MASTER_VOLUME 1 0 -1 -1 1
-  MASTER_PANMODE 3
-  MASTER_FX 1
-  MASTER_SEL 0
-  <MASTERPLAYSPEEDENV
-    EGUID {{{generate_random_uuid()}}}
-    ACT 0 -1
-    VIS 0 1 1
-    LANEHEIGHT 0 0
-    ARM 0
-    DEFSHAPE 0 -1 -1
-  >
-  <TEMPOENVEX
-    EGUID {{{generate_random_uuid()}}}
-    ACT 1 -1
-    VIS 1 0 1
-    LANEHEIGHT 0 0
-    ARM 0
-    DEFSHAPE 1 -1 -1
-  >
-  <PROJBAY
-  >
-  <EXTENSIONS
-  >
->"""
-    return empty_template
-
-
-def create_empty_track_template(track_name):
-    """Create the structure of an empty track as text"""
-
-    track_id = generate_random_uuid()
-
-    empty_track_template = f"""<TRACK {{{track_id}}}
-    NAME {track_name}
-    PEAKCOL 16576
-    BEAT -1
-    AUTOMODE 0
-    PANLAWFLAGS 3
-    VOLPAN 1 0 -1 -1 1
-    MUTESOLO 0 0 0
-    IPHASE 0
-    PLAYOFFS 0 1
-    ISBUS 0 0
-    BUSCOMP 0 0 0 0 0
-    SHOWINMIX 1 0.6667 0.5 1 0.5 0 0 0
-    FIXEDLANES 9 0 0 0 0
-    SEL 0
-    REC 0 0 0 0 0 0 0 0
-    VU 2
-    TRACKHEIGHT 0 0 0 0 0 0 0
-    INQ 0 0 0 0.5 100 0 0 100
-    NCHAN 2
-    FX 1
-    TRACKID {{{track_id}}}
-    PERF 0
-    MIDIOUT -1
-    MAINSEND 1 0
->"""
-    return empty_track_template
-
-
-def create_item_template_with_notes(filename, file_path, text_notes, length, position):
-    item_iguid = generate_random_uuid()
-    item_guid = generate_random_uuid()
-
-    item_template = f"""    <ITEM
-      POSITION {position}
-      SNAPOFFS 0
-      LENGTH {length}
-      LOOP 1
-      ALLTAKES 0
-      FADEIN 1 0 0 1 0 0 0
-      FADEOUT 1 0 0 1 0 0 0
-      MUTE 0 0
-      SEL 0
-      IGUID {{{item_iguid}}}
-      IID 1
-      <NOTES
-        |{text_notes}
-      >
-      IMGRESOURCEFLAGS 0
-      NOTESWND 544 398 1043 795
-      NAME {filename}
-      VOLPAN 1 0 1 -1
-      SOFFS 0
-      PLAYRATE 1 1 0 -1 0 0.0025
-      CHANMODE 0
-      GUID {{{item_guid}}}
-      <SOURCE WAVE
-        FILE "{file_path}"
-      >
-    >"""
-    return item_template
-
-
 def add_track_to_project(project, empty_track):
     insert_point = project.find("<EXTENSIONS\n  >")
     if insert_point != -1:
@@ -434,29 +242,22 @@ def add_items_to_track(project_w_track, item_as_text):
     return None
 
 
-def generate_item_templates_from_dataframe(df):
+def get_item_columns(df):
+    """Returns the item fields of every row as plain lists: names, paths, notes, lengths, positions"""
     # Heuristic: first two string columns
-    text_columns = df.select_dtypes(include='object').columns[:2]
-    name_col, notes_col = text_columns
+    name_col, notes_col = df.select_dtypes(include='object').columns[:2]
+    return [df[name_col].tolist(), df['Audio Path'].tolist(), df[notes_col].tolist(),
+            df['Length'].tolist(), df['Position'].tolist()]
 
-    templates = []
 
-    def process_row(row):
-        item_name = row[name_col]
-        item_notes = row[notes_col]
-        item_path = row['Audio Path']
-        item_length = row['Length']
-        item_position = row['Position']
-
-        return create_item_template_with_notes(item_name, item_path, item_notes,
-                                               item_length, item_position)
+def generate_item_templates_from_dataframe(df):
+    """Returns all item blocks joined as one string, in script order"""
+    return "\n".join(iter_item_templates_from_dataframe(df))
 
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        futures = [executor.submit(process_row, row) for _, row in df.iterrows()]
-        for future in concurrent.futures.as_completed(futures):
-            templates.append(future.result())
 
-    return "\n".join(templates)
+def iter_item_templates_from_dataframe(df):
+    """Yields the item blocks one by one in script order, for the streaming writer"""
+    return iter_rendered_items(*get_item_columns(df))
 
 
 # Functions to export .rpp file
@@ -479,16 +280,21 @@ def export_to_directory(text, filename, directory):
 
 
 # Execution
-chosen_sample_rate = set_project_samplerate()
-project_info = create_dataframe_for_rec()
-empty_project = create_empty_project_template(chosen_sample_rate)
-# print(empty_project)
-new_track = create_empty_track_template("Source_Reference")
-# print(new_track)
-project_with_track = add_track_to_project(empty_project, new_track)
-# print(project_with_track)
-new_items_template = generate_item_templates_from_dataframe(project_info[0])
-# print(new_items_template)
-reaper_project_as_text = add_items_to_track(project_with_track, new_items_template)
-# print(reaper_project_as_text)
-export_to_directory(reaper_project_as_text, f"{project_info[2]}.rpp", project_info[1])
+def main():
+    chosen_sample_rate = set_project_samplerate()
+    project_info = create_dataframe_for_rec()
+    empty_project = create_empty_project_template(chosen_sample_rate)
+    # print(empty_project)
+    new_track = create_empty_track_template("Source_Reference")
+    # print(new_track)
+    # Items are streamed straight to the file instead of being spliced into the project string
+    new_items = iter_item_templates_from_dataframe(project_info[0])
+    write_project_to_directory(empty_project, new_track, new_items, f"{project_info[2]}.rpp", project_info[1])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Non-interactive batch mode: python backend_no_gui.py manifest.json [--workers N]
+        from batch import main as batch_main
+        sys.exit(batch_main(sys.argv[1:]))
+    main()
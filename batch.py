@@ -0,0 +1,218 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from side_file import DEFAULT_SIDE_FILE_FORMAT, check_side_file_format
+from sharding import ShardOptions, check_shard_options
+from silence_trim import TrimOptions, check_trim_options
+from layout import LayoutOptions, check_layout_options
+
+# Non-interactive batch mode: many scripts per invocation.
+#
+#     python batch.py manifest.json [--workers N]
+#
+# The manifest is a JSON list of objects, or a CSV file with a header row, with the keys
+#     script, audio_root, filename_column, notes_column, sample_rate
+# and optionally side_file (xlsx, csv, parquet or none, default xlsx), the sharding limits
+# max_items, max_length (seconds of timeline) and group_column, update (true to update an
+# existing project in place), peaks (true to write REAPER peak files) and trim (true to trim the
+# silence around every take, with optional trim_threshold in dBFS and trim_padding in seconds) and
+# guid_seed (any text, derives every GUID from it so that reruns give byte-identical projects).
+# The layout takes layout_start and layout_gap (seconds), gap_column (script column with one gap
+# per row), missing_length (seconds reserved for missing files), grid (seconds to snap to) and snap
+# (true to snap every position to a whole sample at the job's sample rate).
+# Jobs whose inputs did not change since their last build reuse its outputs unless force is true.
+#
+# Every audio root is indexed and probed once in the parent process before the jobs start, so the
+# workers share one up-to-date audio index and duration cache instead of rescanning per script.
+
+MANIFEST_KEYS = ("script", "audio_root", "filename_column", "notes_column", "sample_rate")
+
+
+def read_manifest(manifest_path):
+    """Returns the list of job dicts from a JSON or CSV manifest"""
+    if manifest_path.lower().endswith('.csv'):
+        with open(manifest_path, newline='', encoding='utf-8-sig') as f:
+            jobs = list(csv.DictReader(f))
+    else:
+        with open(manifest_path, encoding='utf-8') as f:
+            jobs = json.load(f)
+
+    for number, job in enumerate(jobs, start=1):
+        missing = [key for key in MANIFEST_KEYS if not job.get(key)]
+        if missing:
+            raise ValueError(f"Manifest job {number} is missing {', '.join(missing)}")
+        job["sample_rate"] = str(job["sample_rate"])
+        job["side_file"] = job.get("side_file") or DEFAULT_SIDE_FILE_FORMAT
+        job["update"] = str(job.get("update", "")).strip().lower() in ("1", "true", "yes")
+        job["peaks"] = str(job.get("peaks", "")).strip().lower() in ("1", "true", "yes")
+        job["force"] = str(job.get("force", "")).strip().lower() in ("1", "true", "yes")
+        job["guid_seed"] = str(job["guid_seed"]) if job.get("guid_seed") not in (None, "") else None
+        job["trim_options"] = None
+        if str(job.get("trim", "")).strip().lower() in ("1", "true", "yes"):
+            defaults = TrimOptions()
+            try:
+                job["trim_options"] = TrimOptions(
+                    float(job["trim_threshold"]) if job.get("trim_threshold") not in (None, "") else defaults.threshold_db,
+                    float(job["trim_padding"]) if job.get("trim_padding") not in (None, "") else defaults.padding)
+            except ValueError:
+                raise ValueError(f"Manifest job {number} has a non numeric trim_threshold or trim_padding")
+        defaults = LayoutOptions()
+        try:
+            job["layout_options"] = LayoutOptions(
+                float(job["layout_start"]) if job.get("layout_start") not in (None, "") else defaults.start,
+                float(job["layout_gap"]) if job.get("layout_gap") not in (None, "") else defaults.gap,
+                job.get("gap_column") or None,
+                float(job["missing_length"]) if job.get("missing_length") not in (None, "") else defaults.missing_length,
+                float(job["grid"]) if job.get("grid") not in (None, "") else None,
+                str(job.get("snap", "")).strip().lower() in ("1", "true", "yes"))
+        except ValueError:
+            raise ValueError(f"Manifest job {number} has a non numeric layout_start, layout_gap, missing_length or grid")
+        try:
+            job["shard_options"] = ShardOptions(int(job["max_items"]) if job.get("max_items") else None,
+                                                float(job["max_length"]) if job.get("max_length") else None,
+                                                job.get("group_column") or None)
+        except ValueError:
+            raise ValueError(f"Manifest job {number} has a non numeric max_items or max_length")
+    return jobs
+
+
+def validate_job(job):
+    """Returns an error message for a job that cannot run, or None"""
+    from backend import validate_directory, validate_sample_rate
+    from script_session import strip_quotes
+
+    if not os.path.isfile(strip_quotes(job["script"])):
+        return "Invalid script file path."
+    if not validate_directory(job["audio_root"]):
+        return "Invalid audio file location."
+    if not validate_sample_rate(job["sample_rate"]):
+        return "Invalid sample rate."
+    try:
+        check_side_file_format(job["side_file"])
+        check_shard_options(job["shard_options"])
+        check_trim_options(job["trim_options"])
+        check_layout_options(job["layout_options"])
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+def prepare_audio_roots(jobs):
+    """Refreshes the index of every audio root once and probes every file the jobs reference"""
+    from backend import get_audio_info
+    from audio_index import get_audio_index
+    from script_session import ScriptSession, strip_quotes
+
+    jobs_by_root = {}
+    for job in jobs:
+        jobs_by_root.setdefault(os.path.abspath(strip_quotes(job["audio_root"])), []).append(job)
+
+    for audio_root, root_jobs in jobs_by_root.items():
+        audio_index = get_audio_index(audio_root, get_audio_info)
+        listed, unchanged = audio_index.refresh()
+        print(f"Indexed {audio_root}: {listed} folders listed, {unchanged} unchanged")
+
+        wanted_filenames = set()
+        for job in root_jobs:
+            try:
+                with ScriptSession(job["script"]) as session:
+                    # Same selection as the job itself, so the worker gets a parse cache hit
+                    columns = [job["filename_column"], job["notes_column"]]
+                    for column in (job["shard_options"].group_column, job["layout_options"].gap_column):
+                        if column and column not in columns:
+                            columns.append(column)
+                    df = session.read_columns(columns)
+                wanted_filenames.update(df.iloc[:, 0])
+            except Exception:
+                # Reported by the job itself
+                continue
+
+        duration_cache = audio_index.duration_cache
+        duration_cache.reset_stats()
+        duration_cache.get_lengths([path for path, _ in audio_index.match(wanted_filenames).values()])
+        print(duration_cache.stats_text())
+
+
+def run_job(job):
+    """Runs one manifest job in a worker process. Returns a result dict, never raises"""
+    from backend import build_project
+    from script_session import strip_quotes
+
+    start_time = time.time()
+    result = {"script": job["script"], "ok": False, "rows": 0, "not_found": 0, "rpp_path": "", "error": ""}
+    try:
+        summary = build_project(strip_quotes(job["script"]), strip_quotes(job["audio_root"]), job["sample_rate"],
+                                job["filename_column"], job["notes_column"], refresh_index=False,
+                                side_file_format=job["side_file"], shard_options=job["shard_options"],
+                                update_existing=job["update"], build_peaks=job["peaks"],
+                                trim_options=job["trim_options"], guid_seed=job["guid_seed"],
+                                use_output_cache=not job["force"], layout_options=job["layout_options"])
+        result.update(summary)
+        result["ok"] = True
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+    result["seconds"] = time.time() - start_time
+    return result
+
+
+def print_summary(results):
+    print("\nBatch summary")
+    for number, result in enumerate(results, start=1):
+        status = "OK  " if result["ok"] else "FAIL"
+        detail = (f"{result['rows']} items, {result['not_found']} not found -> {result['rpp_path']}"
+                  f"{' (unchanged)' if result.get('cached') else ''}" if result["ok"] else result["error"])
+        print(f"{number:>3} {status} {result.get('seconds', 0):7.2f}s  {result['script']}: {detail}")
+    failed = sum(1 for result in results if not result["ok"])
+    print(f"{len(results) - failed} succeeded, {failed} failed")
+
+
+def run_batch(jobs, workers=None):
+    """Runs all jobs in parallel processes. Returns the result dicts in manifest order"""
+    results = [None] * len(jobs)
+    runnable = []
+    for position, job in enumerate(jobs):
+        error = validate_job(job)
+        if error:
+            results[position] = {"script": job["script"], "ok": False, "rows": 0, "not_found": 0,
+                                 "rpp_path": "", "error": error}
+        else:
+            runnable.append(position)
+
+    if runnable:
+        prepare_audio_roots([jobs[position] for position in runnable])
+        # Spawned (not forked) workers open their own SQLite connections instead of inheriting the parent's
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            for position, result in zip(runnable, executor.map(run_job, [jobs[position] for position in runnable])):
+                results[position] = result
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate .rpp projects for every job in a manifest")
+    parser.add_argument("manifest", help="JSON or CSV file listing the jobs")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = read_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"Error reading manifest: {e}")
+        return 2
+
+    start_time = time.time()
+    results = run_batch(jobs, args.workers)
+    print_summary(results)
+    print(f"Elapsed time {time.time() - start_time}")
+    return 0 if all(result["ok"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
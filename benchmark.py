@@ -0,0 +1,147 @@
+import os
+import sys
+import time
+import wave
+import tempfile
+import argparse
+
+from wav_probe import get_wav_duration
+from item_renderer import iter_rendered_items
+from rpp_templates import create_item_template_with_notes
+
+# Micro benchmarks of single pipeline steps. Run with: python benchmark.py [--files N] [--seconds S] [--rows N ...]
+# The end-to-end benchmark with a stored baseline is pipeline_benchmark.py
+
+
+def write_test_wav(file_path, seconds, sample_rate=48000, channels=2, sample_width=2):
+    """Writes a silent PCM WAV file of the given duration"""
+    frame_count = int(seconds * sample_rate)
+    with wave.open(file_path, 'wb') as w:
+        w.setnchannels(channels)
+        w.setsampwidth(sample_width)
+        w.setframerate(sample_rate)
+        w.writeframes(b"\x00" * (frame_count * channels * sample_width))
+    return file_path
+
+
+def time_call(function, items, repeat=1):
+    """Returns the best wall time of applying function to every item"""
+    best = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for item in items:
+            function(item)
+        elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def pydub_length(file_path):
+    from pydub import AudioSegment
+    return AudioSegment.from_file(file_path).duration_seconds
+
+
+def bench_duration_probe(file_count, seconds):
+    """Compares header-only WAV probing against a full pydub decode"""
+    print(f"\n== Duration probe: {file_count} files x {seconds}s stereo 48 kHz ==")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [write_test_wav(os.path.join(tmp, f"take_{i}.wav"), seconds) for i in range(file_count)]
+
+        header_time = time_call(get_wav_duration, paths, repeat=3)
+        print(f"wav_probe header read : {header_time:.4f}s ({file_count / header_time:,.0f} files/s)")
+
+        try:
+            import pydub  # noqa: F401
+        except ImportError:
+            print("pydub decode         : skipped (pydub not installed)")
+            return
+
+        decode_time = time_call(pydub_length, paths)
+        print(f"pydub full decode     : {decode_time:.4f}s ({file_count / decode_time:,.0f} files/s)")
+        print(f"speedup               : {decode_time / header_time:,.0f}x")
+
+
+def make_item_frame(row_count):
+    """Builds a processed frame like new_frame_with_audio_paths() returns"""
+    import pandas as pd
+    return pd.DataFrame({
+        "Filename": [f"line_{i:06d}.wav" for i in range(row_count)],
+        "Text": [f"Localized line number {i}" for i in range(row_count)],
+        "Audio Path": [f"D:/Delivery/VO/line_{i:06d}.wav" for i in range(row_count)],
+        "Length": [2.5] * row_count,
+        "Position": [5 + i * 6.5 for i in range(row_count)],
+    })
+
+
+def legacy_generate_item_templates(df):
+    """The original thread-pool renderer (unordered), kept here as the baseline"""
+    import concurrent.futures
+    name_col, notes_col = df.select_dtypes(include='object').columns[:2]
+
+    def process_row(row):
+        return create_item_template_with_notes(row[name_col], row['Audio Path'], row[notes_col],
+                                               row['Length'], row['Position'])
+
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        futures = [executor.submit(process_row, row) for _, row in df.iterrows()]
+        return "\n".join(future.result() for future in concurrent.futures.as_completed(futures))
+
+
+def bench_item_rendering(row_counts):
+    """Compares the ordered batch renderer against the original per-row thread-pool renderer"""
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        print("\n== Item rendering: skipped (pandas not installed) ==")
+        return
+    from backend import generate_item_templates_from_dataframe, get_item_columns
+
+    for row_count in row_counts:
+        print(f"\n== Item rendering: {row_count:,} rows ==")
+        df = make_item_frame(row_count)
+
+        legacy_time = time_call(legacy_generate_item_templates, [df])
+        print(f"thread pool + iterrows : {legacy_time:.3f}s")
+
+        batch_time = time_call(generate_item_templates_from_dataframe, [df])
+        print(f"batch renderer         : {batch_time:.3f}s ({legacy_time / batch_time:.1f}x)")
+
+        columns = get_item_columns(df)
+        process_time = time_call(lambda cols: "\n".join(iter_rendered_items(*cols, use_processes=True)), [columns])
+        print(f"batch + process pool   : {process_time:.3f}s ({legacy_time / process_time:.1f}x)")
+
+
+def bench_layout(row_count):
+    """Times the vectorized layout engine on a large frame"""
+    try:
+        import numpy as np
+    except ImportError:
+        print("\n== Layout: skipped (numpy not installed) ==")
+        return
+    from layout import compute_positions
+
+    print(f"\n== Layout: {row_count:,} rows ==")
+    lengths = np.random.default_rng(0).uniform(0.5, 10, row_count)
+    lengths[::50] = np.nan
+    plain_time = time_call(compute_positions, [lengths], repeat=3)
+    print(f"cumulative sum         : {plain_time * 1000:.1f} ms")
+    snapped_time = time_call(lambda values: compute_positions(values, sample_rate=48000), [lengths], repeat=3)
+    print(f"snapped to samples     : {snapped_time * 1000:.1f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rec_script_to_Rpp benchmarks")
+    parser.add_argument("--files", type=int, default=50, help="number of audio files to generate")
+    parser.add_argument("--seconds", type=float, default=30, help="duration of each generated file")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="frame sizes for the item rendering benchmark")
+    args = parser.parse_args(argv)
+
+    bench_duration_probe(args.files, args.seconds)
+    bench_item_rendering(args.rows)
+    bench_layout(1000000)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
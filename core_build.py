@@ -0,0 +1,211 @@
+import os
+import csv
+import sys
+import time
+import argparse
+
+from audio_index import get_audio_index, match_rows
+from duration_cache import get_audio_info
+from layout import compute_positions, position_settings
+from pipeline import ProbePipeline, StreamingProjectWriter
+from rpp_templates import create_empty_project_template, create_empty_track_template, SOURCE_REFERENCE_TRACK
+from run_control import RunControl, report_progress
+from run_report import report_stage, add_stage, finish_report
+from script_session import strip_quotes
+from side_file import side_file_path
+
+# Lightweight build of one project from a CSV script, without importing pandas (or pydub for WAV
+# libraries). The script is read with the csv module, the durations come from the WAV headers through
+# the audio index and duration cache, and the project is written by pipeline.StreamingProjectWriter
+# exactly as backend.build_project() writes a plain single project.
+#
+#     python core_build.py script.csv D:/Delivery/VO Filename Notes [--sample-rate 48000]
+#
+# Only the plain case is covered: no xlsx scripts or side files, sharding, updates, peaks, trimming,
+# gap column or output cache. Cell values stay text (pandas would turn numeric columns into numbers),
+# empty cells are NaN as in the pandas path. Matching and suggestions are audio_index.match_rows(),
+# the same as in backend.
+
+CORE_SIDE_FILE_FORMATS = ("csv", "none")
+SAMPLE_RATES = ("44100", "48000", "96000")
+
+
+def read_csv_columns(script_path, columns):
+    """Returns one list of values per requested column, in script order"""
+    with open(script_path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        headers = next(reader, [])
+        missing = [column for column in columns if column not in headers]
+        if missing:
+            raise KeyError(f"{missing} not in script headers")
+        indexes = [headers.index(column) for column in columns]
+        values = [[] for _ in columns]
+        for row in reader:
+            # pandas skips blank lines too
+            if not row:
+                continue
+            for column_values, index in zip(values, indexes):
+                cell = row[index] if index < len(row) else ""
+                column_values.append(cell if cell != "" else float('nan'))
+    return values
+
+
+def write_csv_side_file(script_path, headers, columns, directory, side_file_format="csv"):
+    """Writes the columns as Dataframe_<script>.csv the way side_file.write_csv does. Returns its path"""
+    file_path = side_file_path(script_path, side_file_format, directory)
+    if file_path is None:
+        return None
+
+    partial_path = file_path + ".part"
+    try:
+        # utf-8-sig so that Excel opens accented notes correctly
+        with open(partial_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            writer.writerow(headers)
+            for row in zip(*columns):
+                writer.writerow(["" if value is None or value != value else value for value in row])
+        os.replace(partial_path, file_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return file_path
+
+
+def build_csv_project(script_path, audio_path, sample_rate, filename_column, notes_column, refresh_index=True,
+                      control=None, side_file_format="csv", guid_seed=None, layout_options=None):
+    """Generates <script>.rpp (and the CSV side file) for a CSV script. Returns a summary dict like
+    backend.build_project(). control is an optional RunControl, guid_seed and layout_options
+    (layout.LayoutOptions without gap column) as in build_project()"""
+    script_path = strip_quotes(script_path)
+    if os.path.splitext(script_path)[1].lower() != '.csv':
+        raise ValueError("The core build only reads CSV scripts")
+    if side_file_format not in CORE_SIDE_FILE_FORMATS:
+        raise ValueError(f"Unknown side file format '{side_file_format}', use one of {', '.join(CORE_SIDE_FILE_FORMATS)}")
+    if layout_options is not None and layout_options.gap_column:
+        raise ValueError("The core build does not read a gap column")
+    settings = position_settings(layout_options, sample_rate)
+
+    # Same outputs as backend.project_location(): the script's folder and name up to the first dot
+    directory, project_name = os.path.dirname(script_path), os.path.basename(script_path).split(".")[0]
+    project_seed = None if guid_seed is None else f"{guid_seed}/{project_name}"
+    writer = StreamingProjectWriter(create_empty_project_template(sample_rate, project_seed),
+                                    create_empty_track_template(SOURCE_REFERENCE_TRACK, project_seed),
+                                    f"{project_name}.rpp", directory, guid_seed=project_seed, control=control,
+                                    **settings)
+
+    report_progress(control, "Reading script")
+    with report_stage(control, "Script read") as record:
+        names, notes = read_csv_columns(script_path, [str(filename_column), str(notes_column)])
+        record.items = len(names)
+        record.bytes_read = os.path.getsize(script_path)
+
+    audio_index = get_audio_index(audio_path, get_audio_info)
+    try:
+        probes = ProbePipeline(audio_index.duration_cache, names, audio_index.extensions)
+        try:
+            rows, lengths = _probe_rows(names, notes, audio_index, probes, refresh_index, control, writer)
+        finally:
+            probes.close()
+
+        report_progress(control, "Layout")
+        with report_stage(control, "Layout") as record:
+            positions = compute_positions([float('nan') if length is None else length for length in lengths],
+                                          **settings)
+            record.items = len(positions)
+
+        report_progress(control, "Writing project")
+        with report_stage(control, "Side file export") as record:
+            side_file = write_csv_side_file(
+                script_path, [str(filename_column), str(notes_column), 'Audio Path', 'Match', 'Suggestions', 'Length',
+                              'Position'],
+                [names, notes, ['Not Found' if path is None else path for path in rows.paths], rows.kinds,
+                 rows.suggestions, ['Not Generated' if length is None else length for length in lengths],
+                 positions.tolist()],
+                directory, side_file_format)
+            record.items = len(names) if side_file else 0
+            record.bytes_written = os.path.getsize(side_file) if side_file else 0
+            record.details["format"] = side_file_format
+
+        rpp_path = writer.finish()
+    except BaseException:
+        writer.abort()
+        raise
+    for record in writer.stage_records():
+        add_stage(control, record)
+
+    summary = {"rows": len(names),
+               "not_found": len(rows.missing),
+               "rpp_path": rpp_path,
+               "shard_paths": [rpp_path],
+               "changes": None,
+               "peaks": None,
+               "side_file_path": side_file,
+               "report_path": None,
+               "cached": False}
+    return finish_report(control, summary, directory, project_name)
+
+
+def _probe_rows(names, notes, audio_index, probes, refresh_index, control, writer):
+    """Scans, matches and probes like backend._frame_from_probes(), passing every length on to the writer.
+
+    Returns the audio_index.RowMatches and the length (None when not found) of every row.
+    """
+    duration_cache = audio_index.duration_cache
+    duration_cache.reset_stats()
+
+    with report_stage(control, "Audio scan") as record:
+        if refresh_index:
+            probes.prime(path for path, _ in audio_index.match(names).values())
+            listed, unchanged = audio_index.refresh(control=control, on_listed=probes.on_listed)
+            record.items = listed + unchanged
+            record.details["folders_listed"] = listed
+            record.details["probes_started"] = len(probes.futures)
+
+    report_progress(control, "Matching filenames")
+    with report_stage(control, "Filename match") as record:
+        rows = match_rows(audio_index, names)
+        record.items = len(names)
+        record.details["found"] = len(names) - len(rows.missing)
+
+    with report_stage(control, "Duration probing") as record:
+        writer.begin(names, rows.paths, notes)
+        lengths = []
+        for length in probes.iter_lengths(rows.paths, control):
+            lengths.append(length)
+            writer.add(length)
+        print(duration_cache.stats_text())
+        record.items = duration_cache.hits + duration_cache.misses
+        record.bytes_read = duration_cache.bytes_read
+        record.details["cache_hits"] = duration_cache.hits
+        record.details["cache_misses"] = duration_cache.misses
+    return rows, lengths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the .rpp project for a CSV script without pandas")
+    parser.add_argument("script", help="CSV recording script")
+    parser.add_argument("audio_root", help="folder with the audio files")
+    parser.add_argument("filename_column", help="script column with the audio filenames")
+    parser.add_argument("notes_column", help="script column with the item notes")
+    parser.add_argument("--sample-rate", default="48000", choices=SAMPLE_RATES)
+    parser.add_argument("--side-file", default="csv", choices=CORE_SIDE_FILE_FORMATS)
+    parser.add_argument("--guid-seed", default=None, help="derive every GUID from this text (reproducible output)")
+    args = parser.parse_args(argv)
+
+    start_time = time.time()
+    control = RunControl()
+    try:
+        summary = build_csv_project(args.script, strip_quotes(args.audio_root), args.sample_rate,
+                                    args.filename_column, args.notes_column, control=control,
+                                    side_file_format=args.side_file, guid_seed=args.guid_seed)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}")
+        return 1
+    print(control.report.summary_text())
+    print(f"{summary['rows']} items, {summary['not_found']} not found -> {summary['rpp_path']}")
+    print(f"Elapsed time {time.time() - start_time}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import importlib
+from importlib import metadata
+
+# Startup dependency check for the GUI. Instead of running pip on every launch, the installed
+# versions are read with importlib.metadata and compared with requirements.txt. The result is
+# stored together with the hash of requirements.txt and the interpreter, so later launches only
+# confirm that the same versions are still installed. pip (through lib_installer) only runs
+# when a requirement is missing or older than requested. Pins (==) are treated as minimum
+# versions so that a newer install does not trigger pip on every launch.
+
+REQUIREMENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "requirements.txt")
+STATE_DIRNAME = ".rec_script_to_rpp_cache"
+STATE_FILENAME = "dependency_check.json"
+
+REQUIREMENT_RE = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*(?:(==|>=|~=)\s*([^\s;,#]+))?")
+
+
+def state_path(requirements_path=REQUIREMENTS_PATH):
+    return os.path.join(os.path.dirname(requirements_path), STATE_DIRNAME, STATE_FILENAME)
+
+
+def hash_requirements(requirements_path=REQUIREMENTS_PATH):
+    with open(requirements_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def parse_requirements(requirements_path=REQUIREMENTS_PATH):
+    """Returns (distribution name, minimum version or None) for every requirement line"""
+    requirements = []
+    with open(requirements_path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line or line.startswith("-"):
+                continue
+            match = REQUIREMENT_RE.match(line)
+            if match:
+                requirements.append((match.group(1), match.group(3)))
+    return requirements
+
+
+def _version_key(version):
+    """Numeric release segment of a version string, e.g. '2.2.3rc1' -> (2, 2, 3)"""
+    parts = []
+    for part in version.split("."):
+        digits = re.match(r"\d+", part)
+        if digits is None:
+            break
+        parts.append(int(digits.group(0)))
+        if digits.group(0) != part:
+            break
+    return tuple(parts)
+
+
+def installed_version(distribution):
+    try:
+        return metadata.version(distribution)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def find_unmet(requirements):
+    """Returns (unmet requirement texts, installed versions of the met ones)"""
+    unmet = []
+    installed = {}
+    for distribution, minimum in requirements:
+        version = installed_version(distribution)
+        if version is None:
+            unmet.append(f"{distribution} (missing)")
+        elif minimum is not None and _version_key(version) < _version_key(minimum):
+            unmet.append(f"{distribution} {version} < {minimum}")
+        else:
+            installed[distribution] = version
+    return unmet, installed
+
+
+def _load_state(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _store_state(path, state):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+    except OSError:
+        # Read-only install folders just check the versions on every launch
+        pass
+
+
+def check_dependencies(requirements_path=REQUIREMENTS_PATH, install=True):
+    """Makes sure the requirements are installed. Returns 'cached', 'checked' or 'installed'.
+
+    Raises RuntimeError when requirements are still unmet (after installing, if install is set).
+    """
+    requirements_hash = hash_requirements(requirements_path)
+    path = state_path(requirements_path)
+    state = _load_state(path)
+    if (state is not None and state.get("requirements_hash") == requirements_hash
+            and state.get("python") == sys.executable
+            and all(installed_version(name) == version for name, version in state.get("installed", {}).items())):
+        return "cached"
+
+    requirements = parse_requirements(requirements_path)
+    unmet, installed = find_unmet(requirements)
+    outcome = "checked"
+    if unmet and install:
+        print(f"Missing or outdated requirements: {', '.join(unmet)}")
+        from lib_installer import ensure_pip, install_requirements_file
+        ensure_pip()
+        install_requirements_file(requirements_path)
+        # The path finders cache directory listings, the new installs would not be seen
+        importlib.invalidate_caches()
+        unmet, installed = find_unmet(requirements)
+        outcome = "installed"
+    if unmet:
+        raise RuntimeError(f"Requirements not installed: {', '.join(unmet)}")
+
+    _store_state(path, {"requirements_hash": requirements_hash, "python": sys.executable, "installed": installed})
+    return outcome
@@ -0,0 +1,164 @@
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from wav_probe import probe_wav, WavProbeError
+
+# Persistent audio metadata cache stored as a SQLite sidecar next to the audio root.
+# Entries are keyed by (absolute path, size, mtime_ns), so a changed file is simply a miss.
+
+CACHE_SUFFIX = ".rec_script_to_rpp_cache.sqlite"
+
+# bytes_read is what the probe read from disk, 0 for entries served from the cache
+AudioInfo = namedtuple("AudioInfo", ["duration", "sample_rate", "channels", "bits_per_sample", "bytes_read"],
+                       defaults=[0])
+
+
+def get_audio_info(file_path):
+    """Returns duration, sample rate, channels and bit depth. Reads only the WAV header, decodes with pydub as a fallback"""
+    try:
+        info = probe_wav(file_path)
+        return AudioInfo(info.duration, info.sample_rate, info.channels, info.bits_per_sample, info.header_bytes)
+    except WavProbeError:
+        # pydub is only imported for files that are not plain WAV
+        from pydub import AudioSegment
+        audio = AudioSegment.from_file(file_path)
+        return AudioInfo(audio.duration_seconds, audio.frame_rate, audio.channels, audio.sample_width * 8,
+                         os.path.getsize(file_path))
+
+
+def get_cache_path(audio_root):
+    """Returns the sidecar path for an audio root, e.g. D:/Delivery/VO -> D:/Delivery/VO.rec_script_to_rpp_cache.sqlite.
+
+    The sidecar sits beside the root rather than inside it so that writing it does not change the
+    root folder's mtime. Drive roots have no parent, there the file goes inside the root.
+    """
+    audio_root = os.path.abspath(audio_root)
+    parent, name = os.path.split(audio_root)
+    if not name:
+        return os.path.join(audio_root, CACHE_SUFFIX)
+    return os.path.join(parent, name + CACHE_SUFFIX)
+
+
+class DurationCache:
+    """Duration/metadata cache for the audio files under one audio root"""
+
+    def __init__(self, audio_root, probe):
+        self.audio_root = os.path.abspath(audio_root)
+        self.probe = probe
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.lock = threading.Lock()
+        self.connection = self._connect()
+
+    def _connect(self):
+        cache_path = get_cache_path(self.audio_root)
+        try:
+            connection = sqlite3.connect(cache_path, check_same_thread=False, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._create_tables(connection)
+        except sqlite3.Error:
+            # Read-only shares: keep the cache for this run only
+            connection = sqlite3.connect(":memory:", check_same_thread=False)
+            self._create_tables(connection)
+        return connection
+
+    def _create_tables(self, connection):
+        connection.execute("""CREATE TABLE IF NOT EXISTS audio_info (
+                                  path TEXT PRIMARY KEY,
+                                  size INTEGER NOT NULL,
+                                  mtime_ns INTEGER NOT NULL,
+                                  duration REAL NOT NULL,
+                                  sample_rate INTEGER,
+                                  channels INTEGER,
+                                  bits_per_sample INTEGER)""")
+        connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _lookup(self, path, size, mtime_ns):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT size, mtime_ns, duration, sample_rate, channels, bits_per_sample "
+                "FROM audio_info WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return None
+        if row[0] != size or row[1] != mtime_ns:
+            # File changed since it was cached
+            self.evict([path])
+            return None
+        return AudioInfo(*row[2:])
+
+    def _store(self, path, size, mtime_ns, info):
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO audio_info VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                    (path, size, mtime_ns, info.duration, info.sample_rate,
+                                     info.channels, info.bits_per_sample))
+
+    def get_info(self, file_path):
+        """Returns the AudioInfo of a file, probing it only when the cached entry is stale or missing"""
+        path = os.path.abspath(file_path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.evict([path])
+            raise
+
+        info = self._lookup(path, stat.st_size, stat.st_mtime_ns)
+        if info is not None:
+            with self.lock:
+                self.hits += 1
+            return info
+
+        info = self.probe(path)
+        self._store(path, stat.st_size, stat.st_mtime_ns, info)
+        with self.lock:
+            self.misses += 1
+            self.bytes_read += info.bytes_read
+        return info
+
+    def get_lengths(self, paths, control=None):
+        """Returns the durations for a list of paths, None where the path is None.
+
+        control is an optional run_control.RunControl for progress and cancellation.
+        """
+        unique_paths = list({path for path in paths if path})
+        infos = {}
+        executor = ThreadPoolExecutor()
+        try:
+            futures = {executor.submit(self.get_info, path): path for path in unique_paths}
+            for done, future in enumerate(as_completed(futures), start=1):
+                infos[futures[future]] = future.result()
+                if control is not None:
+                    control.progress("Probing durations", done, len(unique_paths))
+        finally:
+            # On cancellation or error the probes that have not started yet are dropped
+            executor.shutdown(wait=True, cancel_futures=True)
+            with self.lock:
+                self.connection.commit()
+        return [infos[path].duration if path else None for path in paths]
+
+    def evict(self, paths):
+        """Removes the given paths from the cache"""
+        with self.lock:
+            self.connection.executemany("DELETE FROM audio_info WHERE path = ?",
+                                        [(os.path.abspath(path),) for path in paths])
+
+    def reset_stats(self):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+            self.bytes_read = 0
+
+    def stats_text(self):
+        return f"Duration cache: {self.hits} hits, {self.misses} misses"
@@ -0,0 +1,113 @@
+import difflib
+import unicodedata
+
+import numpy as np
+
+from audio_scanner import AUDIO_EXTENSIONS
+
+# Tolerant script-to-audio filename matching. normalize_filename() gives the lookup key used next
+# to the exact name: Unicode NFC (macOS deliveries are NFD), case folded, surrounding spaces and
+# the audio extension removed. For names that still do not match, TrigramIndex suggests the
+# closest library names. Its postings are numpy arrays built in one vectorized pass, so even a
+# 500k file library is indexed in a few seconds and each miss is answered in milliseconds.
+
+SUGGESTION_COUNT = 3
+# Best trigram matches that are ranked again with difflib before picking the suggestions
+RERANK_CANDIDATES = 20
+# Trigrams found in more than this share of the names are skipped when the name has rarer ones
+COMMON_TRIGRAM_SHARE = 0.05
+# ... but never below this many names, in a small library no trigram is common
+COMMON_TRIGRAM_MIN = 64
+# Suggestions below this difflib ratio are not worth showing
+MIN_SIMILARITY = 0.5
+
+
+def normalize_filename(name, extensions=AUDIO_EXTENSIONS):
+    """Returns the tolerant lookup key of a filename, or None for empty cells"""
+    if not isinstance(name, str):
+        return None
+    key = unicodedata.normalize("NFC", name.strip().casefold())
+    for extension in extensions:
+        if key.endswith(extension.casefold()):
+            key = key[:-len(extension)].rstrip()
+            break
+    return key
+
+
+def _padded(key):
+    # Two leading spaces so that the first characters get trigrams of their own
+    return f"  {key} "
+
+
+def _trigram_codes(text):
+    """Packs every trigram of text into one uint64 (three 21-bit code points)"""
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    return (codes[:-2] << np.uint64(42)) | (codes[1:-1] << np.uint64(21)) | codes[2:]
+
+
+class TrigramIndex:
+    """Trigram postings over normalized names, for 'did you mean' suggestions"""
+
+    def __init__(self, keys, names):
+        """keys: normalized names, names: the filename shown for each key"""
+        self.keys = list(keys)
+        self.names = list(names)
+        name_count = len(self.keys)
+        if name_count == 0:
+            self.codes = np.empty(0, dtype=np.uint64)
+            return
+
+        padded = [_padded(key) for key in self.keys]
+        lengths = np.fromiter((len(text) for text in padded), dtype=np.int64, count=name_count)
+        codes = _trigram_codes("".join(padded))
+        owner = np.repeat(np.arange(name_count, dtype=np.int64), lengths)
+        # Trigrams that would span two names are dropped
+        valid = owner[:-2] == owner[2:]
+        codes, owner = codes[valid], owner[:-2][valid]
+
+        # One stable sort groups the trigrams and keeps each posting list in name order,
+        # repeated trigrams of the same name are then adjacent
+        order = np.argsort(codes, kind='stable')
+        codes, owner = codes[order], owner[order]
+        first_of_code = np.concatenate(([True], codes[1:] != codes[:-1]))
+        keep = first_of_code | np.concatenate(([True], owner[1:] != owner[:-1]))
+        codes, owner, first_of_code = codes[keep], owner[keep], first_of_code[keep]
+
+        self.codes = codes[first_of_code]
+        self.postings = owner
+        self.offsets = np.concatenate((np.flatnonzero(first_of_code), [len(owner)]))
+        self.trigram_counts = np.bincount(self.postings, minlength=name_count)
+        self.common_limit = max(int(name_count * COMMON_TRIGRAM_SHARE), COMMON_TRIGRAM_MIN)
+
+    def suggest(self, key, count=SUGGESTION_COUNT):
+        """Returns up to count library names closest to a normalized key, best first"""
+        if key is None or len(self.codes) == 0:
+            return []
+        query_codes = np.unique(_trigram_codes(_padded(key)))
+        positions = np.searchsorted(self.codes, query_codes)
+        found = positions < len(self.codes)
+        found[found] = self.codes[positions[found]] == query_codes[found]
+        positions = positions[found]
+        if positions.size == 0:
+            return []
+
+        posting_lengths = self.offsets[positions + 1] - self.offsets[positions]
+        rare = positions[posting_lengths <= self.common_limit]
+        suggestions = self._rank(key, len(query_codes), rare, count) if rare.size else []
+        # The rare trigrams may only lead to unrelated names, then all of the key's trigrams are used
+        if not suggestions and rare.size < positions.size:
+            suggestions = self._rank(key, len(query_codes), positions, count)
+        return suggestions
+
+    def _rank(self, key, query_count, positions, count):
+        """Returns the best names among the ones sharing the trigrams at positions"""
+        candidates, shared = np.unique(np.concatenate([self.postings[self.offsets[position]:self.offsets[position + 1]]
+                                                       for position in positions]), return_counts=True)
+
+        # Jaccard similarity of the trigram sets
+        scores = shared / (query_count + self.trigram_counts[candidates] - shared)
+        best = candidates[np.argsort(-scores)[:RERANK_CANDIDATES]]
+
+        ranked = sorted(((difflib.SequenceMatcher(None, key, self.keys[candidate]).ratio(), self.names[candidate])
+                         for candidate in best), reverse=True)
+        return [name for ratio, name in ranked[:count] if ratio >= MIN_SIMILARITY]
@@ -0,0 +1,327 @@
+import customtkinter as ctk
+import subprocess
+import sys
+import queue
+import threading
+from backend import *
+from script_session import ScriptSession
+from run_control import RunControl, GenerationCancelled
+from side_file import DEFAULT_SIDE_FILE_FORMAT, check_side_file_format
+from sharding import ShardOptions
+from silence_trim import TrimOptions
+from guid_provider import DEFAULT_GUID_SEED
+from layout import LayoutOptions
+
+# The generator window. Started through gui.py, which checks the requirements before this module
+# imports them.
+
+# How often the Tk loop picks up progress messages from the generation thread
+PROGRESS_POLL_MS = 100
+
+# Pipeline stages in run order, used to turn stage progress into overall progress
+PROGRESS_STAGES = ["Reading script", "Scanning audio folders", "Matching filenames", "Probing durations",
+                   "Analysing silence", "Layout", "Updating project", "Writing project", "Rendering items", "Rendering shards"]
+
+# Side file menu entries and the side_file formats they stand for
+SIDE_FILE_CHOICES = {"xlsx side file": "xlsx", "csv side file": "csv", "parquet side file": "parquet",
+                     "no side file": "none"}
+
+
+def center_app(window, width: int, height: int):
+    """Centers the window to the main display/monitor"""
+    screen_width = window.winfo_screenwidth()
+    screen_height = window.winfo_screenheight()
+    x = int((screen_width / 2) - (width / -2))
+    y = int((screen_height / 2) - (height / 2))
+    window.geometry(f"{width}x{height}+{x}+{y}")
+
+
+class App(ctk.CTk):
+    def __init__(self):
+        super().__init__()
+
+        # Configure
+        self.geometry("560x515")
+        self.title("Recording script to .rpp file")
+        self.grid_rowconfigure(0, weight=1)  # configure grid system
+        self.grid_columnconfigure(0, weight=1)
+
+        # Widgets
+        self.frame = MyFrame(master=self, )
+        self.frame.grid(padx=6, pady=6, sticky="nsew")
+
+
+
+class MyFrame(ctk.CTkFrame):
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+
+        self.grid_rowconfigure(0, weight=0)  # configure grid system
+        self.grid_columnconfigure(0, weight=1)
+
+        # ROW 0
+        self.label_script = ctk.CTkLabel(master=self, text="Enter script file path: ", fg_color="transparent")
+        self.label_script.grid(row=0, column=0, padx=10, pady=(25, 10), sticky="nsew")
+
+        self.entry_script = ctk.CTkEntry(master=self, placeholder_text="Type or paste file path", width=370)
+        self.entry_script.grid(row=0, column=1, padx=10, pady=(25, 10))
+        self.entry_script.bind("<KeyRelease>", lambda event: self.check_entries())
+
+        # ROW 1
+        self.label_audio_path = ctk.CTkLabel(master=self, text="Enter audio file location: ", fg_color="transparent")
+        self.label_audio_path.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
+
+        self.entry_audio_path = ctk.CTkEntry(master=self, placeholder_text="Type or paste directory path", width=370)
+        self.entry_audio_path.grid(row=1, column=1, padx=10, pady=10, )
+        self.entry_audio_path.bind("<KeyRelease>", lambda event: self.check_entries())
+
+        # ROW 2
+        self.label_samplerate = ctk.CTkLabel(master=self, text="Sample rate: ", fg_color="transparent")
+        self.label_samplerate.grid(row=2, column=0, padx=10, pady=10, sticky="nsew")
+
+        self.box_samplerate = ctk.CTkComboBox(master=self, values=["44100", "48000", "96000",], state="readonly")
+        self.box_samplerate.grid(row=2, column=1, padx=(0, 230), pady=(10, 10))
+        self.box_samplerate.bind("<KeyRelease>", lambda event: self.check_entries())
+
+        self.menu_side_file = ctk.CTkOptionMenu(master=self, values=list(SIDE_FILE_CHOICES), width=140)
+        self.menu_side_file.set(next(choice for choice, side_file_format in SIDE_FILE_CHOICES.items()
+                                     if side_file_format == DEFAULT_SIDE_FILE_FORMAT))
+        self.menu_side_file.grid(row=2, column=1, padx=(230, 0), pady=(10, 10))
+
+        # ROW 3
+        self.label_excel_column_1 = ctk.CTkLabel(master=self, text="Filename column: ", fg_color="transparent")
+        self.label_excel_column_1.grid(row=3, column=0, sticky="nsew", padx=10, pady=10)
+
+        self.entry_excel_column_1 = ctk.CTkEntry(master=self, placeholder_text="Column name here", width=370)
+        self.entry_excel_column_1.grid(row=3, column=1, padx=10, pady=10, )
+        self.entry_excel_column_1.bind("<KeyRelease>", lambda event: self.check_entries())
+
+        # ROW 4
+        self.label_excel_column_2 = ctk.CTkLabel(master=self, text="Item notes column: ", fg_color="transparent")
+        self.label_excel_column_2.grid(row=4, column=0, sticky="nsew", padx=10, pady=10)
+
+        self.entry_excel_column_2 = ctk.CTkEntry(master=self, placeholder_text="Column name here", width=370)
+        self.entry_excel_column_2.grid(row=4, column=1, padx=10, pady=10, )
+        self.entry_excel_column_2.bind("<KeyRelease>", lambda event: self.check_entries())
+
+        # ROW 5
+        self.label_max_items = ctk.CTkLabel(master=self, text="Max items per project: ", fg_color="transparent")
+        self.label_max_items.grid(row=5, column=0, sticky="nsew", padx=10, pady=10)
+
+        self.entry_max_items = ctk.CTkEntry(master=self, placeholder_text="Empty for a single project", width=370)
+        self.entry_max_items.grid(row=5, column=1, padx=10, pady=10, )
+
+        # ROW 6
+        self.check_update = ctk.CTkCheckBox(master=self, text="Update existing project (keeps REAPER edits)")
+        self.check_update.grid(row=6, column=1, padx=10, pady=(0, 10), sticky="w")
+
+        self.check_peaks = ctk.CTkCheckBox(master=self, text="Build peaks")
+        self.check_peaks.grid(row=6, column=0, padx=10, pady=(0, 10), sticky="e")
+
+        # ROW 7
+        self.check_trim = ctk.CTkCheckBox(master=self, text="Trim leading and trailing silence")
+        self.check_trim.grid(row=7, column=1, padx=10, pady=(0, 10), sticky="w")
+
+        self.check_stable_guids = ctk.CTkCheckBox(master=self, text="Stable GUIDs")
+        self.check_stable_guids.grid(row=7, column=0, padx=10, pady=(0, 10), sticky="e")
+
+        # ROW 8
+        self.check_snap = ctk.CTkCheckBox(master=self, text="Snap items to whole samples")
+        self.check_snap.grid(row=8, column=1, padx=10, pady=(0, 10), sticky="w")
+
+        # ROW 9
+        self.label_result = ctk.CTkLabel(master=self, text=" ", fg_color="transparent",
+                                         wraplength=200, width=250)
+        self.label_result.grid(row=9, column=0, padx=(10,10), columnspan=2, sticky="w")
+
+        self.button_continue = ctk.CTkButton(master=self, text="Generate", border_spacing=1, border_color="black",
+                                             border_width=1, command=self.generate_results, state="disabled")
+        self.button_continue.grid(row=9, column=1, padx=(0, 25), pady=(10,10),sticky="SE")
+
+        # ROW 10
+        self.progress_bar = ctk.CTkProgressBar(master=self, width=370)
+        self.progress_bar.set(0)
+        self.progress_bar.grid(row=10, column=0, columnspan=2, padx=(10, 10), pady=(0, 10), sticky="ew")
+
+        self.button_cancel = ctk.CTkButton(master=self, text="Cancel", border_spacing=1, border_color="black",
+                                           border_width=1, command=self.cancel_generation, state="disabled")
+        self.button_cancel.grid(row=9, column=1, padx=(0, 175), pady=(10,10), sticky="SE")
+
+        # Generation runs in a worker thread and reports back through this queue
+        self.progress_queue = queue.Queue()
+        self.control = None
+        self.worker = None
+
+
+    # METHODS
+    def check_entries(self):
+        # Retrieve values from entry boxes
+        script_path = self.entry_script.get()
+        audio_path = self.entry_audio_path.get()
+        sample_rate = self.box_samplerate.get()
+        excel_column_1 = self.entry_excel_column_1.get()
+        excel_column_2 = self.entry_excel_column_2.get()
+
+        # Check if all entries are filled (and no generation is running)
+        if self.worker is not None:
+            self.button_continue.configure(state="disabled")
+        elif script_path and audio_path and sample_rate and excel_column_1 and excel_column_2:
+            self.button_continue.configure(state="normal")
+        else:
+            self.button_continue.configure(state="disabled")
+
+    def generate_results(self):
+        script_path = self.entry_script.get()
+        audio_path = self.entry_audio_path.get()
+        sample_rate = self.box_samplerate.get()
+        excel_column_1 = self.entry_excel_column_1.get()
+        excel_column_2 = self.entry_excel_column_2.get()
+
+        if not validate_path(script_path):
+            self.label_result.configure(text="Invalid script file path.")
+            return
+
+        if not validate_directory(audio_path):
+            self.label_result.configure(text="Invalid audio file location.")
+            return
+
+        if not validate_sample_rate(sample_rate):
+            self.label_result.configure(text="Invalid sample rate.")
+            return
+
+        try:
+            session = ScriptSession(script_path)
+        except ValueError as e:
+            self.label_result.configure(text=str(e))
+            return
+
+        # The script is opened once and reused for both header checks and the processing
+        if not validate_excel_column(excel_column_1, script_path, session):
+            session.close()
+            self.label_result.configure(text=f"Not in excel file headers.")
+            return
+
+        if not validate_excel_column(excel_column_2, script_path, session):
+            session.close()
+            self.label_result.configure(text=f"Not in excel file headers.")
+            return
+
+        max_items = self.entry_max_items.get().strip()
+        if max_items and (not max_items.isdigit() or int(max_items) < 1):
+            session.close()
+            self.label_result.configure(text="Max items must be a whole number.")
+            return
+        shard_options = ShardOptions(max_items=int(max_items)) if max_items else None
+        update_existing = bool(self.check_update.get())
+        build_peaks = bool(self.check_peaks.get())
+        trim_options = TrimOptions() if self.check_trim.get() else None
+        # Same inputs then give the same project file, useful to diff regenerated projects
+        guid_seed = DEFAULT_GUID_SEED if self.check_stable_guids.get() else None
+        # Positions on whole samples of the chosen sample rate
+        layout_options = LayoutOptions(snap_to_samples=True) if self.check_snap.get() else None
+        if update_existing and shard_options is not None:
+            session.close()
+            self.label_result.configure(text="Update mode cannot split the project.")
+            return
+        if update_existing and layout_options is not None:
+            session.close()
+            self.label_result.configure(text="Update mode cannot snap the items.")
+            return
+
+        side_file_format = SIDE_FILE_CHOICES[self.menu_side_file.get()]
+        try:
+            check_side_file_format(side_file_format)
+        except ValueError as e:
+            session.close()
+            self.label_result.configure(text=str(e))
+            return
+
+        self.start_generation(session, script_path.strip('"'), audio_path.strip('"'), sample_rate, excel_column_1,
+                              excel_column_2, side_file_format=side_file_format, shard_options=shard_options,
+                              update_existing=update_existing, build_peaks=build_peaks, trim_options=trim_options,
+                              guid_seed=guid_seed, layout_options=layout_options)
+
+    def start_generation(self, session, *process_args, side_file_format=DEFAULT_SIDE_FILE_FORMAT, shard_options=None,
+                         update_existing=False, build_peaks=False, trim_options=None, guid_seed=None,
+                         layout_options=None):
+        """Runs process_data in a worker thread so the window stays responsive"""
+        self.side_file_format = side_file_format
+        self.shard_options = shard_options
+        self.update_existing = update_existing
+        self.build_peaks = build_peaks
+        self.trim_options = trim_options
+        self.guid_seed = guid_seed
+        self.layout_options = layout_options
+        self.control = RunControl(on_progress=lambda stage, done, total:
+                                  self.progress_queue.put(("progress", stage, done, total)),
+                                  on_stage=lambda record: self.progress_queue.put(("stage", record)))
+        self.slowest_stage = None
+        self.worker = threading.Thread(target=self.run_generation, args=(session, process_args), daemon=True)
+
+        self.button_continue.configure(state="disabled")
+        self.button_cancel.configure(state="normal")
+        self.progress_bar.set(0)
+        self.label_result.configure(text="Generating...")
+
+        self.worker.start()
+        self.after(PROGRESS_POLL_MS, self.poll_progress)
+
+    def run_generation(self, session, process_args):
+        """Worker thread body. Never touches widgets, only posts messages"""
+        try:
+            result = process_data(*process_args, session=session, control=self.control,
+                                  side_file_format=self.side_file_format, shard_options=self.shard_options,
+                                  update_existing=self.update_existing, build_peaks=self.build_peaks,
+                                  trim_options=self.trim_options, guid_seed=self.guid_seed,
+                                  layout_options=self.layout_options)
+        except GenerationCancelled:
+            result = "Generation cancelled."
+        except Exception as e:
+            result = f"Error: {e}"
+        finally:
+            session.close()
+        self.progress_queue.put(("done", result))
+
+    def poll_progress(self):
+        """Applies the worker's progress messages on the Tk thread"""
+        result = None
+        while True:
+            try:
+                message = self.progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "done":
+                result = message[1]
+                continue
+            if message[0] == "stage":
+                record = message[1]
+                if self.slowest_stage is None or record.seconds > self.slowest_stage.seconds:
+                    self.slowest_stage = record
+                continue
+            _, stage, done, total = message
+            # Background stages (peak building) only update the label
+            if stage in PROGRESS_STAGES:
+                stage_fraction = done / total if total else 0
+                self.progress_bar.set((PROGRESS_STAGES.index(stage) + stage_fraction) / len(PROGRESS_STAGES))
+            self.label_result.configure(text=f"{stage}... {done}/{total}" if total else f"{stage}...")
+
+        if result is None:
+            self.after(PROGRESS_POLL_MS, self.poll_progress)
+            return
+
+        self.worker = None
+        self.control = None
+        self.button_cancel.configure(state="disabled")
+        if result in ("Project generated", "Project up to date (inputs unchanged)"):
+            self.progress_bar.set(1)
+            if self.slowest_stage is not None:
+                result += f" (slowest stage: {self.slowest_stage.name}, {self.slowest_stage.seconds:.2f}s)"
+        self.label_result.configure(text=result)
+        self.check_entries()
+
+    def cancel_generation(self):
+        if self.control is not None:
+            self.control.cancel()
+            self.button_cancel.configure(state="disabled")
+            self.label_result.configure(text="Cancelling...")
+
@@ -0,0 +1,56 @@
+import os
+import hashlib
+
+# GUIDs for the generated projects. Random GUIDs are cut from one os.urandom buffer per batch
+# instead of one uuid4() call (and syscall) each. Seeded GUIDs are a hash of a seed and a key
+# such as the item's filename, so the same inputs give a byte-identical project that can be
+# diffed and cached. Both are formatted like REAPER's own: uppercase version 4 UUIDs.
+
+# Seed used by the GUI's stable GUID option, build_project() adds the project name to it
+DEFAULT_GUID_SEED = "rec_script_to_rpp"
+
+
+def _format_guid(hex_digits):
+    """Formats 32 hex digits as a version 4, RFC 4122 variant UUID"""
+    variant = "89AB"[int(hex_digits[16], 16) & 3]
+    return (f"{hex_digits[:8]}-{hex_digits[8:12]}-4{hex_digits[13:16]}-"
+            f"{variant}{hex_digits[17:20]}-{hex_digits[20:32]}")
+
+
+def random_guids(count):
+    """Returns count random GUIDs made from a single os.urandom call"""
+    hex_digits = os.urandom(16 * count).hex().upper()
+    return [_format_guid(hex_digits[start:start + 32]) for start in range(0, 32 * count, 32)]
+
+
+def seeded_guid(seed, *parts):
+    """Returns the GUID derived from a seed and key parts, the same on every run"""
+    key = "\x1f".join(str(part) for part in (seed,) + parts)
+    return _format_guid(hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest().upper())
+
+
+def seeded_number(seed, *parts, low=0, high=2 ** 32):
+    """Returns an int in [low, high) derived from a seed and key parts"""
+    key = "\x1f".join(str(part) for part in (seed,) + parts)
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return low + int.from_bytes(digest, "little") % (high - low)
+
+
+def item_guids(names, seed=None):
+    """Returns one (IGUID, GUID) pair per item.
+
+    Without a seed they are random, all made from one buffer. With a seed they derive from the seed,
+    the filename and how many items with that filename came before, so repeated filenames still
+    get distinct GUIDs and inserting other rows does not change them.
+    """
+    if seed is None:
+        guids = random_guids(2 * len(names))
+        return list(zip(guids[0::2], guids[1::2]))
+
+    occurrences = {}
+    pairs = []
+    for name in names:
+        occurrence = occurrences.get(name, 0)
+        occurrences[name] = occurrence + 1
+        pairs.append((seeded_guid(seed, "IGUID", name, occurrence), seeded_guid(seed, "GUID", name, occurrence)))
+    return pairs
@@ -0,0 +1,67 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# Import-time benchmark. Every module is imported in a fresh interpreter (a cold start like a CLI
+# run or the GUI launch), several times, and the best and median wall times are printed together
+# with the heavy dependencies each import pulled in.
+#
+#   python import_benchmark.py                       (default modules, 5 runs each)
+#   python import_benchmark.py core_build backend --runs 10 --json import_times.json
+
+DEFAULT_MODULES = ("core_build", "backend", "backend_no_gui", "batch", "script_session", "pandas")
+HEAVY_DEPENDENCIES = ("pandas", "pydub", "openpyxl", "numpy", "customtkinter")
+DEFAULT_RUNS = 5
+
+# Runs in the child interpreter: times the import and lists the heavy modules it loaded
+IMPORT_PROBE = """
+import sys, json, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps([seconds, [name for name in {heavy!r} if name in sys.modules]]))
+"""
+
+
+def time_import(module, runs=DEFAULT_RUNS):
+    """Returns (import times in seconds, heavy dependencies loaded) of a module over fresh interpreters"""
+    code = IMPORT_PROBE.format(module=module, heavy=HEAVY_DEPENDENCIES)
+    directory = os.path.dirname(os.path.abspath(__file__))
+    times, loaded = [], []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", code], cwd=directory, capture_output=True, text=True,
+                                check=True)
+        seconds, loaded = json.loads(result.stdout.strip().splitlines()[-1])
+        times.append(seconds)
+    return times, loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the cold import of the pipeline modules")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="modules to import")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="fresh interpreters per module")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'module':<16} {'best':>8} {'median':>8}  loaded")
+    for module in args.modules:
+        try:
+            times, loaded = time_import(module, args.runs)
+        except subprocess.CalledProcessError as e:
+            print(f"{module:<16} failed: {e.stderr.strip().splitlines()[-1] if e.stderr.strip() else e}")
+            continue
+        results[module] = {"best": min(times), "median": statistics.median(times), "loaded": loaded}
+        print(f"{module:<16} {min(times):7.3f}s {statistics.median(times):7.3f}s  {', '.join(loaded) or '-'}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
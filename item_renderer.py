@@ -0,0 +1,56 @@
+from worker_pool import process_pool
+from rpp_templates import create_item_template_with_notes
+from guid_provider import item_guids
+
+# Batch item renderer. Rows are formatted from plain column lists (no per-row Series objects) and
+# always come back in script order. Very large frames are split in chunks and rendered in a
+# process pool, since string formatting does not scale across threads.
+
+# Frames with at least this many rows are rendered in a process pool
+PROCESS_POOL_MIN_ROWS = 50000
+RENDER_CHUNK_SIZE = 10000
+
+
+def render_item_chunk(names, paths, notes, lengths, positions, offsets, guids):
+    """Returns the item blocks for a chunk of rows given as parallel column lists"""
+    return [create_item_template_with_notes(name, path, note, length, position, offset, guid_pair)
+            for name, path, note, length, position, offset, guid_pair
+            in zip(names, paths, notes, lengths, positions, offsets, guids)]
+
+
+def iter_rendered_items(names, paths, notes, lengths, positions, offsets=None, guids=None, use_processes=None,
+                        control=None):
+    """Yields the item blocks in row order. use_processes=None picks a process pool for large inputs.
+
+    offsets: start offset of every item in its source (SOFFS), 0 for all rows when None.
+    guids: (IGUID, GUID) of every item (see guid_provider.item_guids), random ones when None.
+    control is an optional run_control.RunControl, checked between chunks.
+    """
+    row_count = len(names)
+    if offsets is None:
+        offsets = [0] * row_count
+    if guids is None:
+        # All GUIDs of the run come from one random buffer
+        guids = item_guids(names)
+    columns = [names, paths, notes, lengths, positions, offsets, guids]
+    if use_processes is None:
+        use_processes = row_count >= PROCESS_POOL_MIN_ROWS
+
+    if not use_processes:
+        for start in range(0, row_count, RENDER_CHUNK_SIZE):
+            if control is not None:
+                control.progress("Rendering items", start, row_count)
+            yield from render_item_chunk(*[column[start:start + RENDER_CHUNK_SIZE] for column in columns])
+        return
+
+    chunk_starts = range(0, row_count, RENDER_CHUNK_SIZE)
+    chunked_columns = [[column[start:start + RENDER_CHUNK_SIZE] for start in chunk_starts] for column in columns]
+    executor = process_pool()
+    try:
+        # executor.map yields results in submission order, so the script order is kept
+        for start, chunk in zip(chunk_starts, executor.map(render_item_chunk, *chunked_columns)):
+            if control is not None:
+                control.progress("Rendering items", start, row_count)
+            yield from chunk
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,111 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Timeline layout: item positions are a single cumulative sum over the item slots (length + gap).
+# Snapping rounds every slot up to whole grid units (or samples), so the items stay on the grid
+# and never overlap, without a per-row loop.
+
+DEFAULT_START = 5
+DEFAULT_GAP = 4
+
+# Slots within this many units of a whole grid step are not pushed to the next step
+SNAP_TOLERANCE = 1e-9
+
+# Layout settings of a run. gap_column names a script column with one separation per row (empty
+# cells fall back to gap), snap_to_samples snaps every position to a whole sample at the project rate
+LayoutOptions = namedtuple("LayoutOptions", ["start", "gap", "gap_column", "missing_length", "grid", "snap_to_samples"],
+                           defaults=[DEFAULT_START, DEFAULT_GAP, None, 0, None, False])
+
+
+def check_layout_options(options):
+    """Raises ValueError for settings that cannot be laid out"""
+    if options is None:
+        return
+    if float(options.start) < 0:
+        raise ValueError("The layout start cannot be negative")
+    if float(options.gap) < 0:
+        raise ValueError("The gap between items cannot be negative")
+    if float(options.missing_length) < 0:
+        raise ValueError("The length reserved for missing files cannot be negative")
+    if options.grid is not None and float(options.grid) <= 0:
+        raise ValueError("The grid must be a positive number of seconds")
+
+
+def position_settings(options, sample_rate=None):
+    """Returns the compute_positions() keyword arguments (all but gaps) for LayoutOptions and the project rate"""
+    options = LayoutOptions() if options is None else options
+    return {"start": float(options.start), "gap": float(options.gap),
+            "missing_length": float(options.missing_length),
+            "grid": float(options.grid) if options.grid else None,
+            "sample_rate": int(sample_rate) if options.snap_to_samples and sample_rate else None}
+
+
+def is_running_total(options):
+    """True when the positions are a plain running total of length + gap (no per-row gaps, grid or snapping)"""
+    return options is None or not (options.gap_column or options.grid or options.snap_to_samples
+                                   or float(options.missing_length))
+
+
+class PositionCursor:
+    """Lays out lengths that arrive in chunks, every chunk continuing where the previous one ended.
+
+    Carries the exact running total (whole grid units when snapping), so the positions of all chunks
+    equal one compute_positions() call over all rows. See compute_positions() for the settings.
+    """
+
+    def __init__(self, start=DEFAULT_START, gap=DEFAULT_GAP, missing_length=0, grid=None, sample_rate=None):
+        self.gap = gap
+        self.missing_length = missing_length
+        self.grid = grid
+        self.sample_rate = sample_rate
+        self.units_per_second = 1 / grid if grid else sample_rate
+        # Position of the next row, in grid units when snapping
+        if self.units_per_second:
+            self.next_position = np.ceil(start * self.units_per_second - SNAP_TOLERANCE)
+        else:
+            self.next_position = np.float64(start)
+
+    def positions(self, lengths, gaps=None):
+        """Returns the positions of the next rows. lengths and gaps as in compute_positions()"""
+        lengths = np.asarray(lengths, dtype=np.float64)
+        if lengths.size == 0:
+            return lengths
+
+        lengths = np.where(np.isnan(lengths), self.missing_length, lengths)
+        if gaps is not None:
+            gaps = np.asarray(gaps, dtype=np.float64)
+            gaps = np.where(np.isnan(gaps), self.gap, gaps)
+        else:
+            gaps = self.gap
+        slots = lengths + gaps
+        if self.units_per_second:
+            # Every slot is rounded up to whole units, so the items stay on the grid and never overlap
+            slots = np.ceil(slots * self.units_per_second - SNAP_TOLERANCE)
+
+        # Start is summed first, like a running total, so results match a row-by-row loop exactly
+        totals = np.cumsum(np.concatenate(([self.next_position], slots)))
+        self.next_position = totals[-1]
+        positions = totals[:-1]
+
+        if self.grid:
+            positions = positions * self.grid
+            if self.sample_rate:
+                positions = np.round(positions * self.sample_rate) / self.sample_rate
+            return positions
+        if self.sample_rate:
+            return positions / self.sample_rate
+        return positions
+
+
+def compute_positions(lengths, start=DEFAULT_START, gap=DEFAULT_GAP, gaps=None, missing_length=0,
+                      grid=None, sample_rate=None):
+    """Returns a float64 array with the timeline position of every item.
+
+    lengths: item lengths in seconds, None/NaN where the audio file is missing
+    gap: separation after every item, or gaps: one separation per row (NaN falls back to gap)
+    missing_length: length reserved for rows without a length
+    grid: snap every position to multiples of this many seconds
+    sample_rate: snap every position to a whole sample at this project rate
+    """
+    return PositionCursor(start, gap, missing_length, grid, sample_rate).positions(lengths, gaps)
@@ -14,25 +14,28 @@ def ensure_pip():
 
 
 
+def install_requirements_file(req_path):
+    print(f"\n🚀 Instalando dependencias desde: {req_path}")
+    print(f"📦 Ejecutando: {sys.executable} -m pip install -r {req_path}")
+
+    # Ejecuta y muestra TODO el output en tiempo real
+    result = subprocess.run(
+        [sys.executable, "-m", "pip", "install", "-r", req_path]
+    )
+
+    if result.returncode == 0:
+        print(f"✅ Instalado correctamente desde {req_path}")
+    else:
+        print(f"❌ Error instalando desde {req_path}")
+        sys.exit(1)
+
+
 def install_requirements_in_directory(base_dir):
     # Recorre todas las carpetas buscando archivos requirements.txt
     for root, dirs, files in os.walk(base_dir):
         for file in files:
             if file == "requirements.txt":
-                req_path = os.path.join(root, file)
-                print(f"\n🚀 Instalando dependencias desde: {req_path}")
-                print(f"📦 Ejecutando: {sys.executable} -m pip install -r {req_path}")
-                
-                # Ejecuta y muestra TODO el output en tiempo real
-                result = subprocess.run(
-                    [sys.executable, "-m", "pip", "install", "-r", req_path]
-                )
-                
-                if result.returncode == 0:
-                    print(f"✅ Instalado correctamente desde {req_path}")
-                else:
-                    print(f"❌ Error instalando desde {req_path}")
-                    sys.exit(1)
+                install_requirements_file(os.path.join(root, file))
 
 if __name__ == "__main__":
     if sys.version_info >= (3, 13):
@@ -0,0 +1,128 @@
+import os
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Skips regeneration when nothing changed. After a successful build a manifest is written next to
+# the project (<project>.build.json) with a fingerprint of the inputs (script content, column
+# selection, sample rate and every layout/output setting) and the size and mtime of the audio
+# files the project references and of the files it wrote. A later run with the same fingerprint
+# only stats those files; when all are unchanged the previous outputs are reused as they are.
+#
+# Scripts with missing files also record the folder mtimes of the audio index, so a take that has
+# been delivered since (in any folder) triggers a rebuild. A second copy of an already referenced
+# file added to another folder is not noticed; delete the manifest or pass force to rebuild.
+
+BUILD_MANIFEST_SUFFIX = ".build.json"
+# Part of every fingerprint, bump it when the generated output changes for the same inputs
+BUILD_FORMAT_VERSION = 1
+
+HASH_CHUNK_SIZE = 1024 * 1024
+# Threads used to stat the referenced files, they mostly wait on the file system (network shares)
+STAT_WORKERS = 16
+STAT_CHUNK_SIZE = 512
+
+
+def hash_file(file_path):
+    """Returns the blake2b hex digest of a file's content"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_fingerprint(script_path, settings):
+    """Returns the fingerprint of a build: script content plus the settings dict (any JSON-able values)"""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(hash_file(script_path).encode("ascii"))
+    digest.update(json.dumps({"format": BUILD_FORMAT_VERSION, **settings}, sort_keys=True, default=repr)
+                  .encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _stamp(file_path):
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _stamps(file_paths):
+    """Returns [size, mtime_ns] (None for missing files) of every path, in order"""
+    chunks = [file_paths[start:start + STAT_CHUNK_SIZE] for start in range(0, len(file_paths), STAT_CHUNK_SIZE)]
+    if len(chunks) <= 1:
+        return [_stamp(file_path) for file_path in file_paths]
+    with ThreadPoolExecutor(max_workers=STAT_WORKERS) as executor:
+        return [stamp for chunk in executor.map(lambda chunk: [_stamp(path) for path in chunk], chunks)
+                for stamp in chunk]
+
+
+def restat_directories(directory_mtimes, directories):
+    """Returns directory_mtimes with the current mtime of the given folders, for folders the build
+    itself wrote into (peak files next to the audio)"""
+    directory_mtimes = dict(directory_mtimes)
+    for directory in directories:
+        stamp = _stamp(directory)
+        if directory in directory_mtimes and stamp is not None:
+            directory_mtimes[directory] = stamp[1]
+    return directory_mtimes
+
+
+def write_build_manifest(manifest_path, fingerprint, summary, audio_paths, output_paths, directory_mtimes=None):
+    """Records a successful build. directory_mtimes: folder path -> mtime_ns of the audio index, or None"""
+    audio_paths = sorted(set(audio_paths))
+    # Grouped by folder, the folder path is stored once
+    audio_files = {}
+    for path, stamp in zip(audio_paths, _stamps(audio_paths)):
+        directory, name = os.path.split(path)
+        audio_files.setdefault(directory, []).append([name] + (stamp or [None, None]))
+    output_paths = [path for path in output_paths if path]
+    manifest = {"fingerprint": fingerprint,
+                "summary": summary,
+                "outputs": dict(zip(output_paths, _stamps(output_paths))),
+                "audio_files": audio_files,
+                "directories": directory_mtimes}
+
+    partial_path = manifest_path + ".part"
+    try:
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(partial_path, manifest_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return manifest_path
+
+
+def load_reusable_build(manifest_path, fingerprint):
+    """Returns the summary of the previous build when its fingerprint matches and none of the files
+    it recorded changed since, otherwise None"""
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("fingerprint") != fingerprint:
+        return None
+
+    outputs = manifest["outputs"]
+    if _stamps(list(outputs)) != list(outputs.values()):
+        return None
+
+    audio_paths, audio_stamps = [], []
+    for directory, files in manifest["audio_files"].items():
+        for name, size, mtime_ns in files:
+            audio_paths.append(os.path.join(directory, name))
+            audio_stamps.append([size, mtime_ns])
+    if _stamps(audio_paths) != audio_stamps:
+        return None
+
+    directories = manifest.get("directories")
+    if directories:
+        for directory, mtime_ns in directories.items():
+            stamp = _stamp(directory)
+            if stamp is None or stamp[1] != mtime_ns:
+                return None
+    return manifest["summary"]
@@ -0,0 +1,153 @@
+import os
+import struct
+from concurrent.futures import as_completed
+
+import numpy as np
+
+from wav_probe import probe_wav, WavProbeError
+from wav_samples import open_samples, to_float
+from worker_pool import process_pool
+
+# REAPER peak file pre-generation. REAPER looks for <media file>.reapeaks next to each source and
+# rebuilds it when the header's source size or modification time no longer match. The peaks are
+# computed from the memory-mapped data chunk with numpy, block by block, in a process pool.
+#
+# .reapeaks layout written here (little endian, the 'RPKM' mipmapped format):
+#     'RPKM', channels (1 byte), mipmap count (1 byte), sample rate, source mtime, source size (int32 each)
+#     per mipmap: samples per peak, peak count (int32 each)
+#     per mipmap, per peak, per channel: max, min (int16, full scale 32767)
+
+PEAK_SUFFIX = ".reapeaks"
+PEAK_MAGIC = b"RPKM"
+
+# About this many peaks per second on the finest mipmap, each further mipmap is MIPMAP_FACTOR coarser
+PEAKS_PER_SECOND = 400
+MIPMAP_FACTOR = 16
+MIPMAP_COUNT = 3
+
+# Peaks computed per numpy pass, bounds the memory used for long takes
+PEAKS_PER_BLOCK = 4096
+
+PEAKS_WRITTEN = "written"
+PEAKS_UP_TO_DATE = "up to date"
+PEAKS_UNSUPPORTED = "unsupported"
+PEAKS_FAILED = "failed"
+
+
+def peak_file_path(audio_path):
+    return audio_path + PEAK_SUFFIX
+
+
+def _source_stamp(audio_path):
+    stat = os.stat(audio_path)
+    return int(stat.st_mtime) & 0xFFFFFFFF, stat.st_size & 0xFFFFFFFF
+
+
+def peaks_up_to_date(audio_path):
+    """True when the peak file exists and its header matches the source's size and mtime"""
+    try:
+        with open(peak_file_path(audio_path), 'rb') as f:
+            header = f.read(18)
+    except OSError:
+        return False
+    if len(header) < 18 or header[:4] != PEAK_MAGIC:
+        return False
+    mtime, size = struct.unpack("<II", header[10:18])
+    return (mtime, size) == _source_stamp(audio_path)
+
+
+def compute_peaks(audio_path, info=None):
+    """Returns (samples per peak, int16 array peaks x channels x 2 (max, min)) of the finest mipmap, or None"""
+    info = info or probe_wav(audio_path)
+    view = open_samples(audio_path, info)
+    if view is None:
+        return None
+    samples, scale = view
+    del view
+    division = max(int(round(info.sample_rate / PEAKS_PER_SECOND)), 1)
+    peak_count = -(-len(samples) // division)
+    peaks = np.empty((peak_count, info.channels, 2), dtype=np.int16)
+
+    frames_per_block = division * PEAKS_PER_BLOCK
+    for first_peak, start in enumerate(range(0, len(samples), frames_per_block)):
+        block = to_float(samples[start:start + frames_per_block], scale)
+        block_peaks = -(-len(block) // division)
+        # Pad the last partial peak with its own last frame so it does not change the extremes
+        padding = block_peaks * division - len(block)
+        if padding:
+            block = np.concatenate((block, np.repeat(block[-1:], padding, axis=0)))
+        block = block.reshape(block_peaks, division, info.channels)
+        peak_slice = slice(first_peak * PEAKS_PER_BLOCK, first_peak * PEAKS_PER_BLOCK + block_peaks)
+        peaks[peak_slice, :, 0] = np.clip(np.round(block.max(axis=1) * 32767), -32768, 32767)
+        peaks[peak_slice, :, 1] = np.clip(np.round(block.min(axis=1) * 32767), -32768, 32767)
+    del samples
+    return division, peaks
+
+
+def _coarser(peaks, factor):
+    """Combines every factor peaks into one (max of maxes, min of mins)"""
+    count = -(-len(peaks) // factor)
+    padding = count * factor - len(peaks)
+    if padding:
+        peaks = np.concatenate((peaks, np.repeat(peaks[-1:], padding, axis=0)))
+    grouped = peaks.reshape(count, factor, peaks.shape[1], 2)
+    return np.stack((grouped[..., 0].max(axis=1), grouped[..., 1].min(axis=1)), axis=-1)
+
+
+def write_peak_file(audio_path):
+    """Builds <audio_path>.reapeaks unless it is up to date. Returns one of the PEAKS_ status strings"""
+    try:
+        if peaks_up_to_date(audio_path):
+            return PEAKS_UP_TO_DATE
+        info = probe_wav(audio_path)
+        result = compute_peaks(audio_path, info)
+        if result is None:
+            return PEAKS_UNSUPPORTED
+        division, peaks = result
+
+        mipmaps = [(division, peaks)]
+        for _ in range(MIPMAP_COUNT - 1):
+            division, peaks = division * MIPMAP_FACTOR, _coarser(peaks, MIPMAP_FACTOR)
+            mipmaps.append((division, peaks))
+
+        mtime, size = _source_stamp(audio_path)
+        partial_path = peak_file_path(audio_path) + ".part"
+        try:
+            with open(partial_path, 'wb') as f:
+                f.write(PEAK_MAGIC + struct.pack("<BBIII", info.channels, len(mipmaps), info.sample_rate, mtime, size))
+                for division, peaks in mipmaps:
+                    f.write(struct.pack("<II", division, len(peaks)))
+                for _, peaks in mipmaps:
+                    f.write(peaks.astype("<i2").tobytes())
+            os.replace(partial_path, peak_file_path(audio_path))
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        return PEAKS_WRITTEN
+    except WavProbeError:
+        return PEAKS_UNSUPPORTED
+    except OSError:
+        # e.g. a read-only delivery folder, REAPER then builds the peaks itself
+        return PEAKS_FAILED
+
+
+def generate_peaks(audio_paths, max_workers=None, control=None):
+    """Writes the peak files of all paths in a process pool. Returns a dict status -> file count.
+
+    control is an optional run_control.RunControl for progress and cancellation.
+    """
+    paths = list(dict.fromkeys(path for path in audio_paths if isinstance(path, str)))
+    counts = {PEAKS_WRITTEN: 0, PEAKS_UP_TO_DATE: 0, PEAKS_UNSUPPORTED: 0, PEAKS_FAILED: 0}
+    if not paths:
+        return counts
+
+    executor = process_pool(max_workers)
+    try:
+        futures = [executor.submit(write_peak_file, path) for path in paths]
+        for done, future in enumerate(as_completed(futures), start=1):
+            counts[future.result()] += 1
+            if control is not None:
+                control.progress("Building peaks", done, len(paths))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return counts
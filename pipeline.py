@@ -0,0 +1,263 @@
+import os
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from filename_matching import normalize_filename
+from guid_provider import item_guids
+from item_renderer import render_item_chunk, RENDER_CHUNK_SIZE, PROCESS_POOL_MIN_ROWS
+from layout import PositionCursor, DEFAULT_START, DEFAULT_GAP
+from rpp_writer import write_project_to_directory
+from run_report import StageRecord
+from worker_pool import process_pool
+
+# Streaming stages of a generation run. ProbePipeline starts duration probes while the audio
+# folders are still being scanned: files the index already knows are probed right away, newly
+# listed ones as soon as their folder listing arrives. The lengths are then handed out in script
+# order, with a bounded window of probes running ahead. StreamingProjectWriter consumes those
+# lengths through a bounded queue in a writer thread, laying out, rendering and writing each row
+# as soon as all rows before it are ready, so the .rpp is written while the probes still run.
+
+# Probes submitted ahead of the row being consumed
+PROBE_WINDOW = 512
+# Probes the scan may start before iter_lengths() gets to them, the rest waits for the window
+PROBE_QUEUE_LIMIT = 4096
+# Rows handed to the writer thread at a time, and batches the queue holds before the prober waits
+STREAM_BATCH_SIZE = 1000
+STREAM_QUEUE_SIZE = 8
+# Render chunks in flight in the process pool for large scripts
+RENDER_WINDOW = 4
+# How often blocked queue operations look for a failed or aborted peer
+QUEUE_POLL_SECONDS = 0.1
+
+
+class ProbePipeline:
+    """Duration probes started during the folder scan and consumed in script order"""
+
+    def __init__(self, duration_cache, filenames, extensions, max_workers=None):
+        self.duration_cache = duration_cache
+        self.extensions = extensions
+        self.wanted_names = {name for name in filenames if isinstance(name, str)}
+        self.wanted_keys = {normalize_filename(name, extensions) for name in self.wanted_names}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.futures = {}
+        self.running = 0
+        self.lock = threading.Lock()
+
+    def _done(self, _):
+        with self.lock:
+            self.running -= 1
+
+    def submit(self, path, force=False):
+        """Starts probing a path unless it already is. Without force nothing is started while
+        PROBE_QUEUE_LIMIT probes are pending, so a large scan does not queue the whole library"""
+        if path in self.futures:
+            return
+        with self.lock:
+            if not force and self.running >= PROBE_QUEUE_LIMIT:
+                return
+            self.running += 1
+        future = self.executor.submit(self.duration_cache.get_info, path)
+        future.add_done_callback(self._done)
+        self.futures[path] = future
+
+    def prime(self, paths):
+        """Starts probing paths expected to match, e.g. what the index matched before its refresh"""
+        for path in paths:
+            if path:
+                self.submit(path)
+
+    def on_listed(self, directory_path, files):
+        """AudioIndex.refresh() callback: probes the freshly listed files the script asks for"""
+        for name, path, _, _ in files:
+            if name in self.wanted_names or normalize_filename(name, self.extensions) in self.wanted_keys:
+                self.submit(path)
+
+    def iter_lengths(self, paths, control=None):
+        """Yields the duration of every path in order, None where the path is None.
+
+        control is an optional run_control.RunControl for progress and cancellation.
+        """
+        submitted = 0
+        for row, path in enumerate(paths):
+            # Keep the next PROBE_WINDOW rows probing while this one is waited for
+            while submitted < min(row + PROBE_WINDOW, len(paths)):
+                if paths[submitted]:
+                    self.submit(paths[submitted], force=True)
+                submitted += 1
+            if control is not None and row % STREAM_BATCH_SIZE == 0:
+                control.progress("Probing durations", row, len(paths))
+            yield self.futures[path].result().duration if path else None
+
+    def close(self):
+        # On cancellation or error the probes that have not started yet are dropped
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        with self.duration_cache.lock:
+            self.duration_cache.connection.commit()
+
+
+class StreamingProjectWriter:
+    """Writes a one-track project in a worker thread from lengths that arrive in script order.
+
+    begin() starts the thread with the matched rows, add() passes the length of the next row (None
+    for a missing file) and finish() waits for the file. Each chunk of rows is laid out with a
+    layout.PositionCursor, so the positions equal layout.compute_positions() for the same settings.
+    """
+
+    def __init__(self, project_template, track_template, filename, directory, start=DEFAULT_START,
+                 gap=DEFAULT_GAP, missing_length=0, grid=None, sample_rate=None, guid_seed=None, control=None):
+        self.project_template = project_template
+        self.track_template = track_template
+        self.filename = filename
+        self.directory = directory
+        self.cursor = PositionCursor(start, gap, missing_length, grid, sample_rate)
+        self.guid_seed = guid_seed
+        self.control = control
+        self.queue = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self.batch = []
+        self.aborted = threading.Event()
+        self.all_rows_added = False
+        self.thread = None
+        self.error = None
+        self.rpp_path = None
+        # Timings for the run report: rendering, waiting for rows, and the thread's whole run
+        self.render_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.total_seconds = 0.0
+        self.items = 0
+
+    def begin(self, names, paths, notes, gaps=None):
+        """Starts the writer thread for these rows. paths may contain None for missing files,
+        gaps is the optional separation of every row (None/NaN for the default gap)"""
+        self.names = list(names)
+        self.paths = ['Not Found' if path is None else path for path in paths]
+        self.notes = list(notes)
+        self.gaps = None if gaps is None else [float('nan') if gap is None else gap for gap in gaps]
+        self.guids = item_guids(self.names, self.guid_seed)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def add(self, length):
+        self.batch.append(length)
+        if len(self.batch) >= STREAM_BATCH_SIZE:
+            self._put(self.batch)
+            self.batch = []
+
+    def _put(self, item):
+        while True:
+            if self.error is not None:
+                raise self.error
+            try:
+                self.queue.put(item, timeout=QUEUE_POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def finish(self):
+        """Waits until the project is written. Returns its path, re-raises the writer's error"""
+        if self.batch:
+            self._put(self.batch)
+            self.batch = []
+        self.all_rows_added = True
+        self._put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.rpp_path
+
+    def stage_records(self):
+        """Returns the 'Item rendering' and '.rpp write' StageRecords of a finished run"""
+        render_record = StageRecord("Item rendering")
+        render_record.seconds = self.render_seconds
+        render_record.items = self.items
+        write_record = StageRecord(".rpp write")
+        write_record.seconds = self.total_seconds - self.render_seconds - self.wait_seconds
+        write_record.items = self.items
+        write_record.bytes_written = os.path.getsize(self.rpp_path)
+        write_record.details["streamed"] = True
+        write_record.details["waited_for_rows"] = round(self.wait_seconds, 6)
+        return [render_record, write_record]
+
+    def abort(self):
+        """Stops the writer, its partial file is removed"""
+        self.aborted.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def _run(self):
+        start_time = time.perf_counter()
+        try:
+            self.rpp_path = write_project_to_directory(self.project_template, self.track_template,
+                                                       self._iter_items(), self.filename, self.directory)
+        except BaseException as e:
+            self.error = e
+        self.total_seconds = time.perf_counter() - start_time
+
+    def _iter_batches(self):
+        while True:
+            wait_start = time.perf_counter()
+            try:
+                lengths = self.queue.get(timeout=QUEUE_POLL_SECONDS)
+            except queue.Empty:
+                lengths = ()
+            self.wait_seconds += time.perf_counter() - wait_start
+            if self.aborted.is_set():
+                raise RuntimeError("Project writing aborted")
+            if lengths is None:
+                return
+            if self.control is not None:
+                self.control.check()
+            if lengths:
+                yield lengths
+
+    def _render(self, columns):
+        render_start = time.perf_counter()
+        items = render_item_chunk(*columns)
+        self.render_seconds += time.perf_counter() - render_start
+        return items
+
+    def _collect(self, future):
+        render_start = time.perf_counter()
+        items = future.result()
+        self.render_seconds += time.perf_counter() - render_start
+        return items
+
+    def _iter_items(self):
+        row_count = len(self.names)
+        executor = process_pool() if row_count >= PROCESS_POOL_MIN_ROWS else None
+        pending = deque()
+        row = 0
+        chunk_start = 0
+        lengths = []
+        try:
+            for batch in self._iter_batches():
+                for length in batch:
+                    lengths.append(length)
+                    row += 1
+                    if len(lengths) < RENDER_CHUNK_SIZE and row < row_count:
+                        continue
+
+                    rows = slice(chunk_start, row)
+                    positions = self.cursor.positions([float('nan') if length is None else length for length in lengths],
+                                                      None if self.gaps is None else self.gaps[rows])
+                    columns = (self.names[rows], self.paths[rows], self.notes[rows],
+                               ['Not Generated' if length is None else length for length in lengths],
+                               positions.tolist(), [0] * len(lengths), self.guids[rows])
+                    if executor is None:
+                        yield from self._render(columns)
+                    else:
+                        pending.append(executor.submit(render_item_chunk, *columns))
+                        while len(pending) > RENDER_WINDOW:
+                            yield from self._collect(pending.popleft())
+                    self.items += len(lengths)
+                    chunk_start = row
+                    lengths = []
+                    if self.control is not None and self.all_rows_added:
+                        self.control.progress("Rendering items", row, row_count)
+            while pending:
+                yield from self._collect(pending.popleft())
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
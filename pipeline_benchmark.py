@@ -0,0 +1,278 @@
+import os
+import io
+import sys
+import csv
+import json
+import struct
+import tempfile
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmark import write_test_wav
+from duration_cache import get_cache_path
+from output_cache import BUILD_MANIFEST_SUFFIX
+from script_session import clear_parse_cache
+
+# End-to-end benchmark of process_data(). Synthetic recording scripts (xlsx and csv) and matching
+# trees of WAV files are generated, every case runs in a fresh process with a cold and a warm cache,
+# and the per-stage timings and peak memory are compared with a stored baseline.
+#
+#   python pipeline_benchmark.py --rows 1000 10000 --save-baseline   (record this machine's baseline)
+#   python pipeline_benchmark.py --rows 1000 10000                   (exits 1 on a regression)
+#
+# benchmark_baseline.json holds a baseline recorded with the default settings. Timings differ between
+# machines, record your own with --save-baseline before relying on the check. A check without a
+# baseline for any of its cases exits with 2.
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# A stage regresses when it is this much slower than the baseline and by more than MIN_REGRESSION_SECONDS
+DEFAULT_TOLERANCE = 0.25
+MIN_REGRESSION_SECONDS = 0.05
+
+# Every this-many-th script row names a file that is not on disk
+MISSING_EVERY = 50
+FOLDER_FANOUT = 8
+SAMPLE_RATE = 48000
+
+
+def write_sparse_wav(file_path, seconds, sample_rate=SAMPLE_RATE, channels=2, sample_width=2):
+    """Writes a PCM WAV header and extends the file to its full size without writing the audio data.
+
+    On file systems with sparse file support this takes no disk space, while the file still has the
+    size and header of a real take.
+    """
+    data_size = int(seconds * sample_rate) * channels * sample_width
+    block_align = channels * sample_width
+    with open(file_path, 'wb') as f:
+        f.write(struct.pack("<4sI4s", b"RIFF", 36 + data_size, b"WAVE"))
+        f.write(struct.pack("<4sIHHIIHH", b"fmt ", 16, 1, channels, sample_rate, sample_rate * block_align,
+                            block_align, sample_width * 8))
+        f.write(struct.pack("<4sI", b"data", data_size))
+        f.truncate(44 + data_size)
+    return file_path
+
+
+def line_name(index):
+    return f"line_{index:06d}.wav"
+
+
+def folder_for(index, depth):
+    """Spreads the files over FOLDER_FANOUT ** depth folders, depth levels below the root"""
+    parts = []
+    for level in range(depth):
+        parts.append(f"level{level}_{(index // FOLDER_FANOUT ** level) % FOLDER_FANOUT}")
+    return os.path.join(*parts) if parts else ""
+
+
+def make_audio_tree(root, row_count, depth, sparse=True, seconds=30):
+    """Writes one WAV file per script row (except the missing ones) under root. Returns the file count"""
+    file_count = 0
+    for index in range(row_count):
+        if index % MISSING_EVERY == MISSING_EVERY - 1:
+            continue
+        directory = os.path.join(root, folder_for(index, depth))
+        os.makedirs(directory, exist_ok=True)
+        file_path = os.path.join(directory, line_name(index))
+        if sparse:
+            write_sparse_wav(file_path, seconds)
+        else:
+            write_test_wav(file_path, 0.1)
+        file_count += 1
+    return file_count
+
+
+def script_rows(row_count):
+    yield ["File", "Character", "Text"]
+    for index in range(row_count):
+        yield [line_name(index), f"Character {index % 12}", f"Localized line number {index}, take one"]
+
+
+def make_script(file_path, row_count):
+    """Writes a recording script with File/Character/Text columns as .xlsx or .csv"""
+    if file_path.endswith(".csv"):
+        with open(file_path, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(script_rows(row_count))
+        return file_path
+
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Script")
+    for row in script_rows(row_count):
+        sheet.append(row)
+    workbook.save(file_path)
+    return file_path
+
+
+def clear_caches(script_path, audio_root):
+    """Removes the duration/index sidecar, the parse cache and the build manifest so the next run starts cold"""
+    for suffix in ("", "-wal", "-shm"):
+        cache_path = get_cache_path(audio_root) + suffix
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+    clear_parse_cache(script_path)
+    manifest_path = os.path.join(os.path.dirname(script_path),
+                                 os.path.basename(script_path).split(".")[0] + BUILD_MANIFEST_SUFFIX)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+
+def run_case(script_path, audio_root):
+    """Runs process_data() once in this process. Returns (stage seconds, total seconds, peak memory in MB)"""
+    import tracemalloc
+    from backend import process_data
+    from run_control import RunControl
+
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is None:
+        # No getrusage (Windows): fall back to the peak of Python allocations
+        tracemalloc.start()
+
+    control = RunControl()
+    with contextlib.redirect_stdout(io.StringIO()):
+        # The output cache would turn the warm run into a manifest check, every case builds the project
+        process_data(script_path, audio_root, str(SAMPLE_RATE), "File", "Text", control=control,
+                     use_output_cache=False)
+
+    if resource is None:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    else:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        peak_mb = max_rss / 2 ** 20 if sys.platform == "darwin" else max_rss / 2 ** 10
+
+    stages = {record.name: round(record.seconds, 4) for record in control.report.stages}
+    return stages, round(control.report.total_seconds, 4), round(peak_mb, 1)
+
+
+def run_case_in_fresh_process(script_path, audio_root):
+    """Each run gets its own interpreter, so module level registries and peak memory start clean"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_case, script_path, audio_root).result()
+
+
+def run_suite(work_dir, row_counts, depths, formats, sparse=True):
+    """Generates the data and runs every case cold and warm. Returns {case name: result dict}"""
+    results = {}
+    for row_count in row_counts:
+        for depth in depths:
+            audio_root = os.path.join(work_dir, f"audio_{row_count}_d{depth}")
+            if not os.path.isdir(audio_root):
+                file_count = make_audio_tree(audio_root, row_count, depth, sparse)
+                print(f"Generated {file_count:,} WAV files at depth {depth} in {audio_root}")
+
+            for script_format in formats:
+                script_dir = os.path.join(work_dir, f"script_{row_count}_d{depth}_{script_format}")
+                os.makedirs(script_dir, exist_ok=True)
+                script_path = os.path.join(script_dir, f"script.{script_format}")
+                if not os.path.exists(script_path):
+                    make_script(script_path, row_count)
+
+                clear_caches(script_path, audio_root)
+                for cache_state in ("cold", "warm"):
+                    case = f"{script_format}-{row_count}-depth{depth}-{cache_state}"
+                    stages, total, peak_mb = run_case_in_fresh_process(script_path, audio_root)
+                    results[case] = {"stages": stages, "total_seconds": total, "peak_memory_mb": peak_mb}
+                    print(f"{case:<28} {total:8.3f}s  peak {peak_mb:8.1f} MB")
+    return results
+
+
+def print_stage_table(results):
+    stage_names = []
+    for result in results.values():
+        stage_names += [name for name in result["stages"] if name not in stage_names]
+    print("\n" + f"{'case':<28}" + "".join(f"{name[:14]:>15}" for name in stage_names))
+    for case, result in results.items():
+        print(f"{case:<28}" + "".join(f"{result['stages'].get(name, 0):>15.3f}" for name in stage_names))
+
+
+def cases_without_baseline(results, baseline):
+    return [case for case in results if case not in baseline]
+
+
+def compare_with_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Returns a list of regression messages (stage time, total time or peak memory over the baseline)"""
+    regressions = []
+    for case, result in results.items():
+        expected = baseline.get(case)
+        if expected is None:
+            continue
+        measured = dict(result["stages"], total=result["total_seconds"])
+        allowed = dict(expected["stages"], total=expected["total_seconds"])
+        for name, seconds in measured.items():
+            if name not in allowed:
+                continue
+            limit = allowed[name] * (1 + tolerance)
+            if seconds > limit and seconds - allowed[name] > MIN_REGRESSION_SECONDS:
+                regressions.append(f"{case}: {name} took {seconds:.3f}s, baseline {allowed[name]:.3f}s")
+        if result["peak_memory_mb"] > expected["peak_memory_mb"] * (1 + tolerance):
+            regressions.append(f"{case}: peak memory {result['peak_memory_mb']:.1f} MB, "
+                               f"baseline {expected['peak_memory_mb']:.1f} MB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end Rec_script_to_Rpp pipeline benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000], help="script sizes (1k-100k)")
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 3], help="audio folder depths")
+    parser.add_argument("--formats", nargs="+", default=["xlsx", "csv"], choices=["xlsx", "csv"])
+    parser.add_argument("--small-files", action="store_true",
+                        help="write short real WAV files instead of sparse full length ones")
+    parser.add_argument("--work-dir", help="keep the generated data here and reuse it between runs")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown before a stage counts as a regression (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+        results = run_suite(args.work_dir, args.rows, args.depths, args.formats, not args.small_files)
+    else:
+        with tempfile.TemporaryDirectory() as work_dir:
+            results = run_suite(work_dir, args.rows, args.depths, args.formats, not args.small_files)
+    print_stage_table(results)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nERROR: no baseline at {args.baseline}, nothing was checked. Run with --save-baseline to create one")
+        return 2
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    unchecked = cases_without_baseline(results, baseline)
+    if len(unchecked) == len(results):
+        print(f"\nERROR: {args.baseline} has none of these cases, nothing was checked. "
+              f"Run with --save-baseline to add them")
+        return 2
+    if unchecked:
+        print(f"\nWARNING: no baseline for {', '.join(unchecked)}, these cases were not checked")
+
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nREGRESSION: {len(regressions)} measurement(s) over the baseline (+{args.tolerance:.0%})")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print("\nNo regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
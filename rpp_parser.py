@@ -0,0 +1,120 @@
+import re
+
+# Streaming reader for REAPER project files. An .rpp is a tree of chunks: a line starting with '<'
+# opens a chunk ('<ITEM', '<SOURCE WAVE'), a line holding only '>' closes it, every other line is
+# an attribute of the innermost open chunk. The file is read line by line and the requested chunk
+# kinds are yielded as they close. Children are only kept inside the chunks listed in
+# keep_children_of (items by default), so a project with any number of items is read in
+# constant memory. Attribute lines are only split into tokens when asked for.
+
+TOKEN_RE = re.compile(r'"([^"]*)"|\'([^\']*)\'|`([^`]*)`|(\S+)')
+
+
+class RppParseError(ValueError):
+    """Raised when the chunk structure of a project file is broken"""
+
+
+def tokenize(line):
+    """Splits an attribute line into tokens. Strings may be quoted with ", ' or ` (quotes are removed)"""
+    if '"' not in line and "'" not in line and "`" not in line:
+        return line.split()
+    return [next(group for group in match.groups() if group is not None) for match in TOKEN_RE.finditer(line)]
+
+
+class RppBlock:
+    """One chunk: its kind ('ITEM'), header line, attribute lines and (if kept) child chunks"""
+
+    __slots__ = ("kind", "header", "line_number", "lines", "children", "parent", "keep_children", "_first_lines")
+
+    def __init__(self, kind, header, line_number, parent, keep_children):
+        self.kind = kind
+        self.header = header
+        self.line_number = line_number
+        self.lines = []
+        self.children = []
+        self.parent = parent
+        self.keep_children = keep_children
+        self._first_lines = None
+
+    @property
+    def header_tokens(self):
+        """Tokens after the kind, e.g. ['WAVE'] for '<SOURCE WAVE'"""
+        return tokenize(self.header)[1:]
+
+    def get(self, key, default=None):
+        """Returns the tokens after key of the first attribute line starting with key"""
+        if self._first_lines is None:
+            # Built on first use: the first line of every key (reversed, so the first one wins)
+            self._first_lines = {line.partition(" ")[0]: line for line in reversed(self.lines)}
+        line = self._first_lines.get(key)
+        return default if line is None else tokenize(line)[1:]
+
+    def get_value(self, key, default=None):
+        """Returns the first token after key"""
+        tokens = self.get(key)
+        return tokens[0] if tokens else default
+
+    def walk(self):
+        """Yields the kept child chunks, depth first"""
+        for child in self.children:
+            yield child
+            yield from child.walk()
+
+    def text(self, indent="  "):
+        """Rebuilds the chunk text from the kept lines and children"""
+        return "\n".join(self._text_lines(0, indent))
+
+    def _text_lines(self, depth, indent):
+        yield indent * depth + self.header
+        for line in self.lines:
+            yield indent * (depth + 1) + line
+        for child in self.children:
+            yield from child._text_lines(depth + 1, indent)
+        yield indent * depth + ">"
+
+
+def iter_blocks(file_obj, kinds=("TRACK", "ITEM"), keep_children_of=("ITEM",)):
+    """Yields the RppBlocks of the given kinds from an open project file as each one closes.
+
+    A block's parent is the enclosing chunk as read so far, e.g. an item's parent track already has
+    its NAME (attributes come before child chunks). Raises RppParseError for a broken structure.
+    """
+    stack = []
+    line_number = 0
+    for line_number, line in enumerate(file_obj, start=1):
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped[0] == "<":
+            parent = stack[-1] if stack else None
+            kind = stripped[1:].split(None, 1)[0] if len(stripped) > 1 else ""
+            keep_children = kind in keep_children_of or (parent is not None and parent.keep_children)
+            stack.append(RppBlock(kind, stripped, line_number, parent, keep_children))
+        elif stripped == ">":
+            if not stack:
+                raise RppParseError(f"Line {line_number}: '>' without an open chunk")
+            block = stack.pop()
+            if block.kind in kinds:
+                yield block
+            if stack and stack[-1].keep_children:
+                stack[-1].children.append(block)
+        elif stack:
+            stack[-1].lines.append(stripped)
+        else:
+            raise RppParseError(f"Line {line_number}: text outside the project chunk")
+
+    if stack:
+        raise RppParseError(f"Line {line_number}: end of file inside <{stack[-1].kind}> "
+                            f"opened on line {stack[-1].line_number}")
+
+
+def iter_project_blocks(rpp_path, kinds=("TRACK", "ITEM"), keep_children_of=("ITEM",)):
+    """iter_blocks() over a project file path"""
+    with open(rpp_path, encoding='utf-8', errors='replace') as f:
+        yield from iter_blocks(f, kinds, keep_children_of)
+
+
+def item_source_files(item):
+    """Returns the FILE of every SOURCE inside an item block (one per take)"""
+    files = [child.get_value("FILE") for child in item.walk() if child.kind == "SOURCE"]
+    return [file_path for file_path in files if file_path is not None]
@@ -0,0 +1,203 @@
+from random import randint
+
+from guid_provider import random_guids, seeded_guid, seeded_number
+
+# Text templates for the parts of a Reaper project. Kept free of pandas/pydub and of import time
+# side effects so worker processes can import them cheaply.
+
+# Name of the track holding the items, update mode looks the items up on it
+SOURCE_REFERENCE_TRACK = "Source_Reference"
+
+
+def generate_random_uuid():
+    """Creates a unique random ID"""
+
+    id1 = random_guids(1)[0]
+    return id1
+
+
+def create_empty_project_template(sample_rate, guid_seed=None):
+    """Create the structure of a Reaper project as text. Returns a string.
+
+    With a guid_seed the timestamp and envelope GUIDs derive from it, so the text is the same every run.
+    """
+    if guid_seed is None:
+        timestamp = randint(1747000000, 9999999999)
+        speed_envelope_id, tempo_envelope_id = random_guids(2)
+    else:
+        timestamp = seeded_number(guid_seed, "REAPER_PROJECT", low=1747000000, high=10000000000)
+        speed_envelope_id = seeded_guid(guid_seed, "MASTERPLAYSPEEDENV")
+        tempo_envelope_id = seeded_guid(guid_seed, "TEMPOENVEX")
+
+    empty_template = f"""<REAPER_PROJECT 0.1 "7.39/win64" {timestamp}
+  RIPPLE 0 0
+  GROUPOVERRIDE 0 0 0
+  AUTOXFADE 129
+  ENVATTACH 0
+  POOLEDENVATTACH 0
+  MIXERUIFLAGS 11 48
+  PEAKGAIN 1
+  FEEDBACK 0
+  PANLAW 1
+  PROJOFFS 0 0 0
+  MAXPROJLEN 0 600
+  GRID 3198 8 1 8 1 0 0 0
+  TIMEMODE 1 5 -1 30 0 0 -1
+  VIDEO_CONFIG 0 0 256
+  PANMODE 3
+  CURSOR 0
+  ZOOM 1
+  VZOOMEX 5 0
+  USE_REC_CFG 0
+  RECMODE 1
+  SMPTESYNC 0 30 100 40 1000 300 0 0 1 0 0
+  MIDIEDITOR -10197916 0 0
+  LOOP 0
+  LOOPGRAN 0 4
+  RECORD_PATH "" ""
+  <RECORD_CFG
+    ZXZhdxgBAA==
+  >
+  <APPLYFX_CFG
+  >
+  RENDER_FILE ""
+  RENDER_PATTERN ""
+  RENDER_FMT 0 1 48000
+  RENDER_1X 0
+  RENDER_RANGE 1 0 0 2 0
+  RENDER_RESAMPLE 3 0 1
+  RENDER_ADDTOPROJ 0
+  RENDER_STEMS 6
+  RENDER_DITHER 0
+  RENDER_TRIM 0 0 0 0
+  TIMELOCKMODE 1
+  TEMPOENVLOCKMODE 1
+  ITEMMIX 0
+  DEFPITCHMODE 1 0
+  TAKELANE 1
+  SAMPLERATE {sample_rate} 1 0
+  <RENDER_CFG
+    ZXZhdxgDAA==
+  >
+  LOCK 1
+  <METRONOME 6 2
+    VOL 0.25 0.125
+    BEATLEN 4
+    FREQ 800 1600 1
+    SAMPLES "" "" "" ""
+    SPLIGNORE 0 0
+    SPLDEF 2 660 "" 0 ""
+    SPLDEF 3 440 "" 0 ""
+    PATTERN 0 169
+    PATTERNSTR ABBB
+    MULT 1
+  >
+  GLOBAL_AUTO -1
+  TEMPO 120 4 4 0
+  PLAYRATE 1 0 0.25 4
+  SELECTION 0 0
+  SELECTION2 0 0
+  MASTERAUTOMODE 0
+  MASTERTRACKHEIGHT 0 0
+  MASTERPEAKCOL 16576
+  MASTERMUTESOLO 0
+  MASTERTRACKVIEW 0 0.6667 0.5 0.5 0 0 0 0 0 0 0 0 0 0
+  MASTERHWOUT 0 0 1 0 0 0 0 -1
+  MASTER_NCH 2 2
+  MASTER_VOLUME 1 0 -1 -1 1
+  MASTER_PANMODE 3
+  MASTER_FX 1
+  MASTER_SEL 0
+  <MASTERPLAYSPEEDENV
+    EGUID {{{speed_envelope_id}}}
+    ACT 0 -1
+    VIS 0 1 1
+    LANEHEIGHT 0 0
+    ARM 0
+    DEFSHAPE 0 -1 -1
+  >
+  <TEMPOENVEX
+    EGUID {{{tempo_envelope_id}}}
+    ACT 1 -1
+    VIS 1 0 1
+    LANEHEIGHT 0 0
+    ARM 0
+    DEFSHAPE 1 -1 -1
+  >
+  <PROJBAY
+  >
+  <EXTENSIONS
+  >
+>"""
+    return empty_template
+
+
+def create_empty_track_template(track_name, guid_seed=None):
+    """Create the structure of an empty track as text. A guid_seed gives the track a GUID derived from its name"""
+
+    track_id = generate_random_uuid() if guid_seed is None else seeded_guid(guid_seed, "TRACK", track_name)
+
+    empty_track_template = f"""<TRACK {{{track_id}}}
+    NAME {track_name}
+    PEAKCOL 16576
+    BEAT -1
+    AUTOMODE 0
+    PANLAWFLAGS 3
+    VOLPAN 1 0 -1 -1 1
+    MUTESOLO 0 0 0
+    IPHASE 0
+    PLAYOFFS 0 1
+    ISBUS 0 0
+    BUSCOMP 0 0 0 0 0
+    SHOWINMIX 1 0.6667 0.5 1 0.5 0 0 0
+    FIXEDLANES 9 0 0 0 0
+    SEL 0
+    REC 0 0 0 0 0 0 0 0
+    VU 2
+    TRACKHEIGHT 0 0 0 0 0 0 0
+    INQ 0 0 0 0.5 100 0 0 100
+    NCHAN 2
+    FX 1
+    TRACKID {{{track_id}}}
+    PERF 0
+    MIDIOUT -1
+    MAINSEND 1 0
+>"""
+    return empty_track_template
+
+
+def create_item_template_with_notes(filename, file_path, text_notes, length, position, offset=0, guids=None):
+    """Item block of one take. offset is where the item starts in the source (SOFFS), in seconds.
+
+    guids is the item's (IGUID, GUID) pair, see guid_provider.item_guids; random ones when None.
+    """
+    item_iguid, item_guid = guids if guids is not None else random_guids(2)
+
+    item_template = f"""    <ITEM
+      POSITION {position}
+      SNAPOFFS 0
+      LENGTH {length}
+      LOOP 1
+      ALLTAKES 0
+      FADEIN 1 0 0 1 0 0 0
+      FADEOUT 1 0 0 1 0 0 0
+      MUTE 0 0
+      SEL 0
+      IGUID {{{item_iguid}}}
+      IID 1
+      <NOTES
+        |{text_notes}
+      >
+      IMGRESOURCEFLAGS 0
+      NOTESWND 544 398 1043 795
+      NAME {filename}
+      VOLPAN 1 0 1 -1
+      SOFFS {offset}
+      PLAYRATE 1 1 0 -1 0 0.0025
+      CHANMODE 0
+      GUID {{{item_guid}}}
+      <SOURCE WAVE
+        FILE "{file_path}"
+      >
+    >"""
+    return item_template
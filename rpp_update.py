@@ -0,0 +1,368 @@
+import os
+import re
+import json
+
+import numpy as np
+
+from layout import DEFAULT_START, DEFAULT_GAP
+from rpp_templates import create_item_template_with_notes
+
+# Incremental update of a project written by this tool (and possibly edited in REAPER since).
+# The items of the reference track are matched to the new script rows by NAME. Matched items keep
+# their block, so IGUID/GUID and any edits made in REAPER survive; only the POSITION, LENGTH,
+# SOFFS, FILE and NOTES lines that differ are rewritten. Rows without an item get a new block, items
+# without a row are dropped. Everything outside the track's items is copied as it is.
+#
+# Every update leaves an item index beside the project (<project>.items.json): the compared fields
+# of every item and the byte range of its block, stamped with the project's size and mtime. While
+# the project is unchanged since (not saved by REAPER in between), the next update compares the rows
+# with the index instead of parsing the file, decodes and patches only the changed items, and copies
+# the other blocks as raw bytes. An update without changes does not touch the file at all. Without
+# a valid index (first update, or the project was saved since) the whole track is parsed once.
+
+POSITION_RE = re.compile(r"^(\s*POSITION ).*$", re.M)
+LENGTH_RE = re.compile(r"^(\s*LENGTH ).*$", re.M)
+SOFFS_RE = re.compile(r"^(\s*SOFFS ).*$", re.M)
+NAME_RE = re.compile(r"^\s*NAME (.*)$", re.M)
+FILE_RE = re.compile(r"^(\s*FILE ).*$", re.M)
+NOTES_RE = re.compile(r"^(\s*)<NOTES\n(.*?)^\s*>$", re.M | re.S)
+
+# Positions and lengths closer than this are considered equal
+POSITION_TOLERANCE = 1e-6
+
+ITEM_INDEX_SUFFIX = ".items.json"
+# Bump when the index layout changes, older indexes are then ignored
+ITEM_INDEX_VERSION = 2
+
+
+class ExistingItem:
+    """An item block of the existing project with the fields the update compares"""
+
+    def __init__(self, block, start=None, end=None):
+        self.block = block
+        # Byte range of the block in the project file
+        self.start = start
+        self.end = end
+        self.name = _unquote(_first_group(NAME_RE, block))
+        self.position = _to_float(_field_value(POSITION_RE, block))
+        self.length = _to_float(_field_value(LENGTH_RE, block))
+        self.offset = _to_float(_field_value(SOFFS_RE, block))
+        self.file_path = _unquote(_field_value(FILE_RE, block))
+        notes = NOTES_RE.search(block)
+        self.notes = None if notes is None else _notes_text(notes.group(2))
+
+    @classmethod
+    def from_index(cls, entry):
+        """An item known from the item index, its block is only read when it has to be patched"""
+        item = cls.__new__(cls)
+        item.block = None
+        item.name, item.position, item.length, item.offset, item.file_path, item.notes, item.start, item.end = entry
+        return item
+
+    def index_entry(self):
+        return [self.name, self.position, self.length, self.offset, self.file_path, self.notes, self.start, self.end]
+
+
+def _first_group(pattern, block):
+    match = pattern.search(block)
+    return match.group(1).strip() if match else ""
+
+
+def _field_value(pattern, block):
+    match = pattern.search(block)
+    return match.group(0)[len(match.group(1)):].strip() if match else ""
+
+
+def _notes_text(body):
+    """The notes of a NOTES chunk body: every line without its indentation and '|' prefix, nothing
+    else is stripped (spaces inside the notes are kept)"""
+    if body.endswith("\n"):
+        body = body[:-1]
+    lines = []
+    for line in body.split("\n"):
+        line = line.lstrip()
+        lines.append(line[1:] if line.startswith("|") else line)
+    return "\n".join(lines)
+
+
+def rendered_notes(note):
+    """The notes ExistingItem reads back from a block rendered (or patched) with these notes"""
+    return _notes_text(f"|{note}")
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'`":
+        return value[1:-1]
+    return value
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def locate_track_items(data, track_name):
+    """Finds the item blocks of the named track in the project bytes.
+
+    Returns (head end, [(start, end) of every item block], tail start) as byte offsets; a block ends
+    before its line break. Works on the chunk structure of the file: lines starting with '<' open a
+    chunk and a lone '>' closes it. The first track whose NAME matches is used.
+    """
+    depth = 0
+    track_start = None
+    in_target = False
+    item_start = None
+    items = []
+    line_end = 0
+    for line in data.splitlines(keepends=True):
+        line_start, line_end = line_end, line_end + len(line)
+        stripped = line.strip()
+        if stripped.startswith(b"<"):
+            depth += 1
+            if depth == 2 and stripped.startswith(b"<TRACK"):
+                track_start = line_start
+            elif depth == 3 and in_target and stripped.startswith(b"<ITEM"):
+                item_start = line_start
+        elif stripped == b">":
+            if depth == 3 and item_start is not None:
+                items.append((item_start, line_end))
+                item_start = None
+            elif depth == 2 and in_target:
+                head_end = items[0][0] if items else line_start
+                tail_start = items[-1][1] if items else line_start
+                return head_end, [(start, start + len(data[start:end].rstrip(b"\r\n"))) for start, end in items], tail_start
+            elif depth == 2:
+                track_start = None
+            depth -= 1
+        elif depth == 2 and track_start is not None and not in_target and stripped.startswith(b"NAME "):
+            in_target = _unquote(stripped[5:].strip().decode('utf-8', errors='replace')) == track_name
+            if not in_target:
+                track_start = None
+
+    raise ValueError(f"No track named '{track_name}' in the existing project")
+
+
+def item_index_path(rpp_path):
+    """Returns e.g. <folder>/script.items.json for <folder>/script.rpp"""
+    return os.path.splitext(rpp_path)[0] + ITEM_INDEX_SUFFIX
+
+
+def _file_stamp(file_path):
+    stat = os.stat(file_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def load_item_index(rpp_path, track_name):
+    """Returns (head end, existing items, tail start) from the item index of the project, or None when
+    it is missing, unreadable or the project changed since"""
+    try:
+        with open(item_index_path(rpp_path), encoding='utf-8') as f:
+            index = json.load(f)
+        if (index["version"] != ITEM_INDEX_VERSION or index["track"] != track_name
+                or index["stamp"] != _file_stamp(rpp_path)):
+            return None
+        items = [ExistingItem.from_index(entry) for entry in index["items"]]
+        return int(index["head_end"]), items, int(index["tail_start"])
+    except (OSError, ValueError, LookupError, TypeError, AttributeError):
+        return None
+
+
+def write_item_index(rpp_path, track_name, head_end, items, tail_start):
+    """Stores the index of the project as it is on disk now. A read-only folder just goes without it"""
+    index = {"version": ITEM_INDEX_VERSION, "track": track_name, "stamp": _file_stamp(rpp_path),
+             "head_end": head_end, "tail_start": tail_start, "items": [item.index_entry() for item in items]}
+    index_path = item_index_path(rpp_path)
+    partial_path = index_path + ".part"
+    try:
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(partial_path, index_path)
+    except OSError:
+        pass
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+
+def read_existing_items(rpp_path, track_name):
+    """Returns (project bytes or None, head end, existing items, tail start).
+
+    With a valid item index the file is not read (bytes None) and the items carry no block yet.
+    """
+    index = load_item_index(rpp_path, track_name)
+    if index is not None:
+        return (None,) + index
+
+    with open(rpp_path, 'rb') as f:
+        data = f.read()
+    head_end, spans, tail_start = locate_track_items(data, track_name)
+    items = [ExistingItem(_decode_block(data, start, end), start, end) for start, end in spans]
+    return data, head_end, items, tail_start
+
+
+def _decode_block(data, start, end):
+    # Blocks are patched with \n line breaks, _encode_block() restores the file's own
+    return data[start:end].decode('utf-8').replace("\r\n", "\n")
+
+
+def _encode_block(block, newline):
+    return block.replace("\n", newline).encode('utf-8') if newline != "\n" else block.encode('utf-8')
+
+
+def _same_number(old_value, new_value):
+    if np.isnan(old_value) and np.isnan(new_value):
+        return True
+    return abs(old_value - new_value) <= POSITION_TOLERANCE
+
+
+def _patch(pattern, block, value):
+    return pattern.sub(lambda match: match.group(1) + value, block, count=1)
+
+
+def _patch_notes(block, notes):
+    match = NOTES_RE.search(block)
+    if match is None:
+        # Items without notes get the block right after the <ITEM line, like the template has it
+        first_line_end = block.index("\n") + 1
+        indent = re.match(r"\s*", block[first_line_end:]).group(0)
+        return f"{block[:first_line_end]}{indent}<NOTES\n{indent}  |{notes}\n{indent}>\n{block[first_line_end:]}"
+    indent = match.group(1)
+    return f"{block[:match.start()]}{indent}<NOTES\n{indent}  |{notes}\n{indent}>{block[match.end():]}"
+
+
+def minimal_positions(old_positions, lengths, start=DEFAULT_START, gap=DEFAULT_GAP):
+    """Lays out the rows in order, keeping every old position that does not overlap the previous item.
+
+    old_positions: position of the matched item, NaN for new rows. Only items that would overlap
+    (and new rows) move, to right after the previous item.
+    """
+    positions = np.empty(len(lengths))
+    earliest = start
+    for row, (old_position, length) in enumerate(zip(old_positions, lengths)):
+        if not np.isnan(old_position) and old_position >= earliest - POSITION_TOLERANCE:
+            positions[row] = old_position
+        else:
+            positions[row] = earliest
+        earliest = positions[row] + (0 if np.isnan(length) else length) + gap
+    return positions
+
+
+def update_project(rpp_path, names, paths, notes, lengths, track_name, start=DEFAULT_START, gap=DEFAULT_GAP,
+                   offsets=None, guids=None):
+    """Updates the items of an existing project to the given rows. Returns (positions, change counts).
+
+    lengths may contain placeholders for missing files, they take no room on the timeline.
+    offsets: start offset of every item in its source (SOFFS), 0 for all rows when None.
+    guids: (IGUID, GUID) of every row, only used for added items (random ones when None).
+    """
+    if offsets is None:
+        offsets = [0] * len(names)
+    if guids is None:
+        guids = [None] * len(names)
+    data, head_end, existing_items, tail_start = read_existing_items(rpp_path, track_name)
+
+    # Items with the same NAME are matched in order
+    existing_by_name = {}
+    for item in existing_items:
+        existing_by_name.setdefault(item.name, []).append(item)
+
+    matched = []
+    for name in names:
+        candidates = existing_by_name.get(str(name))
+        matched.append(candidates.pop(0) if candidates else None)
+
+    numeric_lengths = np.array([_to_float(length) for length in lengths])
+    old_positions = np.array([np.nan if item is None else item.position for item in matched])
+    positions = minimal_positions(old_positions, numeric_lengths, start, gap)
+
+    # First only the indexed fields are compared: (item, row) pairs of the blocks to write, with
+    # the row of every item that needs patching and None for the ones kept byte for byte
+    changes = {"added": 0, "removed": sum(len(items) for items in existing_by_name.values()),
+               "changed": 0, "moved": 0, "unchanged": 0}
+    plan = []
+    for row, (item, name, path, note, numeric_length, position, offset) in enumerate(zip(
+            matched, names, paths, notes, numeric_lengths, positions, offsets)):
+        if item is None:
+            plan.append((None, row))
+            changes["added"] += 1
+            continue
+        changed = (item.file_path != str(path) or item.notes != rendered_notes(note)
+                   or not _same_number(item.length, numeric_length) or not _same_number(item.offset, _to_float(offset)))
+        moved = not _same_number(item.position, position)
+        if changed:
+            changes["changed"] += 1
+        elif moved:
+            changes["moved"] += 1
+        else:
+            changes["unchanged"] += 1
+        plan.append((item, row if changed or moved else None))
+
+    # Same items in the same order, nothing to patch: the project stays as it is
+    if changes["unchanged"] == len(existing_items) == len(names) and all(
+            item is existing for (item, _), existing in zip(plan, existing_items)):
+        if data is not None:
+            write_item_index(rpp_path, track_name, head_end, existing_items, tail_start)
+        return positions, changes
+
+    if data is None:
+        with open(rpp_path, 'rb') as f:
+            data = f.read()
+    newline = "\r\n" if b"\r\n" in data[:head_end] else "\n"
+    separator = newline.encode('utf-8')
+
+    full_path = os.fspath(rpp_path)
+    partial_path = full_path + ".part"
+    new_items = []
+    try:
+        with open(partial_path, 'wb') as f:
+            f.write(data[:head_end])
+            written = head_end
+            for number, (item, row) in enumerate(plan):
+                if number:
+                    f.write(separator)
+                    written += len(separator)
+                if item is not None and row is None:
+                    # Unchanged items are copied as they are, with their indexed fields
+                    block = data[item.start:item.end]
+                    kept = ExistingItem.from_index(item.index_entry())
+                    kept.start, kept.end = written, written + len(block)
+                    new_items.append(kept)
+                else:
+                    text = _render_row(item, data, names[row], paths[row], notes[row], lengths[row],
+                                       numeric_lengths[row], positions[row], offsets[row], guids[row])
+                    block = _encode_block(text, newline)
+                    new_items.append(ExistingItem(text, written, written + len(block)))
+                f.write(block)
+                written += len(block)
+            if plan:
+                f.write(separator)
+                written += len(separator)
+            new_tail_start = written
+            f.write(data[tail_start:])
+        os.replace(partial_path, full_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    write_item_index(full_path, track_name, new_items[0].start if new_items else head_end, new_items, new_tail_start)
+    return positions, changes
+
+
+def _render_row(item, data, name, path, note, length, numeric_length, position, offset, guid_pair):
+    """Returns the block text of a row: a new block, or the matched item's block with the differing lines patched"""
+    if item is None:
+        return create_item_template_with_notes(name, path, note, length, float(position), offset, guid_pair)
+
+    block = item.block if item.block is not None else _decode_block(data, item.start, item.end)
+    if item.file_path != str(path):
+        block = _patch(FILE_RE, block, f'"{path}"')
+    if item.notes != rendered_notes(note):
+        block = _patch_notes(block, note)
+    if not _same_number(item.length, numeric_length):
+        block = _patch(LENGTH_RE, block, str(length))
+    if not _same_number(item.offset, _to_float(offset)):
+        block = _patch(SOFFS_RE, block, str(offset))
+    if not _same_number(item.position, position):
+        block = _patch(POSITION_RE, block, str(float(position)))
+    return block
@@ -0,0 +1,132 @@
+import os
+import sys
+import argparse
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from rpp_parser import iter_project_blocks, item_source_files, RppParseError
+
+# Checks a generated project: items are in timeline order on every track, positions and lengths are
+# numbers, items do not overlap, and every SOURCE FILE exists.
+#
+#     python rpp_verify.py project.rpp [more.rpp ...] [--no-files] [--max-problems N]
+
+Problem = namedtuple("Problem", ["line_number", "message"])
+
+# Overlaps shorter than this (float noise in positions) are not reported
+OVERLAP_TOLERANCE = 1e-6
+DEFAULT_MAX_PROBLEMS = 50
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _list_directory(directory):
+    try:
+        return {os.path.normcase(name) for name in os.listdir(directory)}
+    except OSError:
+        return set()
+
+
+def find_missing_files(file_lines, project_directory, max_workers=None):
+    """Returns the (file, line number) pairs whose file does not exist. Relative paths are resolved
+    against the project folder. Every folder is listed once (in parallel) instead of one stat per file"""
+    resolved = {}
+    for file_path, _ in file_lines:
+        if file_path not in resolved:
+            full_path = file_path if os.path.isabs(file_path) else os.path.join(project_directory, file_path)
+            resolved[file_path] = os.path.split(os.path.normcase(os.path.abspath(full_path)))
+
+    directories = list({directory for directory, _ in resolved.values()})
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        listings = dict(zip(directories, executor.map(_list_directory, directories)))
+    return [(file_path, line_number) for file_path, line_number in file_lines
+            if resolved[file_path][1] not in listings[resolved[file_path][0]]]
+
+
+def verify_project(rpp_path, check_files=True):
+    """Returns (stats dict, list of Problems) for a project file"""
+    problems = []
+    stats = {"tracks": 0, "items": 0, "source_files": 0, "missing_files": 0}
+    previous_items = {}
+    file_lines = []
+
+    try:
+        for block in iter_project_blocks(rpp_path):
+            if block.kind == "TRACK":
+                stats["tracks"] += 1
+                previous_items.pop(id(block), None)
+                continue
+
+            stats["items"] += 1
+            track = block.parent
+            if track is None or track.kind != "TRACK":
+                problems.append(Problem(block.line_number, "Item outside a track"))
+                continue
+
+            name = block.get_value("NAME", "")
+            position = _number(block.get_value("POSITION"))
+            length = _number(block.get_value("LENGTH"))
+            if position is None or position < 0:
+                problems.append(Problem(block.line_number, f"{name}: invalid POSITION {' '.join(block.get('POSITION', []))}"))
+            if length is None or length <= 0:
+                problems.append(Problem(block.line_number, f"{name}: invalid LENGTH {' '.join(block.get('LENGTH', []))}"))
+
+            previous = previous_items.get(id(track))
+            if previous is not None and position is not None:
+                previous_name, previous_position, previous_length = previous
+                if position < previous_position:
+                    problems.append(Problem(block.line_number, f"{name}: at {position} is before the previous "
+                                                               f"item {previous_name} at {previous_position}"))
+                elif previous_length is not None and position < previous_position + previous_length - OVERLAP_TOLERANCE:
+                    problems.append(Problem(block.line_number, f"{name}: overlaps the previous item {previous_name}"))
+            if position is not None:
+                previous_items[id(track)] = (name, position, length)
+
+            for file_path in item_source_files(block):
+                file_lines.append((file_path, block.line_number))
+    except RppParseError as e:
+        problems.append(Problem(0, str(e)))
+
+    stats["source_files"] = len(file_lines)
+    if check_files:
+        for file_path, line_number in find_missing_files(file_lines, os.path.dirname(os.path.abspath(rpp_path))):
+            problems.append(Problem(line_number, f"SOURCE FILE not found: {file_path}"))
+            stats["missing_files"] += 1
+
+    problems.sort(key=lambda problem: problem.line_number)
+    return stats, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify generated .rpp projects")
+    parser.add_argument("projects", nargs="+", help=".rpp files to check")
+    parser.add_argument("--no-files", action="store_true", help="skip the SOURCE FILE existence check")
+    parser.add_argument("--max-problems", type=int, default=DEFAULT_MAX_PROBLEMS,
+                        help="problems listed per project (all are counted)")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for rpp_path in args.projects:
+        if not os.path.isfile(rpp_path):
+            print(f"{rpp_path}: not found")
+            failed += 1
+            continue
+        stats, problems = verify_project(rpp_path, check_files=not args.no_files)
+        status = "OK" if not problems else f"{len(problems)} problem(s)"
+        print(f"{rpp_path}: {stats['tracks']} tracks, {stats['items']} items, {stats['source_files']} source files, "
+              f"{stats['missing_files']} missing - {status}")
+        for problem in problems[:args.max_problems]:
+            print(f"  line {problem.line_number}: {problem.message}")
+        if len(problems) > args.max_problems:
+            print(f"  ... {len(problems) - args.max_problems} more")
+        failed += bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
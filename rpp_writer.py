@@ -0,0 +1,69 @@
+import os
+from pathlib import Path
+
+# Streaming .rpp writer. The project and track templates are split once at their insertion points
+# and the item blocks are written to the file one by one, so memory use does not grow with the
+# number of items. The output is the same text add_track_to_project() + add_items_to_track() build.
+
+TRACK_INSERT_MARKER = "<EXTENSIONS\n  >"
+ITEMS_INSERT_MARKER = "MAINSEND 1 0\n"
+
+
+def split_project_template(project_template):
+    """Splits the project template where the track goes. Returns (head, tail)"""
+    insert_point = project_template.find(TRACK_INSERT_MARKER)
+    if insert_point == -1:
+        raise ValueError("Project template has no <EXTENSIONS> block to insert the track before")
+    return project_template[:insert_point], project_template[insert_point:]
+
+
+def split_track_template(track_template):
+    """Splits the track template where the items go. Returns (head, tail)"""
+    insert_point = track_template.find(ITEMS_INSERT_MARKER)
+    if insert_point == -1:
+        raise ValueError("Track template has no MAINSEND line to insert the items after")
+    insert_point += len(ITEMS_INSERT_MARKER)
+    return track_template[:insert_point], track_template[insert_point:]
+
+
+def write_project(file_obj, project_template, track_template, item_templates):
+    """Writes a project with one track holding the given item blocks (any iterable of strings).
+
+    Returns the number of items written.
+    """
+    project_head, project_tail = split_project_template(project_template)
+    track_head, track_tail = split_track_template(track_template)
+
+    file_obj.write(project_head)
+    file_obj.write(track_head)
+
+    item_count = 0
+    for item_template in item_templates:
+        if item_count:
+            file_obj.write("\n")
+        file_obj.write(item_template)
+        item_count += 1
+
+    file_obj.write("\n  ")
+    file_obj.write(track_tail)
+    file_obj.write("\n  ")
+    file_obj.write(project_tail)
+    return item_count
+
+
+def write_project_to_directory(project_template, track_template, item_templates, filename, directory):
+    """Streams a project to a file in the specified directory. Returns the full path.
+
+    The project is written to a temporary file first, so a failed or cancelled run never leaves a
+    half written .rpp behind (nor replaces the previous one).
+    """
+    full_path = Path(directory) / filename
+    partial_path = full_path.with_name(full_path.name + ".part")
+    try:
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            write_project(f, project_template, track_template, item_templates)
+        os.replace(partial_path, full_path)
+    finally:
+        if partial_path.exists():
+            partial_path.unlink()
+    return str(full_path)
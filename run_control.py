@@ -0,0 +1,44 @@
+import threading
+
+from run_report import RunReport
+
+# Progress reporting and cooperative cancellation for one generation run. The pipeline calls
+# progress() between units of work; once cancel() has been called the next progress() raises
+# GenerationCancelled, which unwinds the run and lets the thread pools shut down cleanly.
+
+
+class GenerationCancelled(Exception):
+    """Raised inside the pipeline when the user cancelled the run"""
+
+
+class RunControl:
+    """Shared by the GUI (cancel, on_progress, on_stage) and the pipeline (progress, check, report)"""
+
+    def __init__(self, on_progress=None, on_stage=None):
+        self.on_progress = on_progress
+        self.cancel_event = threading.Event()
+        # Stage timings of this run, on_stage receives each run_report.StageRecord as it ends
+        self.report = RunReport(on_stage=on_stage)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise GenerationCancelled("Generation cancelled")
+
+    def progress(self, stage, done=0, total=0):
+        """Reports progress of a stage (total 0 means unknown) and stops the run if it was cancelled"""
+        self.check()
+        if self.on_progress is not None:
+            self.on_progress(stage, done, total)
+
+
+def report_progress(control, stage, done=0, total=0):
+    """progress() for optional controls"""
+    if control is not None:
+        control.progress(stage, done, total)
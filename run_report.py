@@ -0,0 +1,120 @@
+import os
+import json
+import time
+from contextlib import contextmanager
+
+# Per-stage timing and throughput for one generation run. Stages are recorded in run order with
+# their wall time, item count and bytes read/written; on_stage subscribers (e.g. the GUI) get
+# each record as soon as the stage ends.
+
+REPORT_SUFFIX = ".report.json"
+
+
+class StageRecord:
+    """Timing and counters of one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.items = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.details = {}
+
+    @property
+    def items_per_second(self):
+        return self.items / self.seconds if self.seconds > 0 else None
+
+    def to_dict(self):
+        return {"stage": self.name, "seconds": round(self.seconds, 6), "items": self.items,
+                "bytes_read": self.bytes_read, "bytes_written": self.bytes_written,
+                "items_per_second": round(self.items_per_second, 1) if self.items_per_second else None,
+                **self.details}
+
+
+class RunReport:
+    """Collects the StageRecords of a run"""
+
+    def __init__(self, on_stage=None):
+        self.on_stage = on_stage
+        self.stages = []
+        self.started = time.perf_counter()
+        self.total_seconds = None
+
+    @contextmanager
+    def stage(self, name):
+        """Times the enclosed block as one stage. The caller fills in items/bytes on the yielded record"""
+        record = StageRecord(name)
+        start_time = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds += time.perf_counter() - start_time
+        self.add(record)
+
+    def add(self, record):
+        self.stages.append(record)
+        if self.on_stage is not None:
+            self.on_stage(record)
+
+    def finish(self):
+        self.total_seconds = time.perf_counter() - self.started
+
+    def to_dict(self):
+        return {"total_seconds": round(self.total_seconds or 0, 6),
+                "stages": [record.to_dict() for record in self.stages]}
+
+    def write_json(self, file_path):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return file_path
+
+    def summary_text(self):
+        lines = []
+        for record in self.stages:
+            rate = f"{record.items_per_second:,.0f} items/s" if record.items_per_second else ""
+            lines.append(f"{record.name:<20} {record.seconds:8.3f}s {record.items:>9,} items "
+                         f"{record.bytes_read + record.bytes_written:>12,} bytes  {rate}")
+        return "\n".join(lines)
+
+
+def finish_report(control, summary, directory, project_name):
+    """Writes the stage timings next to the project as <name>.report.json and adds its path to the summary"""
+    report = getattr(control, "report", None)
+    if report is not None:
+        report.finish()
+        summary["report_path"] = report.write_json(os.path.join(directory, f"{project_name}{REPORT_SUFFIX}"))
+    return summary
+
+
+@contextmanager
+def report_stage(control, name):
+    """RunReport.stage() for optional controls; without a control the record is simply discarded"""
+    report = getattr(control, "report", None)
+    if report is None:
+        yield StageRecord(name)
+    else:
+        with report.stage(name) as record:
+            yield record
+
+
+def add_stage(control, record):
+    """Adds a record that was timed by hand (see timed_iter) to the control's report, if any"""
+    report = getattr(control, "report", None)
+    if report is not None:
+        report.add(record)
+
+
+def timed_iter(iterable, record):
+    """Yields from iterable, adding the time spent producing each element to record.seconds"""
+    iterator = iter(iterable)
+    while True:
+        start_time = time.perf_counter()
+        try:
+            value = next(iterator)
+        except StopIteration:
+            record.seconds += time.perf_counter() - start_time
+            return
+        record.seconds += time.perf_counter() - start_time
+        record.items += 1
+        yield value
@@ -0,0 +1,232 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+
+# One recording script per run. The workbook is opened once; validation reads only the header row
+# and processing parses only the selected columns, both reusing the same open file.
+#
+# Projected columns are also kept in a parse cache, keyed by the script's size, mtime and the column
+# selection, so reopening an unchanged script skips the parse entirely. The cache lives in the user's
+# own cache folder, not beside the script: scripts sit in shared delivery folders. It is plain JSON
+# (values and the dtype of every column), so a cache file cannot run code and a pandas upgrade does
+# not break it. Columns with other values than text, numbers and booleans (e.g. dates) are not cached,
+# and any unreadable cache file is simply a miss.
+#
+# pandas is imported by the methods that parse, so importing this module (e.g. for strip_quotes)
+# stays cheap. core_build reads CSV scripts without pandas altogether.
+
+PARSE_CACHE_DIRNAME = os.path.join("rec_script_to_rpp", "scripts")
+# Bump when the cache file layout changes, older files are then misses
+PARSE_CACHE_VERSION = 1
+# Values a cached column may hold, everything else is left uncached
+JSON_VALUE_TYPES = (str, int, float, bool)
+CSV_CHUNK_SIZE = 100000
+
+
+def strip_quotes(path):
+    """Removes the quotes a pasted Windows path usually comes with"""
+    path = path.strip()
+    if len(path) >= 2 and path[0] == path[-1] and path[0] in ('"', "'"):
+        path = path[1:-1]
+    return path
+
+
+def user_cache_directory():
+    """Per-user cache folder: %LOCALAPPDATA% on Windows, ~/Library/Caches on macOS, $XDG_CACHE_HOME or ~/.cache elsewhere"""
+    if sys.platform == "win32":
+        return os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~"), "Library", "Caches")
+    return os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+
+
+def parse_cache_directory(script_path):
+    """Folder with the parse cache files of one script"""
+    key = hashlib.sha1(os.path.abspath(strip_quotes(script_path)).encode('utf-8')).hexdigest()
+    return os.path.join(user_cache_directory(), PARSE_CACHE_DIRNAME, key)
+
+
+def clear_parse_cache(script_path):
+    """Removes every cached column selection of a script"""
+    shutil.rmtree(parse_cache_directory(script_path), ignore_errors=True)
+
+
+def _convert_cell(value):
+    """Converts an openpyxl value the way pandas' openpyxl reader does"""
+    if value is None:
+        return float('nan')
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+class ScriptSession:
+    """Recording script opened once and shared by column validation and processing"""
+
+    def __init__(self, script_path, use_parse_cache=True):
+        self.script_path = strip_quotes(script_path)
+        self.extension = os.path.splitext(self.script_path)[1].lower()
+        if self.extension not in ('.xlsx', '.xls', '.csv'):
+            raise ValueError(f"Unsupported file extension: {self.extension}")
+        self.use_parse_cache = use_parse_cache
+        self.parse_cache_hit = False
+        # Bytes read from disk by read_columns (the script itself, or the parse cache file)
+        self.bytes_read = 0
+        self._excel_file = None
+        self._headers = None
+        self._frame = None
+        self._projected = {}
+
+    def _open(self):
+        if self._excel_file is None and self.extension != '.csv':
+            import pandas as pd
+            engine = 'openpyxl' if self.extension == '.xlsx' else 'xlrd'
+            # openpyxl opens the workbook in read-only mode, rows are only parsed when requested
+            self._excel_file = pd.ExcelFile(self.script_path, engine=engine)
+        return self._excel_file
+
+    @property
+    def headers(self):
+        """Column names as pandas would report them, read from the header row only"""
+        if self._headers is None:
+            import pandas as pd
+            if self._frame is not None:
+                self._headers = self._frame.columns.tolist()
+            elif self.extension == '.csv':
+                self._headers = pd.read_csv(self.script_path, nrows=0).columns.tolist()
+            else:
+                self._headers = self._open().parse(0, nrows=0).columns.tolist()
+        return self._headers
+
+    def has_column(self, column_name):
+        return column_name in self.headers
+
+    def read_frame(self):
+        """Returns the whole first sheet (or CSV) as a DataFrame, parsed once per session. Do not modify it in place"""
+        if self._frame is None:
+            import pandas as pd
+            if self.extension == '.csv':
+                self._frame = pd.read_csv(self.script_path)
+            else:
+                self._frame = self._open().parse(0)
+        return self._frame
+
+    def read_columns(self, columns):
+        """Returns a DataFrame with only the given columns, in the given order"""
+        columns = list(columns)
+        key = tuple(columns)
+        if key not in self._projected:
+            df = self._load_parse_cache(columns)
+            self.parse_cache_hit = df is not None
+            if df is None:
+                missing = [column for column in columns if column not in self.headers]
+                if missing:
+                    raise KeyError(f"{missing} not in script headers")
+                df = self._parse_columns(columns)
+                self.bytes_read += os.path.getsize(self.script_path)
+                self._store_parse_cache(columns, df)
+            else:
+                self.bytes_read += os.path.getsize(self._parse_cache_path(columns))
+            self._projected[key] = df
+        # Callers add columns, hand out a shallow copy so the cached frame stays as parsed
+        return self._projected[key].copy(deep=False)
+
+    def _parse_columns(self, columns):
+        if self._frame is not None:
+            return self._frame[columns]
+        if self.extension == '.csv':
+            import pandas as pd
+            # The C parser drops the other columns while tokenizing, chunks bound its buffers
+            unique_columns = list(dict.fromkeys(columns))
+            chunks = pd.read_csv(self.script_path, usecols=unique_columns, chunksize=CSV_CHUNK_SIZE)
+            return pd.concat(chunks, ignore_index=True)[columns]
+        if self.extension == '.xls':
+            return self._open().parse(0, usecols=list(dict.fromkeys(columns)))[columns]
+        return self._stream_xlsx_columns(columns)
+
+    def _stream_xlsx_columns(self, columns):
+        """Streams the sheet rows from the read-only workbook, keeping only the selected cells"""
+        import pandas as pd
+
+        sheet = self._open().book.worksheets[0]
+        indexes = [self.headers.index(column) for column in columns]
+        values = [[] for _ in columns]
+        last_non_empty_row = 0
+
+        rows = sheet.iter_rows(min_row=2, values_only=True)
+        for row_number, row in enumerate(rows, start=1):
+            for column_values, index in zip(values, indexes):
+                column_values.append(_convert_cell(row[index] if index < len(row) else None))
+            if row.count(None) != len(row):
+                last_non_empty_row = row_number
+
+        # pandas drops the empty rows at the end of the sheet
+        data = {position: column_values[:last_non_empty_row] for position, column_values in enumerate(values)}
+        df = pd.DataFrame(data)
+        df.columns = columns
+        return df
+
+    def _parse_cache_path(self, columns):
+        key = hashlib.sha1(repr(columns).encode('utf-8')).hexdigest()
+        return os.path.join(parse_cache_directory(self.script_path), f"{key}.json")
+
+    def _script_stamp(self):
+        stat = os.stat(self.script_path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _load_parse_cache(self, columns):
+        if not self.use_parse_cache:
+            return None
+        import pandas as pd
+        try:
+            with open(self._parse_cache_path(columns), encoding='utf-8') as f:
+                cache = json.load(f)
+            if (cache["version"] != PARSE_CACHE_VERSION or cache["script"] != os.path.abspath(self.script_path)
+                    or cache["stamp"] != self._script_stamp() or cache["columns"] != columns):
+                return None
+            df = pd.DataFrame({position: pd.Series(values, dtype=dtype)
+                               for position, (dtype, values) in enumerate(cache["data"])})
+            df.columns = columns
+        except Exception:
+            # Missing, damaged or foreign files are misses
+            return None
+        return df
+
+    def _store_parse_cache(self, columns, df):
+        if not self.use_parse_cache:
+            return
+        data = []
+        for position in range(len(columns)):
+            values = df.iloc[:, position].tolist()
+            if not all(isinstance(value, JSON_VALUE_TYPES) for value in values):
+                return
+            data.append([str(df.iloc[:, position].dtype), values])
+        cache = {"version": PARSE_CACHE_VERSION, "script": os.path.abspath(self.script_path),
+                 "stamp": self._script_stamp(), "columns": columns, "data": data}
+
+        cache_path = self._parse_cache_path(columns)
+        partial_path = cache_path + ".part"
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(partial_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+            os.replace(partial_path, cache_path)
+        except OSError:
+            # Without a writable cache folder the script is just parsed every time
+            pass
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    def close(self):
+        if self._excel_file is not None:
+            self._excel_file.close()
+            self._excel_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,195 @@
+import os
+import re
+import csv
+from collections import namedtuple
+from concurrent.futures import as_completed
+
+import numpy as np
+
+from layout import compute_positions, DEFAULT_START, DEFAULT_GAP
+from item_renderer import iter_rendered_items
+from rpp_writer import write_project_to_directory
+from rpp_templates import create_empty_project_template, create_empty_track_template, SOURCE_REFERENCE_TRACK
+from worker_pool import process_pool
+
+# Splits one script into several bounded .rpp projects. Rows are grouped by an optional column
+# (in order of first appearance) and every group is cut into shards of at most max_items rows
+# and at most max_length seconds of timeline. Every shard is laid out from the start offset
+# again and rendered in its own process; an index CSV maps every script row to its shard.
+# Shards listed in the previous index that a rebuild no longer writes are removed.
+
+ShardOptions = namedtuple("ShardOptions", ["max_items", "max_length", "group_column"], defaults=[None, None, None])
+Shard = namedtuple("Shard", ["number", "group", "rows", "filename"])
+
+SHARD_INDEX_SUFFIX = ".shards.csv"
+
+# Longest group label kept in a shard file name
+MAX_LABEL_LENGTH = 40
+# Label of the shards holding the rows with an empty group cell
+BLANK_GROUP_LABEL = "blank"
+
+
+def sharding_enabled(options):
+    return options is not None and bool(options.max_items or options.max_length or options.group_column)
+
+
+def check_shard_options(options):
+    """Raises ValueError for limits that cannot be met"""
+    if options is None:
+        return
+    if options.max_items is not None and int(options.max_items) < 1:
+        raise ValueError("max_items must be at least 1")
+    if options.max_length is not None and float(options.max_length) <= 0:
+        raise ValueError("max_length must be a positive number of seconds")
+
+
+def _split_rows(rows, slots, max_items, max_length, start, gap):
+    """Cuts one group's rows (and their timeline slots) into runs that respect both limits"""
+    runs = []
+    position = 0
+    while position < len(rows):
+        end = min(position + max_items, len(rows)) if max_items else len(rows)
+        if max_length:
+            # End of every item on a timeline starting at the shard's start offset
+            item_ends = start + np.cumsum(slots[position:end]) - gap
+            # An item longer than max_length still gets a shard of its own
+            end = position + max(int(np.searchsorted(item_ends, max_length, side='right')), 1)
+        runs.append(rows[position:end])
+        position = end
+    return runs
+
+
+def is_blank_group(group):
+    """True for empty group cells: None, NaN (every blank cell is its own NaN object) or whitespace"""
+    return group is None or group != group or (isinstance(group, str) and not group.strip())
+
+
+def shard_label(group):
+    if group is None:
+        return BLANK_GROUP_LABEL
+    return re.sub(r'[^\w\-]+', '_', str(group)).strip('_')[:MAX_LABEL_LENGTH]
+
+
+def plan_shards(project_name, lengths, options, groups=None, start=DEFAULT_START, gap=DEFAULT_GAP):
+    """Returns the list of Shards for rows with the given lengths (NaN where the file is missing).
+
+    groups: one group value per row when options.group_column is set.
+    """
+    lengths = np.asarray(lengths, dtype=np.float64)
+    slots = np.where(np.isnan(lengths), 0, lengths) + gap
+    max_items = int(options.max_items) if options.max_items else None
+    max_length = float(options.max_length) if options.max_length else None
+
+    if groups is None:
+        grouped_rows = {None: np.arange(len(lengths))}
+    else:
+        # dicts keep insertion order, so groups come out in order of first appearance
+        grouped_rows = {}
+        for row, group in enumerate(groups):
+            # NaN never equals itself, the blank cells are collected under one key
+            grouped_rows.setdefault(None if is_blank_group(group) else group, []).append(row)
+        grouped_rows = {group: np.asarray(rows) for group, rows in grouped_rows.items()}
+
+    shards = []
+    for group, rows in grouped_rows.items():
+        for run in _split_rows(rows, slots[rows], max_items, max_length, start, gap):
+            number = len(shards) + 1
+            label = shard_label(group) if groups is not None else ""
+            filename = f"{project_name}_{number:03d}{'_' + label if label else ''}.rpp"
+            shards.append(Shard(number, group, run, filename))
+    return shards
+
+
+def shard_positions(lengths, shards, start=DEFAULT_START, gap=DEFAULT_GAP, gaps=None, missing_length=0, grid=None,
+                    sample_rate=None):
+    """Returns the positions of all rows, every shard laid out from start. See layout.compute_positions for the options"""
+    lengths = np.asarray(lengths, dtype=np.float64)
+    gaps = None if gaps is None else np.asarray(gaps, dtype=np.float64)
+    positions = np.zeros(len(lengths))
+    for shard in shards:
+        positions[shard.rows] = compute_positions(lengths[shard.rows], start=start, gap=gap,
+                                                  gaps=None if gaps is None else gaps[shard.rows],
+                                                  missing_length=missing_length, grid=grid, sample_rate=sample_rate)
+    return positions
+
+
+def render_shard(project_template, track_template, columns, filename, directory):
+    """Writes one shard project from its column lists. Returns (path, bytes written). Runs in a worker process"""
+    items = iter_rendered_items(*columns, use_processes=False)
+    rpp_path = write_project_to_directory(project_template, track_template, items, filename, directory)
+    return rpp_path, os.path.getsize(rpp_path)
+
+
+def shard_templates(sample_rate, shard, guid_seed=None):
+    """Returns the (project, track) templates of one shard. Seeded GUIDs also derive from the shard number"""
+    seed = None if guid_seed is None else f"{guid_seed}/{shard.number:03d}"
+    return (create_empty_project_template(sample_rate, seed),
+            create_empty_track_template(SOURCE_REFERENCE_TRACK, seed))
+
+
+def render_shards(sample_rate, columns, shards, directory, control=None, guid_seed=None):
+    """Renders every shard in a process pool. Returns (shard paths in shard order, total bytes written).
+
+    columns are the item column lists of the whole script (see backend.get_item_columns). When the run
+    fails or is cancelled, the shards already written by it are removed again.
+    """
+    shard_paths = [None] * len(shards)
+    bytes_written = 0
+    executor = process_pool()
+    try:
+        futures = {}
+        for position, shard in enumerate(shards):
+            shard_columns = [[column[row] for row in shard.rows] for column in columns]
+            project_template, track_template = shard_templates(sample_rate, shard, guid_seed)
+            futures[executor.submit(render_shard, project_template, track_template, shard_columns, shard.filename,
+                                    directory)] = position
+
+        for done, future in enumerate(as_completed(futures), start=1):
+            shard_paths[futures[future]], shard_bytes = future.result()
+            bytes_written += shard_bytes
+            if control is not None:
+                control.progress("Rendering shards", done, len(shards))
+    except BaseException:
+        executor.shutdown(wait=True, cancel_futures=True)
+        for shard_path in shard_paths:
+            if shard_path is not None and os.path.exists(shard_path):
+                os.remove(shard_path)
+        raise
+    executor.shutdown(wait=True)
+    return shard_paths, bytes_written
+
+
+def remove_stale_shards(index_path, shards):
+    """Removes the shard projects listed in the existing index that are not among shards. Returns their paths"""
+    try:
+        with open(index_path, newline='', encoding='utf-8-sig') as f:
+            previous_files = {os.path.basename(row["project_file"]) for row in csv.DictReader(f)
+                              if row.get("project_file")}
+    except (OSError, ValueError, KeyError):
+        return []
+
+    directory = os.path.dirname(index_path)
+    removed = []
+    for filename in sorted(previous_files - {shard.filename for shard in shards}):
+        shard_path = os.path.join(directory, filename)
+        if os.path.isfile(shard_path):
+            os.remove(shard_path)
+            removed.append(shard_path)
+    return removed
+
+
+def write_shard_index(file_path, shards, names, positions):
+    """Writes the index CSV: one line per script row with the shard it went into"""
+    rows = []
+    for shard in shards:
+        for row in shard.rows:
+            # Spreadsheet row number: data starts below the header on row 2
+            rows.append((int(row) + 2, names[row], shard.number, shard.filename,
+                         "" if shard.group is None else shard.group, positions[row]))
+    rows.sort()
+
+    with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(["script_row", "filename", "shard", "project_file", "group", "position"])
+        writer.writerows(rows)
+    return file_path
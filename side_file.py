@@ -0,0 +1,92 @@
+import os
+import importlib.util
+
+# The Dataframe_<script> side file: the script rows with their audio path, length and position.
+# It can be written as xlsx (openpyxl write-only mode, rows are streamed instead of building a
+# cell tree), CSV, Parquet (needs pyarrow or fastparquet) or skipped altogether.
+
+SIDE_FILE_FORMATS = ("xlsx", "csv", "parquet", "none")
+DEFAULT_SIDE_FILE_FORMAT = "xlsx"
+SIDE_FILE_EXTENSIONS = {"xlsx": ".xlsx", "csv": ".csv", "parquet": ".parquet"}
+
+# Rows appended to the xlsx sheet between cancellation checks
+XLSX_CHUNK_ROWS = 10000
+
+
+def parquet_available():
+    return any(importlib.util.find_spec(engine) is not None for engine in ("pyarrow", "fastparquet"))
+
+
+def check_side_file_format(side_file_format):
+    """Raises ValueError for an unknown format, or for Parquet without a Parquet engine installed"""
+    if side_file_format not in SIDE_FILE_FORMATS:
+        raise ValueError(f"Unknown side file format '{side_file_format}', use one of {', '.join(SIDE_FILE_FORMATS)}")
+    if side_file_format == "parquet" and not parquet_available():
+        raise ValueError("Parquet side files need pyarrow or fastparquet installed")
+
+
+def side_file_path(script_path, side_file_format, directory=None):
+    """Returns e.g. <script folder>/Dataframe_script.xlsx, or None for 'none'"""
+    if side_file_format == "none":
+        return None
+    script_name = os.path.splitext(os.path.basename(script_path))[0]
+    directory = os.path.dirname(script_path) if directory is None else directory
+    return os.path.join(directory, f"Dataframe_{script_name}{SIDE_FILE_EXTENSIONS[side_file_format]}")
+
+
+def _cell_value(value):
+    # NaN and None become empty cells
+    return None if value is None or value != value else value
+
+
+def write_xlsx(df, file_path, control=None):
+    """Writes the frame to one sheet in openpyxl write-only mode"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append([str(column) for column in df.columns])
+    for start in range(0, len(df), XLSX_CHUNK_ROWS):
+        if control is not None and control.cancelled:
+            break
+        for row in df.iloc[start:start + XLSX_CHUNK_ROWS].itertuples(index=False, name=None):
+            sheet.append([_cell_value(value) for value in row])
+    # A write-only workbook has to be saved to be closed, the cancelled file is then discarded
+    workbook.save(file_path)
+    if control is not None:
+        control.check()
+
+
+def write_csv(df, file_path, control=None):
+    # utf-8-sig so that Excel opens accented notes correctly
+    df.to_csv(file_path, index=False, encoding='utf-8-sig')
+
+
+def write_parquet(df, file_path, control=None):
+    # Length and Position mix numbers with 'Not Generated'/'Not Assigned', Parquet columns need one type
+    object_columns = df.select_dtypes(include='object').columns
+    df.astype({column: str for column in object_columns}).to_parquet(file_path, index=False)
+
+
+SIDE_FILE_WRITERS = {"xlsx": write_xlsx, "csv": write_csv, "parquet": write_parquet}
+
+
+def export_side_file(df, script_path, side_file_format=DEFAULT_SIDE_FILE_FORMAT, directory=None, control=None):
+    """Writes the side file next to the script (or into directory). Returns its path, None for 'none'.
+
+    The file is written under a temporary name first, so a failed or cancelled export never leaves a
+    partial side file behind. control is an optional run_control.RunControl, checked while writing xlsx.
+    """
+    check_side_file_format(side_file_format)
+    file_path = side_file_path(script_path, side_file_format, directory)
+    if file_path is None:
+        return None
+
+    partial_path = file_path + ".part"
+    try:
+        SIDE_FILE_WRITERS[side_file_format](df, partial_path, control)
+        os.replace(partial_path, file_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return file_path
@@ -0,0 +1,26 @@
+from filename_matching import TrigramIndex, normalize_filename
+
+
+def build_index(names):
+    return TrigramIndex([normalize_filename(name) for name in names], names)
+
+
+def test_small_library_suggests_close_name():
+    index = build_index(['VO_Hero_01_take2.wav', 'VO_Hero_01_take3.wav', 'zz_01.wav', 'SFX_Door.wav',
+                         'Amb_Forest.wav'])
+    suggestions = index.suggest(normalize_filename('VO_Hero_01'))
+    assert set(suggestions) == {'VO_Hero_01_take2.wav', 'VO_Hero_01_take3.wav'}
+
+
+def test_falls_back_to_common_trigrams():
+    # The close names share all their trigrams with hundreds of others, only an unrelated name has a rare one
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    names = [f'VO_Hero_01_take_{first}{second}.wav' for first in letters[:8] for second in letters]
+    names += [f'SFX_Door_{first}{second}{third}.wav' for first in letters[:3] for second in letters for third in letters]
+    names += ['Crowd_Walla_Loop_01.wav']
+    suggestions = build_index(names).suggest(normalize_filename('VO_Hero_01'))
+    assert suggestions and all(name.startswith('VO_Hero_01_take') for name in suggestions)
+
+
+def test_no_suggestion_for_unrelated_name():
+    assert build_index(['VO_Hero_01.wav', 'SFX_Door.wav']).suggest(normalize_filename('qqqqqq')) == []
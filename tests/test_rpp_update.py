@@ -0,0 +1,131 @@
+import os
+
+import pytest
+
+from guid_provider import item_guids
+from layout import compute_positions
+from rpp_templates import (create_empty_project_template, create_empty_track_template,
+                           create_item_template_with_notes, SOURCE_REFERENCE_TRACK)
+from rpp_update import ExistingItem, item_index_path, locate_track_items, update_project
+from rpp_writer import write_project_to_directory
+
+NAMES = ["a.wav", "b.wav", "c.wav", "d.wav"]
+PATHS = [f"/audio/{name}" for name in NAMES]
+# Indentation and trailing blanks inside the notes are part of them
+NOTES = ["plain", "  indented line", "trailing blanks  ", ""]
+LENGTHS = [1.5, 2.0, 0.75, 3.25]
+
+
+def rows(names=NAMES, paths=PATHS, notes=NOTES, lengths=LENGTHS):
+    return [list(names), list(paths), list(notes), list(lengths)]
+
+
+def build(directory, names=NAMES, paths=PATHS, notes=NOTES, lengths=LENGTHS):
+    """Writes script.rpp the way a fresh build does. Returns its path"""
+    positions = compute_positions(lengths)
+    items = [create_item_template_with_notes(*fields)
+             for fields in zip(names, paths, notes, lengths, positions, [0] * len(names), item_guids(names, "seed"))]
+    return write_project_to_directory(create_empty_project_template("48000", "seed"),
+                                      create_empty_track_template(SOURCE_REFERENCE_TRACK, "seed"),
+                                      items, "script.rpp", str(directory))
+
+
+def update(rpp_path, names=NAMES, paths=PATHS, notes=NOTES, lengths=LENGTHS):
+    _, changes = update_project(rpp_path, *rows(names, paths, notes, lengths), SOURCE_REFERENCE_TRACK,
+                                guids=item_guids(names, "seed"))
+    return changes
+
+
+def read_items(rpp_path):
+    with open(rpp_path, "rb") as f:
+        data = f.read()
+    _, spans, _ = locate_track_items(data, SOURCE_REFERENCE_TRACK)
+    return [ExistingItem(data[start:end].decode("utf-8"), start, end) for start, end in spans]
+
+
+def block_bytes(rpp_path):
+    with open(rpp_path, "rb") as f:
+        data = f.read()
+    return [data[item.start:item.end] for item in read_items(rpp_path)]
+
+
+def test_update_without_changes_leaves_the_project_alone(tmp_path):
+    rpp_path = build(tmp_path)
+    with open(rpp_path, "rb") as f:
+        built = f.read()
+
+    first = update(rpp_path)
+    assert first == {"added": 0, "removed": 0, "changed": 0, "moved": 0, "unchanged": len(NAMES)}
+    assert os.path.exists(item_index_path(rpp_path))
+    mtime_ns = os.stat(rpp_path).st_mtime_ns
+
+    # The second update compares against the index
+    assert update(rpp_path) == first
+    assert os.stat(rpp_path).st_mtime_ns == mtime_ns
+    with open(rpp_path, "rb") as f:
+        assert f.read() == built
+
+
+def test_notes_keep_their_whitespace(tmp_path):
+    rpp_path = build(tmp_path)
+    assert [item.notes for item in read_items(rpp_path)] == NOTES
+
+
+def test_one_changed_row_patches_only_its_item(tmp_path):
+    rpp_path = build(tmp_path)
+    update(rpp_path)
+    before = block_bytes(rpp_path)
+
+    notes = list(NOTES)
+    notes[1] = "new take"
+    assert update(rpp_path, notes=notes) == {"added": 0, "removed": 0, "changed": 1, "moved": 0, "unchanged": 3}
+    after = block_bytes(rpp_path)
+    assert [index for index, (old, new) in enumerate(zip(before, after)) if old != new] == [1]
+    assert read_items(rpp_path)[1].notes == "new take"
+
+    # The index written by the update matches a full parse of the new file
+    os.remove(item_index_path(rpp_path))
+    assert update(rpp_path, notes=notes)["unchanged"] == len(NAMES)
+
+
+def test_added_and_removed_rows(tmp_path):
+    rpp_path = build(tmp_path)
+    update(rpp_path)
+
+    names = NAMES[1:] + ["e.wav"]
+    paths = PATHS[1:] + ["/audio/e.wav"]
+    notes = NOTES[1:] + ["new"]
+    lengths = LENGTHS[1:] + [1.0]
+    changes = update(rpp_path, names, paths, notes, lengths)
+    assert changes["added"] == 1 and changes["removed"] == 1
+
+    items = read_items(rpp_path)
+    assert [item.name for item in items] == names
+    assert [item.notes for item in items] == notes
+    # No overlaps on the timeline
+    for previous, item in zip(items, items[1:]):
+        assert item.position >= previous.position + previous.length
+    assert update(rpp_path, names, paths, notes, lengths)["unchanged"] == len(names)
+
+
+def test_stale_index_is_ignored(tmp_path):
+    rpp_path = build(tmp_path)
+    update(rpp_path)
+
+    # The project is edited (e.g. saved by REAPER) after the index was written
+    with open(rpp_path, "rb") as f:
+        data = f.read()
+    with open(rpp_path, "wb") as f:
+        f.write(data.replace(b"|plain", b"|edited in REAPER"))
+
+    changes = update(rpp_path)
+    assert changes["changed"] == 1
+    assert [item.notes for item in read_items(rpp_path)] == NOTES
+
+
+@pytest.mark.parametrize("content", ["not json", "{}", "[]", '{"version": 2, "track": "Source_Reference"}'])
+def test_damaged_index_falls_back_to_a_full_parse(tmp_path, content):
+    rpp_path = build(tmp_path)
+    with open(item_index_path(rpp_path), "w", encoding="utf-8") as f:
+        f.write(content)
+    assert update(rpp_path)["unchanged"] == len(NAMES)
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from script_session import ScriptSession, parse_cache_directory
+
+
+@pytest.fixture
+def script(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "cache"))
+    script_path = tmp_path / "delivery" / "script.csv"
+    script_path.parent.mkdir()
+    script_path.write_text("Filename,Notes,Take\na.wav,hello,1\nb.wav,,2\nc.wav,True,\n", encoding="utf-8")
+    return str(script_path)
+
+
+def read(script_path, columns):
+    with ScriptSession(script_path) as session:
+        return session.read_columns(columns), session.parse_cache_hit
+
+
+def test_parse_cache_round_trip(script):
+    parsed, hit = read(script, ["Filename", "Notes", "Take"])
+    cached, cached_hit = read(script, ["Filename", "Notes", "Take"])
+    assert not hit and cached_hit
+    assert cached.equals(parsed)
+    assert list(cached.dtypes) == list(parsed.dtypes)
+
+
+def test_parse_cache_stays_out_of_the_script_folder(script):
+    read(script, ["Filename", "Notes"])
+    assert os.listdir(os.path.dirname(script)) == ["script.csv"]
+    assert os.listdir(parse_cache_directory(script))
+
+
+def test_damaged_parse_cache_is_a_miss(script):
+    read(script, ["Filename", "Notes"])
+    for name in os.listdir(parse_cache_directory(script)):
+        with open(os.path.join(parse_cache_directory(script), name), "w") as f:
+            f.write("not json")
+    parsed, hit = read(script, ["Filename", "Notes"])
+    assert not hit and parsed["Filename"].tolist() == ["a.wav", "b.wav", "c.wav"]
@@ -0,0 +1,40 @@
+import numpy as np
+
+from sharding import ShardOptions, plan_shards, remove_stale_shards, shard_templates, write_shard_index
+
+NAMES = ["a.wav", "b.wav", "c.wav", "d.wav"]
+LENGTHS = [1.0, 2.0, 3.0, 4.0]
+
+
+def write_build(directory, max_items):
+    """Writes empty shard projects and the index the way a build does. Returns the shards"""
+    shards = plan_shards("script", LENGTHS, ShardOptions(max_items=max_items))
+    for shard in shards:
+        (directory / shard.filename).write_text("<REAPER_PROJECT\n>\n")
+    write_shard_index(str(directory / "script.shards.csv"), shards, NAMES, np.zeros(len(NAMES)))
+    return shards
+
+
+def test_fewer_shards_remove_the_stale_ones(tmp_path):
+    write_build(tmp_path, max_items=1)
+    (tmp_path / "script_009_mine.rpp").write_text("not from a build")
+
+    shards = plan_shards("script", LENGTHS, ShardOptions(max_items=3))
+    removed = remove_stale_shards(str(tmp_path / "script.shards.csv"), shards)
+
+    assert sorted(path.rsplit("/", 1)[-1] for path in removed) == ["script_003.rpp", "script_004.rpp"]
+    # Files the previous index did not list are left alone
+    assert sorted(path.name for path in tmp_path.glob("*.rpp")) == ["script_001.rpp", "script_002.rpp",
+                                                                     "script_009_mine.rpp"]
+
+
+def test_no_previous_index_removes_nothing(tmp_path):
+    shards = plan_shards("script", LENGTHS, ShardOptions(max_items=2))
+    assert remove_stale_shards(str(tmp_path / "script.shards.csv"), shards) == []
+
+
+def test_seeded_shards_get_their_own_track_guid():
+    shards = plan_shards("script", LENGTHS, ShardOptions(max_items=1))
+    tracks = [shard_templates("48000", shard, "seed")[1] for shard in shards]
+    assert len(set(tracks)) == len(shards)
+    assert tracks == [shard_templates("48000", shard, "seed")[1] for shard in shards]
@@ -0,0 +1,116 @@
+import os
+import struct
+from collections import namedtuple
+
+# Native RIFF/WAVE header reader. Only the chunk headers are read, the audio data is never loaded,
+# so probing a multi-minute take costs a few KB of I/O instead of a full decode.
+
+WavInfo = namedtuple("WavInfo", ["duration", "sample_rate", "channels", "bits_per_sample",
+                                 "format_tag", "block_align", "data_offset", "data_size", "header_bytes"])
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_ALAW = 0x0006
+WAVE_FORMAT_MULAW = 0x0007
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Formats where every block_align bytes of the data chunk is exactly one sample frame
+LINEAR_FORMATS = (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT, WAVE_FORMAT_ALAW, WAVE_FORMAT_MULAW)
+
+# Stop looking for the data chunk after this many chunk headers (guards against garbage files)
+MAX_CHUNKS = 64
+
+
+class WavProbeError(ValueError):
+    """Raised when a file is not a WAV file this module can read without decoding."""
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise WavProbeError("Unexpected end of file while reading WAV header")
+    return data
+
+
+def _parse_fmt_chunk(payload):
+    """Returns (format_tag, channels, sample_rate, block_align, bits_per_sample) from a 'fmt ' chunk"""
+    if len(payload) < 16:
+        raise WavProbeError("'fmt ' chunk is too short")
+    format_tag, channels, sample_rate, _, block_align, bits = struct.unpack("<HHIIHH", payload[:16])
+
+    # WAVE_FORMAT_EXTENSIBLE keeps the real format tag in the first two bytes of the SubFormat GUID
+    if format_tag == WAVE_FORMAT_EXTENSIBLE:
+        if len(payload) < 40:
+            raise WavProbeError("WAVE_FORMAT_EXTENSIBLE 'fmt ' chunk is too short")
+        format_tag = struct.unpack("<H", payload[24:26])[0]
+
+    if channels == 0 or sample_rate == 0 or block_align == 0:
+        raise WavProbeError("'fmt ' chunk describes an empty stream")
+    return format_tag, channels, sample_rate, block_align, bits
+
+
+def probe_wav(file_path):
+    """Returns a WavInfo read from the RIFF/RF64/BW64 chunk headers of a WAV file"""
+    file_size = os.path.getsize(file_path)
+
+    with open(file_path, 'rb') as f:
+        riff_id, _, wave_id = struct.unpack("<4sI4s", _read_exact(f, 12))
+        header_bytes = 12
+        if riff_id not in (b"RIFF", b"RF64", b"BW64") or wave_id != b"WAVE":
+            raise WavProbeError("Not a RIFF/RF64/BW64 WAVE file")
+
+        ds64_data_size = None
+        ds64_sample_count = None
+        fmt = None
+        fact_sample_count = None
+
+        for _ in range(MAX_CHUNKS):
+            header = f.read(8)
+            header_bytes += len(header)
+            if len(header) < 8:
+                break
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+            chunk_start = f.tell()
+
+            if chunk_id == b"ds64":
+                # RF64/BW64 store the real 64-bit sizes here, the 32-bit fields are set to 0xFFFFFFFF
+                _, ds64_data_size, ds64_sample_count = struct.unpack("<QQQ", _read_exact(f, 24))
+                header_bytes += 24
+            elif chunk_id == b"fmt ":
+                fmt = _parse_fmt_chunk(_read_exact(f, min(chunk_size, 64)))
+                header_bytes += min(chunk_size, 64)
+            elif chunk_id == b"fact" and chunk_size >= 4:
+                fact_sample_count = struct.unpack("<I", _read_exact(f, 4))[0]
+                header_bytes += 4
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise WavProbeError("'data' chunk found before 'fmt ' chunk")
+
+                data_size = chunk_size
+                if chunk_size == 0xFFFFFFFF:
+                    # RF64 placeholder, or a recorder that never finalised the header
+                    data_size = ds64_data_size if ds64_data_size is not None else file_size - chunk_start
+                # Truncated files only contain what is on disk
+                data_size = min(data_size, file_size - chunk_start)
+
+                format_tag, channels, sample_rate, block_align, bits = fmt
+                if format_tag in LINEAR_FORMATS:
+                    frame_count = data_size // block_align
+                else:
+                    # Compressed formats need the sample count from 'fact' (or 'ds64' for RF64)
+                    frame_count = ds64_sample_count if ds64_sample_count else fact_sample_count
+                    if frame_count is None:
+                        raise WavProbeError(f"Cannot compute length of format 0x{format_tag:04X} from header")
+
+                return WavInfo(frame_count / sample_rate, sample_rate, channels, bits,
+                               format_tag, block_align, chunk_start, data_size, header_bytes)
+
+            # Chunks are word aligned: odd sized chunks are followed by one pad byte
+            f.seek(chunk_start + chunk_size + (chunk_size & 1))
+
+    raise WavProbeError("No 'data' chunk found")
+
+
+def get_wav_duration(file_path):
+    """Returns the duration of a WAV file in seconds without decoding it"""
+    return probe_wav(file_path).duration
@@ -0,0 +1,49 @@
+import numpy as np
+
+from wav_probe import WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT
+
+# Sample access for the analysis stages (peaks, silence trimming). The data chunk of a WAV file is
+# memory-mapped as frames x channels, so only the pages a block touches are read and long takes
+# are processed block by block in bounded memory, without a pydub decode.
+
+
+def open_samples(audio_path, info):
+    """Returns (memmap of the data chunk as frames x channels, scale to full range 1.0), None if not readable.
+
+    info is the wav_probe.WavInfo of the file. 24 bit data is mapped as frames x channels x 3 bytes.
+    """
+    frame_count = info.data_size // info.block_align
+    if frame_count == 0:
+        return None
+    bytes_per_sample = info.block_align // info.channels
+    shape = (frame_count, info.channels)
+
+    if info.format_tag == WAVE_FORMAT_IEEE_FLOAT and bytes_per_sample in (4, 8):
+        dtype = np.float32 if bytes_per_sample == 4 else np.float64
+        return np.memmap(audio_path, dtype=dtype, mode='r', offset=info.data_offset, shape=shape), 1.0
+    if info.format_tag != WAVE_FORMAT_PCM:
+        return None
+    if bytes_per_sample == 1:
+        return np.memmap(audio_path, dtype=np.uint8, mode='r', offset=info.data_offset, shape=shape), 128.0
+    if bytes_per_sample in (2, 4):
+        dtype = np.int16 if bytes_per_sample == 2 else np.int32
+        return (np.memmap(audio_path, dtype=dtype, mode='r', offset=info.data_offset, shape=shape),
+                float(2 ** (8 * bytes_per_sample - 1)))
+    if bytes_per_sample == 3:
+        # 24 bit samples are widened block by block in to_float
+        return (np.memmap(audio_path, dtype=np.uint8, mode='r', offset=info.data_offset,
+                          shape=(frame_count, info.channels, 3)), float(2 ** 23))
+    return None
+
+
+def to_float(block, scale):
+    """Converts a block of raw samples to float32 in -1..1"""
+    block = np.asarray(block)
+    if block.ndim == 3:
+        # 24 bit little endian: shift the three bytes into the top of an int32 to keep the sign
+        widened = (block[..., 0].astype(np.int32) << 8 | block[..., 1].astype(np.int32) << 16
+                   | block[..., 2].astype(np.int32) << 24) >> 8
+        return widened.astype(np.float32) / scale
+    if block.dtype == np.uint8:
+        return (block.astype(np.float32) - 128) / scale
+    return block.astype(np.float32) / scale
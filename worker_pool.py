@@ -0,0 +1,26 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Process pools for the CPU-bound stages (item rendering, shards, peaks, silence analysis). Workers
+# are always spawned, the way Windows starts them, so every platform runs the same code path.
+#
+# Spawned workers import the main module again (as __mp_main__). Entry scripts keep their startup
+# under `if __name__ == "__main__":` (gui.py, batch.py, core_build.py, ...). When a pool is requested
+# while a worker is importing an unguarded main module, or from inside a worker, a thread pool is
+# returned instead: starting processes there fails with the freeze_support RuntimeError.
+
+POOL_START_METHOD = "spawn"
+
+
+def in_worker_process():
+    """True inside a pool worker, including while it imports the main module"""
+    process = multiprocessing.current_process()
+    # _inheriting is what multiprocessing itself checks before raising the freeze_support error
+    return getattr(process, "_inheriting", False) or multiprocessing.parent_process() is not None
+
+
+def process_pool(max_workers=None):
+    """Returns a spawn ProcessPoolExecutor, or a ThreadPoolExecutor inside a worker process"""
+    if in_worker_process():
+        return ThreadPoolExecutor(max_workers=max_workers)
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(POOL_START_METHOD))